@@ -0,0 +1,113 @@
+import hashlib
+import html
+import json
+import os
+import time
+import traceback
+from telegram import Bot, Update
+from telegram.ext import ContextTypes
+from telegram.constants import ParseMode
+
+MAX_MESSAGE_LENGTH = 4096
+FINGERPRINT_FRAMES = 3          # Innermost frames that identify "the same bug"
+REPEAT_WINDOW_SECONDS = 3600    # A fingerprint is reported in full again once this has passed
+SUMMARY_INTERVAL_SECONDS = 300  # How often repeat counts are posted
+MAX_TRACEBACK_CHARS = 3000
+MAX_UPDATE_CHARS = 1500
+MAX_FIELD_CHARS = 200           # Long strings inside the update (message text, etc.) are cut to this
+
+class _ErrorRecord:
+    __slots__ = ("label", "location", "first_seen", "repeats", "total")
+
+    def __init__(self, label: str, location: str):
+        self.label = label
+        self.location = location
+        self.first_seen = time.monotonic()
+        self.repeats = 0  # Occurrences since the last full report or summary
+        self.total = 1
+
+# fingerprint -> record
+_records: dict[str, _ErrorRecord] = {}
+
+def _fingerprint(error: BaseException) -> tuple[str, str]:
+    """Hashes the exception type with its innermost frames; returns (fingerprint, location)."""
+    frames = traceback.extract_tb(error.__traceback__)[-FINGERPRINT_FRAMES:]
+    parts = [f"{type(error).__module__}.{type(error).__qualname__}"]
+    parts += [f"{frame.filename}:{frame.name}:{frame.lineno}" for frame in frames]
+    location = f"{os.path.basename(frames[-1].filename)}:{frames[-1].lineno} in {frames[-1].name}" if frames else "unknown"
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()[:12], location
+
+def register_error(error: BaseException) -> tuple[str, bool]:
+    """
+    Counts an occurrence of the error.
+    Returns (fingerprint, is_new); only new errors should be reported in full.
+    """
+    fingerprint, location = _fingerprint(error)
+    record = _records.get(fingerprint)
+    if record and time.monotonic() - record.first_seen < REPEAT_WINDOW_SECONDS:
+        record.repeats += 1
+        record.total += 1
+        return fingerprint, False
+    _records[fingerprint] = _ErrorRecord(f"{type(error).__name__}: {error}"[:200], location)
+    return fingerprint, True
+
+# --- Formatting ---
+def _trim(value):
+    """Recursively shortens long strings so one huge message can't dominate the report."""
+    if isinstance(value, str) and len(value) > MAX_FIELD_CHARS:
+        return value[:MAX_FIELD_CHARS] + f"… (+{len(value) - MAX_FIELD_CHARS} chars)"
+    if isinstance(value, dict):
+        return {key: _trim(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_trim(item) for item in value]
+    return value
+
+def _format_update(update: object) -> str:
+    update_data = _trim(update.to_dict()) if isinstance(update, Update) else str(update)
+    dumped = json.dumps(update_data, indent=1, ensure_ascii=False, default=str)
+    if len(dumped) > MAX_UPDATE_CHARS:
+        dumped = dumped[:MAX_UPDATE_CHARS] + f"\n… (truncated, {len(dumped)} chars total)"
+    return dumped
+
+def _pack_lines(lines: list[str]) -> list[str]:
+    """Groups lines into messages under the length limit without splitting a line."""
+    messages, current = [], ""
+    for line in lines:
+        if current and len(current) + 1 + len(line) > MAX_MESSAGE_LENGTH:
+            messages.append(current)
+            current = ""
+        current = f"{current}\n{line}" if current else line
+    if current: messages.append(current)
+    return messages
+
+# --- Sending ---
+async def send_full_report(bot: Bot, chat_id, error: BaseException, update: object, fingerprint: str):
+    """Sends the first occurrence of an error: traceback and a trimmed update, each a well-formed message."""
+    tb_string = "".join(traceback.format_exception(None, error, error.__traceback__))
+    if len(tb_string) > MAX_TRACEBACK_CHARS:
+        tb_string = "…" + tb_string[-MAX_TRACEBACK_CHARS:]
+    messages = [
+        f"<b>An exception was raised</b> (<code>{fingerprint}</code>):\n\n<pre>{html.escape(tb_string)}</pre>",
+        f"<b>Update:</b>\n<pre>{html.escape(_format_update(update))}</pre>",
+    ]
+    for message in messages:
+        await bot.send_message(chat_id=chat_id, text=message, parse_mode=ParseMode.HTML)
+
+async def summary_job(context: ContextTypes.DEFAULT_TYPE):
+    """Posts how often already-reported errors repeated, and forgets errors whose window has passed."""
+    now = time.monotonic()
+    lines = []
+    for fingerprint, record in list(_records.items()):
+        if record.repeats:
+            lines.append(f"• <code>{fingerprint}</code> ×{record.repeats} (total {record.total}) — "
+                         f"{html.escape(record.label)} at <code>{html.escape(record.location)}</code>")
+            record.repeats = 0
+        if now - record.first_seen >= REPEAT_WINDOW_SECONDS:
+            del _records[fingerprint]
+
+    chat_id = context.job.data
+    if not lines or not chat_id: return
+    minutes = SUMMARY_INTERVAL_SECONDS // 60
+    header = f"<b>Repeated errors in the last {minutes} minutes:</b>"
+    for message in _pack_lines([header] + lines):
+        await context.bot.send_message(chat_id=chat_id, text=message, parse_mode=ParseMode.HTML)
@@ -22,3 +22,13 @@ HELP_REGISTRY = {}
 #     "command2": "Description for command 2."
 #   }
 #}
+
+# Coroutines that main.py awaits in post_shutdown, so modules can persist
+# any in-memory state (e.g. buffered writes) before the process exits.
+# Each entry is an async function taking the Application.
+SHUTDOWN_HOOKS = []
+
+# Functions that drop a module's in-memory caches for one chat, called when a chat's
+# settings change wholesale (/import, /resetall) rather than through the module's own commands.
+# Each entry is a plain function taking (application, chat_id).
+CHAT_CACHE_HOOKS = []
@@ -2,9 +2,6 @@ import os
 import logging
 import importlib
 import pathlib
-import traceback
-import html
-import json
 import asyncio
 import nest_asyncio
 
@@ -13,6 +10,8 @@ from telegram.ext import Application, ApplicationBuilder, PicklePersistence, Con
 from telegram.constants import ParseMode
 
 from keep_alive import keep_alive
+from bot_core.registry import SHUTDOWN_HOOKS
+from bot_core.error_reporter import register_error, send_full_report, summary_job, SUMMARY_INTERVAL_SECONDS
 
 # Apply the patch to allow nested event loops in Replit/Render
 nest_asyncio.apply()
@@ -26,7 +25,14 @@ logger = logging.getLogger(__name__)
 
 # --- Error Handler for Developer Logging ---
 async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE):
-    """Logs errors and sends a detailed message to the developer log channel."""
+    """
+    Logs errors and sends a detailed message to the developer log channel.
+    Repeats of an already reported error are only counted; summary_job posts the counts.
+    """
+    fingerprint, is_new = register_error(context.error)
+    if not is_new:
+        logger.error(f"Repeated exception {fingerprint} while handling an update: {context.error!r}")
+        return
     logger.error(f"Exception while handling an update: {context.error}", exc_info=context.error)
     
     DEV_LOG_CHANNEL = os.environ.get("DEV_LOG_CHANNEL")
@@ -34,31 +40,19 @@ async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE):
         print("DEV_LOG_CHANNEL not set. Cannot send error log.")
         return
 
-    # Format the traceback
-    tb_list = traceback.format_exception(None, context.error, context.error.__traceback__)
-    tb_string = "".join(tb_list)
-
-    # Build the message using html.escape for safety
-    update_str = update.to_dict() if isinstance(update, Update) else str(update)
-    message = (
-        f"<b>An exception was raised:</b>\n\n"
-        f"<pre>{html.escape(tb_string)}</pre>\n\n"
-        f"<b>Full Update:</b>\n"
-        f"<pre>{html.escape(json.dumps(update_str, indent=2, ensure_ascii=False))}</pre>"
-    )
-    
-    # Split the message into chunks if it's too long
-    for i in range(0, len(message), 4096):
-        try:
-            await context.bot.send_message(
-                chat_id=DEV_LOG_CHANNEL, text=message[i:i+4096], parse_mode=ParseMode.HTML
-            )
-        except Exception as e:
-            logger.error(f"Failed to send error log to developer channel: {e}")
+    try:
+        await send_full_report(context.bot, DEV_LOG_CHANNEL, context.error, update, fingerprint)
+    except Exception as e:
+        logger.error(f"Failed to send error log to developer channel: {e}")
 
 # --- Graceful Shutdown Function ---
 async def post_shutdown(application: Application):
     """This function is called after the bot is stopped."""
+    for hook in SHUTDOWN_HOOKS:
+        try:
+            await hook(application)
+        except Exception as e:
+            logger.error(f"Shutdown hook {hook.__name__} failed: {e}")
     logger.info("Bot has been shut down. Persistence should be saved.")
 
 
@@ -82,6 +76,8 @@ async def main():
         .build()
     )
     application.add_error_handler(error_handler)
+    application.job_queue.run_repeating(
+        summary_job, interval=SUMMARY_INTERVAL_SECONDS, data=os.environ.get("DEV_LOG_CHANNEL"), name="error_summary")
     
     logger.info("Telegram application built.")
 
@@ -100,7 +96,8 @@ async def main():
             logger.error(f"❌ Failed to load module package {module_name}: {e}")
 
     logger.info("Bot is running...")
-    await application.run_polling()
+    # chat_member updates are opt-in; the join handlers and channel membership cache rely on them.
+    await application.run_polling(allowed_updates=Update.ALL_TYPES)
 
 
 if __name__ == '__main__':
@@ -2,10 +2,12 @@ import re
 from telegram.ext import CommandHandler, MessageHandler, filters
 
 from .qa import ask_command
+from .cache import ensure_indexes
 from bot_core.registry import COMMAND_REGISTRY, HELP_REGISTRY
 
 def load_module(application):
     """Loads the AI module."""
+    ensure_indexes()
     # Register the /ask command
     COMMAND_REGISTRY["ask"] = {
         "module": "AI",
@@ -0,0 +1,92 @@
+import asyncio
+import hashlib
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from database.db import db
+
+ai_answers_collection = db["ai_answers"]
+
+ANSWER_TTL_SECONDS = 24 * 3600
+MAX_CACHED_ANSWERS = 1000
+
+# key -> (stored_at, answer), least recently used first
+_answers: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+# key -> future of the call currently answering that question
+_inflight: dict[str, asyncio.Future] = {}
+
+def ensure_indexes():
+    ai_answers_collection.create_index("created_at", expireAfterSeconds=ANSWER_TTL_SECONDS)
+
+def normalize_question(question: str) -> str:
+    """Folds case, width and spacing so trivially different phrasings share a cache entry."""
+    normalized = unicodedata.normalize("NFKC", question).casefold()
+    normalized = re.sub(r"\s+", " ", normalized).strip()
+    return normalized.rstrip("?!.。 ")
+
+def _cache_key(normalized: str) -> str:
+    return hashlib.sha1(normalized.encode()).hexdigest()
+
+def _remember(key: str, answer: str, stored_at: float):
+    _answers[key] = (stored_at, answer)
+    _answers.move_to_end(key)
+    while len(_answers) > MAX_CACHED_ANSWERS:
+        _answers.popitem(last=False)
+
+def _lookup(key: str) -> str | None:
+    cached = _answers.get(key)
+    if cached:
+        if time.time() - cached[0] < ANSWER_TTL_SECONDS:
+            _answers.move_to_end(key)
+            return cached[1]
+        del _answers[key]
+
+    # Mongo's TTL monitor only runs once a minute, so check the age here as well.
+    record = ai_answers_collection.find_one({"_id": key})
+    if not record: return None
+    stored_at = record["created_at"].replace(tzinfo=timezone.utc).timestamp()
+    if time.time() - stored_at >= ANSWER_TTL_SECONDS: return None
+    _remember(key, record["answer"], stored_at)
+    return record["answer"]
+
+def store_answer(question: str, answer: str):
+    """Caches an answer in memory and in Mongo."""
+    normalized = normalize_question(question)
+    key = _cache_key(normalized)
+    _remember(key, answer, time.time())
+    ai_answers_collection.update_one(
+        {"_id": key},
+        {"$set": {"question": normalized, "answer": answer, "created_at": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+
+async def get_answer(question: str, generate) -> str:
+    """
+    Returns a cached answer if there is one. Otherwise calls `generate(question)`;
+    concurrent askers of the same question wait for that one call instead of making their own.
+    """
+    key = _cache_key(normalize_question(question))
+    cached = _lookup(key)
+    if cached is not None: return cached
+
+    inflight = _inflight.get(key)
+    if inflight: return await asyncio.shield(inflight)
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        answer = await generate(question)
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # Mark as retrieved when nobody else was waiting
+        raise
+    else:
+        store_answer(question, answer)
+        future.set_result(answer)
+        return answer
+    finally:
+        _inflight.pop(key, None)
+        if not future.done(): future.cancel()  # Our call was cancelled; don't leave waiters hanging
@@ -0,0 +1,79 @@
+import asyncio
+from contextlib import aclosing
+
+from utils.config import GEMINI_API_KEY, AI_BACKEND
+
+# The Gemini SDK is only needed for the real backend; the stub works without it.
+try:
+    import google.generativeai as genai
+except ImportError:
+    genai = None
+
+MODEL_NAME = 'gemini-1.5-flash-latest'
+MAX_CONCURRENT_REQUESTS = 4  # Model calls in flight at once, across all chats
+
+class GeminiBackend:
+    """Wraps one GenerativeModel that is created once and reused for every question."""
+    name = "gemini"
+
+    def __init__(self, api_key: str):
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(MODEL_NAME)
+
+    async def generate(self, prompt: str) -> str:
+        response = await self.model.generate_content_async(prompt)
+        return response.text
+
+    async def stream(self, prompt: str):
+        response = await self.model.generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            if chunk.text: yield chunk.text
+
+class StubBackend:
+    """Offline backend for development and tests. Answers deterministically, streaming word by word."""
+    name = "stub"
+    chunk_delay = 0.05
+
+    async def generate(self, prompt: str) -> str:
+        return f"(stub answer) You asked: {prompt}"
+
+    async def stream(self, prompt: str):
+        for word in (await self.generate(prompt)).split(" "):
+            await asyncio.sleep(self.chunk_delay)
+            yield word + " "
+
+def _build_backend():
+    if AI_BACKEND == "stub":
+        return StubBackend()
+    if not GEMINI_API_KEY:
+        print("⚠️ GEMINI_API_KEY not found. AI Q&A feature will be disabled.")
+        return None
+    if genai is None:
+        print("⚠️ google-generativeai is not installed. AI Q&A feature will be disabled.")
+        return None
+    try:
+        return GeminiBackend(GEMINI_API_KEY)
+    except Exception as e:
+        print(f"Failed to configure Gemini API: {e}")
+        return None  # Disable feature if config fails
+
+backend = _build_backend()
+_limiter = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+def is_available() -> bool:
+    return backend is not None
+
+async def generate(prompt: str) -> str:
+    """Asks the configured backend, waiting for a free slot if too many calls are in flight."""
+    async with _limiter:
+        return await backend.generate(prompt)
+
+async def stream(prompt: str):
+    """
+    Like generate, but yields the answer in chunks as the backend produces them.
+    Consume it with contextlib.aclosing, so a consumer that stops early frees the slot at once.
+    """
+    async with _limiter:
+        async with aclosing(backend.stream(prompt)) as chunks:
+            async for chunk in chunks:
+                yield chunk
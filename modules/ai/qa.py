@@ -1,30 +1,33 @@
-import os
-import google.generativeai as genai
+from contextlib import aclosing
 from telegram import Update
 from telegram.ext import ContextTypes
 from telegram.constants import ChatAction, ParseMode
 
 # --- Local Imports ---
 from utils.decorators import check_disabled
-from utils.config import GEMINI_API_KEY
 from utils.formatters import escape_markdown_v2
+from utils.config import AI_STREAMING
+from . import client
+from .cache import get_answer
+from .streaming import StreamingReply
 
-# Configure the Gemini API client only if the key exists
-if GEMINI_API_KEY:
-    try:
-        genai.configure(api_key=GEMINI_API_KEY)
-    except Exception as e:
-        print(f"Failed to configure Gemini API: {e}")
-        GEMINI_API_KEY = None # Disable feature if config fails
-else:
-    print("⚠️ GEMINI_API_KEY not found. AI Q&A feature will be disabled.")
-
+async def _stream_into(reply: StreamingReply, question: str) -> str:
+    """
+    Streams a fresh answer into the reply and returns the full text for the cache.
+    Other askers of the same question wait on this call, so reply errors must not end it.
+    """
+    parts = []
+    async with aclosing(client.stream(question)) as chunks:
+        async for chunk in chunks:
+            parts.append(chunk)
+            await reply.feed(chunk)
+    return "".join(parts)
 
 # Command handler for /ask
 @check_disabled
 async def ask_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Answers a user's question using the Gemini AI model."""
-    if not GEMINI_API_KEY:
+    if not client.is_available():
         await update.message.reply_text("The AI Q&A feature is not configured by the bot owner.")
         return
 
@@ -37,20 +40,21 @@ async def ask_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     processing_message = await update.message.reply_text("🧠 Thinking...")
     await context.bot.send_chat_action(chat_id=update.effective_chat.id, action=ChatAction.TYPING)
 
+    reply = StreamingReply(processing_message)
     try:
-        # Using the latest, recommended model for chat applications.
-        model = genai.GenerativeModel('gemini-1.5-flash-latest')
-        
-        # Use generate_content_async for non-blocking API calls
-        response = await model.generate_content_async(question)
-        
-        # Edit the "Thinking..." message with the final answer.
-        # Use Markdown as Gemini often uses it for formatting.
-        await processing_message.edit_text(response.text, parse_mode=ParseMode.MARKDOWN)
+        # Repeated questions are served from the cache; identical questions asked
+        # at the same time share a single model call. A fresh answer is streamed
+        # into the reply as it is generated.
+        generate = (lambda q: _stream_into(reply, q)) if AI_STREAMING else client.generate
+        answer = await get_answer(question, generate)
+
+        # Cached or shared answers arrive whole; the reply still splits them past the length limit.
+        if reply.received: await reply.finish()
+        else: await reply.send_whole(answer)
         
     except Exception as e:
         # This block now safely handles errors from the API
         # It escapes the raw error message before sending it back.
         escaped_error = escape_markdown_v2(str(e))
         error_message = f"Sorry, I encountered an error while processing your request\\.\n\n`{escaped_error}`"
-        await processing_message.edit_text(error_message, parse_mode=ParseMode.MARKDOWN_V2)
+        await reply.message.edit_text(error_message, parse_mode=ParseMode.MARKDOWN_V2)
@@ -0,0 +1,84 @@
+import asyncio
+import time
+from telegram import Message
+from telegram.constants import ParseMode
+from telegram.error import BadRequest, RetryAfter, TelegramError
+
+MAX_MESSAGE_LENGTH = 4096
+EDIT_INTERVAL_SECONDS = 1.5  # Telegram throttles frequent edits of the same message
+CURSOR = " ▌"
+
+def _split(text: str, limit: int) -> tuple[str, str]:
+    """Cuts text at the last paragraph, line or word break before the limit."""
+    for separator in ("\n\n", "\n", " "):
+        cut = text.rfind(separator, 0, limit)
+        if cut > limit // 2:
+            return text[:cut], text[cut:].lstrip()
+    return text[:limit], text[limit:]
+
+class StreamingReply:
+    """
+    Shows an answer as it is generated by editing one reply message, no more often than
+    EDIT_INTERVAL_SECONDS. Past the length limit it finalises that message and continues in a new one.
+    """
+
+    def __init__(self, message: Message):
+        self.message = message
+        self.text = ""       # Text belonging to the current message
+        self.shown = ""      # What the current message displays right now
+        self.last_edit = 0.0
+        self.received = False
+        self.failed = False  # Set once the reply can't be edited (e.g. the user deleted it)
+
+    async def _roll_over(self):
+        limit = MAX_MESSAGE_LENGTH - len(CURSOR)
+        while len(self.text) > limit:
+            head, self.text = _split(self.text, limit)
+            await self._edit(head, final=True)
+            self.message = await self.message.reply_text("…")
+            self.shown = "…"
+
+    async def feed(self, chunk: str):
+        """Adds a streamed chunk, editing the message if the last edit was long enough ago."""
+        self.received = True
+        self.text += chunk
+        if self.failed: return
+        try:
+            await self._roll_over()
+            if time.monotonic() - self.last_edit >= EDIT_INTERVAL_SECONDS:
+                await self._edit(self.text + CURSOR)
+        except TelegramError as e:
+            # Keep consuming the stream: the answer is still cached and shared with other askers.
+            self.failed = True
+            print(f"Stopped updating a streamed AI reply: {e}")
+
+    async def send_whole(self, text: str):
+        """Shows a complete answer (e.g. from the cache) without intermediate edits."""
+        self.received = True
+        self.text += text
+        await self._roll_over()
+        await self.finish()
+
+    async def finish(self):
+        if self.failed: return
+        await self._edit(self.text, final=True)
+
+    async def _edit(self, text: str, final: bool = False):
+        if not text.strip() or text == self.shown: return
+        self.last_edit = time.monotonic()
+        try:
+            if final:
+                # Gemini often uses Markdown; partial text may have unbalanced markup, so only the final edit is parsed.
+                try:
+                    await self.message.edit_text(text, parse_mode=ParseMode.MARKDOWN)
+                except BadRequest:
+                    await self.message.edit_text(text)
+            else:
+                await self.message.edit_text(text)
+            self.shown = text
+        except RetryAfter as e:
+            if not final: return  # A later edit will catch up
+            await asyncio.sleep(e.retry_after.total_seconds() if hasattr(e.retry_after, "total_seconds") else e.retry_after)
+            await self._edit(text, final=True)
+        except BadRequest as e:
+            if "not modified" not in e.message.lower(): raise
@@ -2,7 +2,8 @@ import re
 from telegram.ext import CommandHandler, MessageHandler, ChatMemberHandler, filters
 
 from .commands import antiraid_command, handle_new_member # Import handlers
-from bot_core.registry import COMMAND_REGISTRY, HELP_REGISTRY
+from .state import invalidate_raid_settings
+from bot_core.registry import COMMAND_REGISTRY, HELP_REGISTRY, CHAT_CACHE_HOOKS
 
 def load_module(application):
     """Loads the AntiRaid module."""
@@ -30,5 +31,7 @@ def load_module(application):
             
     HELP_REGISTRY["AntiRaid"] = admin_cmds
     
-    # Add the main chat member handler to check all new joins
-    application.add_handler(ChatMemberHandler(handle_new_member, ChatMemberHandler.CHAT_MEMBER))
+    # Add the main chat member handler to check all new joins. It runs in its own earlier
+    # group so the raid state is settled before captcha and greetings see the join.
+    application.add_handler(ChatMemberHandler(handle_new_member, ChatMemberHandler.CHAT_MEMBER), group=-1)
+    CHAT_CACHE_HOOKS.append(lambda app, chat_id: invalidate_raid_settings(chat_id))
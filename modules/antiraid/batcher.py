@@ -0,0 +1,130 @@
+import asyncio
+import itertools
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from telegram import User
+from telegram.ext import ContextTypes
+from telegram.constants import ParseMode
+from telegram.error import RetryAfter
+
+from utils.moderation import execute_punishment
+from utils.time import humanize_delta
+from modules.log_channels.service import log_action
+from .state import get_cached_raid_settings, is_raid_active, set_raid_until
+from .detector import JoinRateDetector
+
+logger = logging.getLogger(__name__)
+
+BATCH_WINDOW_SECONDS = 0.5   # Joins arriving within this window are handled together
+ACTIONS_PER_SECOND = 20      # Ceiling for queued moderation calls across all chats
+LOG_MENTION_LIMIT = 20       # Users named individually in a raid summary
+
+# Lower numbers are served first.
+PRIORITY_HIGH = 0
+PRIORITY_RAID = 10
+
+# chat_id -> users waiting for the chat's next batch
+_pending_joins: dict[int, list[User]] = {}
+_punish_queue: asyncio.PriorityQueue | None = None
+_sequence = itertools.count()  # Keeps queue order FIFO within a priority
+
+# --- Punishment Queue ---
+async def _punishment_worker():
+    """Drains the queue at a steady rate, backing off whenever Telegram asks us to."""
+    while True:
+        priority, seq, context, chat_id, user_id, mode, duration, future = await _punish_queue.get()
+        try:
+            result = await execute_punishment(context, chat_id, user_id, mode, duration, raise_on_flood=True)
+        except RetryAfter as e:
+            retry_after = e.retry_after.total_seconds() if isinstance(e.retry_after, timedelta) else e.retry_after
+            await asyncio.sleep(retry_after)
+            await _punish_queue.put((priority, seq, context, chat_id, user_id, mode, duration, future))
+            continue
+        except Exception as e:
+            logger.error(f"Queued punishment for {user_id} in {chat_id} failed: {e}")
+            result = (False, f"An unexpected error occurred: {e}")
+        if not future.done(): future.set_result(result)
+        await asyncio.sleep(1 / ACTIONS_PER_SECOND)
+
+async def queue_punishment(context: ContextTypes.DEFAULT_TYPE, chat_id: int, user_id: int,
+                           mode: str, duration_seconds: int = 0, priority: int = PRIORITY_HIGH) -> tuple[bool, str]:
+    """
+    Like execute_punishment, but goes through the shared rate-limited queue.
+    Resolves to the same (success_status, action_string) once the action has run.
+    """
+    global _punish_queue
+    if _punish_queue is None:
+        _punish_queue = asyncio.PriorityQueue()
+        asyncio.create_task(_punishment_worker())
+    future = asyncio.get_running_loop().create_future()
+    await _punish_queue.put((priority, next(_sequence), context, chat_id, user_id, mode, duration_seconds, future))
+    return await future
+
+# --- Raid Detection ---
+async def _trigger_auto_raid(context: ContextTypes.DEFAULT_TYPE, chat_id: int, settings: dict, reason: str):
+    duration = timedelta(seconds=settings["raid_duration_seconds"])
+    set_raid_until(chat_id, datetime.now(timezone.utc) + duration)
+
+    human_duration = humanize_delta(duration)
+    msg = (f"🚨 <b>Auto-AntiRaid Triggered!</b> 🚨\n{reason} "
+           f"New joins will be temporarily banned for the next <b>{human_duration}</b>.")
+    await context.bot.send_message(chat_id, msg, parse_mode=ParseMode.HTML)
+    log_msg = (f"<b>#ANTIRAID_AUTO</b>\n"
+               f"<b>Trigger:</b> {reason}\n"
+               f"<b>Action:</b> Enabled for {human_duration}")
+    await log_action(context, chat_id, "settings", log_msg)
+
+def _detect_raid(context: ContextTypes.DEFAULT_TYPE, trigger: int) -> str | None:
+    """Feeds the join into the chat's rate detector; returns why a raid was detected, if it was."""
+    detector = context.chat_data.get("join_rate")
+    if detector is None:
+        detector = context.chat_data["join_rate"] = JoinRateDetector()
+    recent_joins = detector.record(time.time())
+
+    reason = None
+    if recent_joins >= trigger:
+        reason = f"{recent_joins} users joined in the last minute (limit: {trigger})."
+    elif detector.is_surge():
+        reason = f"{recent_joins} users joined in the last minute, far above this chat's usual rate."
+    if reason: detector.reset_window()
+    return reason
+
+# --- Join Batching ---
+async def enqueue_join(context: ContextTypes.DEFAULT_TYPE, chat_id: int, user: User):
+    """
+    Records a join. Raid state is decided right away (from memory) so other join
+    handlers can stand down, but the bans themselves are deferred to a per-chat batch.
+    """
+    settings = get_cached_raid_settings(chat_id)
+    if not is_raid_active(chat_id):
+        if settings["auto_antiraid_trigger"] <= 0: return
+        reason = _detect_raid(context, settings["auto_antiraid_trigger"])
+        if not reason: return
+        await _trigger_auto_raid(context, chat_id, settings, reason)
+
+    batch = _pending_joins.setdefault(chat_id, [])
+    batch.append(user)
+    if len(batch) == 1:  # First join of a new window schedules the flush
+        asyncio.create_task(_flush_after_window(context, chat_id))
+
+async def _flush_after_window(context: ContextTypes.DEFAULT_TYPE, chat_id: int):
+    await asyncio.sleep(BATCH_WINDOW_SECONDS)
+    users = _pending_joins.pop(chat_id, [])
+    # Raid state is evaluated once for the whole batch; an admin may have turned it off meanwhile.
+    if not users or not is_raid_active(chat_id): return
+
+    action_duration = get_cached_raid_settings(chat_id)["raid_action_duration_seconds"]
+    results = await asyncio.gather(*(
+        queue_punishment(context, chat_id, user.id, 'tban', action_duration, PRIORITY_RAID) for user in users
+    ))
+    punished = [(user, action_string) for user, (success, action_string) in zip(users, results) if success]
+    if not punished: return
+
+    mentions = "\n".join(f"• {user.mention_html()} (<code>{user.id}</code>)" for user, _ in punished[:LOG_MENTION_LIMIT])
+    if len(punished) > LOG_MENTION_LIMIT:
+        mentions += f"\n…and {len(punished) - LOG_MENTION_LIMIT} more."
+    log_msg = (f"<b>#ANTIRAID</b>\n"
+               f"<b>Action:</b> {len(punished)} user(s) {punished[0][1]} on join.\n"
+               f"<b>Users:</b>\n{mentions}")
+    await log_action(context, chat_id, "bans", log_msg, count=len(punished))
@@ -0,0 +1,76 @@
+import math
+
+BUCKET_SECONDS = 10
+WINDOW_BUCKETS = 6            # 6 x 10s buckets = the one-minute window the trigger is defined over
+BASELINE_HALF_LIFE = 360      # Buckets (one hour) for the baseline to forget half of its history
+WARMUP_BUCKETS = 360          # Don't judge deviations until an hour of history has been seen
+DEVIATION_SIGMAS = 4.0        # How far above the baseline a window must be to count as a surge...
+DEVIATION_RATIO = 3.0         # ...and how many times the expected rate, so busy chats don't trip it
+MIN_SURGE_JOINS = 10          # Never call fewer joins than this a surge
+
+_ALPHA = 1 - 0.5 ** (1 / BASELINE_HALF_LIFE)
+
+class JoinRateDetector:
+    """
+    Counts joins in a fixed ring of time buckets and keeps an exponentially weighted
+    mean and variance of joins per bucket as the chat's normal rate.
+    Recording a join is O(1); memory is constant per chat.
+    """
+    __slots__ = ("counts", "current", "window_total", "mean", "var", "observed")
+
+    def __init__(self):
+        self.counts = [0] * WINDOW_BUCKETS
+        self.current = None   # Absolute index of the bucket currently filling
+        self.window_total = 0
+        self.mean = 0.0
+        self.var = 0.0
+        self.observed = 0     # Closed buckets folded into the baseline
+
+    def _observe(self, count: int):
+        diff = count - self.mean
+        increment = _ALPHA * diff
+        self.mean += increment
+        self.var = (1 - _ALPHA) * (self.var + diff * increment)
+        self.observed += 1
+
+    def _advance(self, bucket: int):
+        if self.current is None:
+            self.current = bucket
+            return
+        steps = bucket - self.current
+        if steps <= 0: return
+        # Close buckets one by one while they can still hold joins; past a full window they are all empty.
+        for _ in range(min(steps, WINDOW_BUCKETS)):
+            self._observe(self.counts[self.current % WINDOW_BUCKETS])
+            self.current += 1
+            slot = self.current % WINDOW_BUCKETS
+            self.window_total -= self.counts[slot]
+            self.counts[slot] = 0
+        idle = steps - WINDOW_BUCKETS
+        if idle > 0:  # A long quiet spell: decay the baseline in closed form instead of looping
+            decay = (1 - _ALPHA) ** idle
+            self.mean *= decay
+            self.var *= decay
+            self.observed += idle
+            self.current = bucket
+
+    def record(self, now: float) -> int:
+        """Adds one join and returns the number of joins in the last minute."""
+        self._advance(int(now // BUCKET_SECONDS))
+        self.counts[self.current % WINDOW_BUCKETS] += 1
+        self.window_total += 1
+        return self.window_total
+
+    def is_surge(self) -> bool:
+        """Whether the last minute's joins deviate sharply from this chat's usual rate."""
+        if self.observed < WARMUP_BUCKETS or self.window_total < MIN_SURGE_JOINS:
+            return False
+        expected = self.mean * WINDOW_BUCKETS
+        spread = math.sqrt(self.var * WINDOW_BUCKETS)
+        return (self.window_total > expected + DEVIATION_SIGMAS * spread
+                and self.window_total >= DEVIATION_RATIO * expected)
+
+    def reset_window(self):
+        """Clears the current minute after a raid triggers, keeping the learned baseline."""
+        self.counts = [0] * WINDOW_BUCKETS
+        self.window_total = 0
@@ -0,0 +1,49 @@
+import time
+from datetime import datetime, timezone
+
+from database.db import db
+
+chat_settings_collection = db["chat_settings"]
+
+SETTINGS_TTL_SECONDS = 30  # How long a chat's raid settings are trusted from memory
+
+# chat_id -> (fetched_at, settings)
+_settings_cache: dict[int, tuple[float, dict]] = {}
+
+# --- Helper function to get settings ---
+def get_raid_settings(chat_id: int):
+    defaults = {
+        "manual_antiraid_until": None,
+        "raid_duration_seconds": 6 * 3600,  # 6 hours
+        "raid_action_duration_seconds": 1 * 3600,  # 1 hour
+        "auto_antiraid_trigger": 0,
+    }
+    settings = chat_settings_collection.find_one({"_id": chat_id}) or {}
+    defaults.update(settings)
+    return defaults
+
+def get_cached_raid_settings(chat_id: int) -> dict:
+    """Raid settings from memory, refreshed from the database at most every few seconds."""
+    cached = _settings_cache.get(chat_id)
+    if cached and time.time() - cached[0] < SETTINGS_TTL_SECONDS:
+        return cached[1]
+    settings = get_raid_settings(chat_id)
+    _settings_cache[chat_id] = (time.time(), settings)
+    return settings
+
+def invalidate_raid_settings(chat_id: int):
+    """Drops the cached settings after an admin changes them."""
+    _settings_cache.pop(chat_id, None)
+
+def is_raid_active(chat_id: int) -> bool:
+    """Whether antiraid is currently on for the chat. Used by other join handlers to stand down."""
+    until = get_cached_raid_settings(chat_id).get("manual_antiraid_until")
+    if not until: return False
+    if until.tzinfo is None:  # Mongo hands back naive UTC datetimes
+        until = until.replace(tzinfo=timezone.utc)
+    return until > datetime.now(timezone.utc)
+
+def set_raid_until(chat_id: int, expiry_time: datetime):
+    """Persists a new antiraid expiry and updates the cache immediately."""
+    chat_settings_collection.update_one({"_id": chat_id}, {"$set": {"manual_antiraid_until": expiry_time}}, upsert=True)
+    get_cached_raid_settings(chat_id)["manual_antiraid_until"] = expiry_time
@@ -1,14 +1,18 @@
 import re
 from telegram.ext import CommandHandler, MessageHandler, filters, ChatMemberHandler, CallbackQueryHandler
 
-from .commands import toggle_captcha, handle_new_member, handle_captcha_callback
-from bot_core.registry import COMMAND_REGISTRY, HELP_REGISTRY
+from .commands import toggle_captcha, set_captcha_mode, handle_new_member, handle_captcha_callback
+from .store import load_pending
+from .pool import refill_job, shutdown_pool, REFILL_INTERVAL_SECONDS
+from bot_core.registry import COMMAND_REGISTRY, HELP_REGISTRY, SHUTDOWN_HOOKS
 
 def load_module(application):
     """Loads the CAPTCHA module."""
+    load_pending()
+
     admin_cmds = {
         "captcha": "Enable or disable CAPTCHA for new members.",
-        "captchamode": "Set the CAPTCHA type (button/math).",
+        "captchamode": "Set the CAPTCHA type (button/math/image/text).",
         "captchakick": "Toggle kicking users who don't solve the CAPTCHA.",
         "captchakicktime": "Set the time after which to kick the user.",
         # ... other config commands
@@ -17,7 +21,7 @@ def load_module(application):
         COMMAND_REGISTRY[cmd] = {"module": "Captcha", "category": "admin", "help": help_text}
     HELP_REGISTRY["Captcha"] = admin_cmds
     
-    handlers = {"captcha": toggle_captcha} # Add other config handlers here
+    handlers = {"captcha": toggle_captcha, "captchamode": set_captcha_mode} # Add other config handlers here
     for cmd_name, handler_func in handlers.items():
         application.add_handler(CommandHandler(cmd_name, handler_func))
         application.add_handler(MessageHandler(
@@ -27,3 +31,7 @@ def load_module(application):
     # Add the core handlers
     application.add_handler(ChatMemberHandler(handle_new_member, ChatMemberHandler.CHAT_MEMBER))
     application.add_handler(CallbackQueryHandler(handle_captcha_callback, pattern="^captcha:"))
+
+    # Keep a pool of ready challenges so joins never wait on generation or rendering.
+    application.job_queue.run_repeating(refill_job, interval=REFILL_INTERVAL_SECONDS, first=1, name="captcha_pool_refill")
+    SHUTDOWN_HOOKS.append(shutdown_pool)
@@ -0,0 +1,17 @@
+import random
+
+from utils.captcha_render import (
+    math_options, generate_image_math, generate_image_text, reseed_worker, IMAGE_CAPTCHAS_AVAILABLE
+)
+
+# A challenge is a plain, picklable dict (see utils.captcha_render); the image modes live
+# there so render workers never import this package.
+
+def generate_button(button_text: str) -> dict:
+    return {"mode": "button", "text": "Please prove you're human by clicking the button below.",
+            "answer": "solve", "options": [(button_text, "solve")], "image": None}
+
+def generate_math() -> dict:
+    a, b = random.randint(1, 10), random.randint(1, 10)
+    return {"mode": "math", "text": f"To prove you're human, please solve: <b>{a} + {b} = ?</b>",
+            "answer": str(a + b), "options": math_options(a + b), "image": None}
@@ -1,5 +1,5 @@
 import random
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timedelta
 from telegram import Update, ChatPermissions, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 from telegram.constants import ParseMode, ChatMemberStatus
@@ -9,9 +9,17 @@ from utils.decorators import admin_only
 from utils.context import resolve_target_chat_id
 # Import the full formatting pipeline for welcome messages
 from utils.formatters import select_random, apply_fillings, parse_buttons, extract_send_options
+from .store import add_pending, get_pending, pop_pending
+from .challenges import generate_button, generate_math, IMAGE_CAPTCHAS_AVAILABLE
+from .pool import take_challenge
+from modules.antiraid.state import is_raid_active
 
 chat_settings_collection = db["chat_settings"]
-pending_captchas_collection = db["pending_captchas"]
+
+MAX_CAPTION_LENGTH = 1024  # Telegram's limit for photo captions (message texts allow 4096)
+UNMUTED_PERMISSIONS = ChatPermissions(
+    can_send_messages=True, can_send_media_messages=True,
+    can_send_other_messages=True, can_add_web_page_previews=True)
 
 # --- Job Queue Callbacks for Timeouts ---
 async def _kick_user_job(context: ContextTypes.DEFAULT_TYPE):
@@ -20,7 +28,7 @@ async def _kick_user_job(context: ContextTypes.DEFAULT_TYPE):
     chat_id, user_id = job_data['chat_id'], job_data['user_id']
     
     # Find and delete the pending record. If it exists, the user hasn't solved it.
-    pending_user = pending_captchas_collection.find_one_and_delete({"chat_id": chat_id, "user_id": user_id})
+    pending_user = pop_pending(chat_id, user_id)
     if pending_user:
         try:
             # Kick is a temporary ban
@@ -31,24 +39,20 @@ async def _kick_user_job(context: ContextTypes.DEFAULT_TYPE):
             print(f"Error in kick job: {e}")
 
 # --- CAPTCHA Generation Logic ---
-def generate_captcha(mode: str, button_text: str):
-    """Generates the text, keyboard, and correct answer for a given CAPTCHA mode."""
-    if mode == "math":
-        a, b = random.randint(1, 10), random.randint(1, 10)
-        correct_answer = a + b
-        answers = {correct_answer}
-        while len(answers) < 4: answers.add(random.randint(2, 20))
-        
-        shuffled_answers = random.sample(list(answers), len(answers))
-        buttons = [InlineKeyboardButton(str(ans), callback_data=f"captcha:answer:{ans}") for ans in shuffled_answers]
-        keyboard = InlineKeyboardMarkup([buttons])
-        text = f"To prove you're human, please solve: **{a} + {b} = ?**"
-        return text, keyboard, str(correct_answer)
-        
-    # Default to button mode
-    text = "Please prove you're human by clicking the button below."
-    keyboard = InlineKeyboardMarkup([[InlineKeyboardButton(button_text, callback_data="captcha:answer:solve")]])
-    return text, keyboard, "solve"
+CAPTCHA_MODES = ["button", "math", "image", "text"]
+
+def get_challenge(mode: str, button_text: str) -> dict:
+    """
+    Returns a challenge for the mode. Pooled modes pop a pre-generated one; if that pool
+    is drained (e.g. mid-raid), a cheap math challenge is used so the join never waits on rendering.
+    """
+    if mode == "button":
+        return generate_button(button_text)
+    return take_challenge(mode) or generate_math()
+
+def build_keyboard(challenge: dict) -> InlineKeyboardMarkup:
+    buttons = [InlineKeyboardButton(label, callback_data=f"captcha:answer:{value}") for label, value in challenge["options"]]
+    return InlineKeyboardMarkup([buttons])
 
 # --- Core Handlers ---
 async def handle_new_member(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -62,7 +66,9 @@ async def handle_new_member(update: Update, context: ContextTypes.DEFAULT_TYPE):
     is_join = (new_member_update.new_chat_member.status == ChatMemberStatus.MEMBER 
                and new_member_update.old_chat_member.status == ChatMemberStatus.LEFT)
     if not is_join or new_user.is_bot: return
-        
+    # During a raid the joiner is being banned anyway; don't spend API calls challenging them.
+    if is_raid_active(chat.id): return
+
     settings = chat_settings_collection.find_one({"_id": chat.id}) or {}
     if not settings.get("captcha_enabled", False):
         return
@@ -82,23 +88,38 @@ async def handle_new_member(update: Update, context: ContextTypes.DEFAULT_TYPE):
     filled_welcome = apply_fillings(chosen_welcome, update)
 
     # --- Send CAPTCHA and schedule jobs ---
-    captcha_text, keyboard, correct_answer = generate_captcha(
+    challenge = get_challenge(
         settings.get("captcha_mode", "button"), 
         settings.get("captcha_button_text", "I am not a bot")
     )
     
-    full_message_text = f"{filled_welcome}\n\n{captcha_text}"
+    full_message_text = f"{filled_welcome}\n\n{challenge['text']}"
+    keyboard = build_keyboard(challenge)
     
-    sent_message = await context.bot.send_message(
-        chat.id, text=full_message_text, reply_markup=keyboard, parse_mode=ParseMode.HTML
-    )
+    try:
+        if challenge["image"]:
+            caption = full_message_text
+            if len(caption) > MAX_CAPTION_LENGTH:
+                # A long welcome doesn't fit in a caption; send it on its own and caption only the challenge.
+                await context.bot.send_message(chat.id, text=filled_welcome, parse_mode=ParseMode.HTML)
+                caption = challenge["text"]
+            sent_message = await context.bot.send_photo(
+                chat.id, photo=challenge["image"], caption=caption, reply_markup=keyboard, parse_mode=ParseMode.HTML
+            )
+        else:
+            sent_message = await context.bot.send_message(
+                chat.id, text=full_message_text, reply_markup=keyboard, parse_mode=ParseMode.HTML
+            )
+    except Exception as e:
+        # Without a challenge the user could never unmute themselves, so lift the restriction.
+        print(f"Failed to send CAPTCHA, unmuting user: {e}")
+        try:
+            await context.bot.restrict_chat_member(chat.id, new_user.id, UNMUTED_PERMISSIONS)
+        except Exception as e:
+            print(f"Failed to unmute user after CAPTCHA error: {e}")
+        return
     
-    pending_captchas_collection.insert_one({
-        "chat_id": chat.id, "user_id": new_user.id,
-        "captcha_message_id": sent_message.message_id,
-        "correct_answer": correct_answer,
-        "created_at": datetime.now(timezone.utc)
-    })
+    add_pending(chat.id, new_user.id, sent_message.message_id, challenge["answer"])
 
     kick_time = settings.get("captcha_kicktime_seconds", 300) # Default 5 mins
     if settings.get("captcha_kick", True) and kick_time > 0:
@@ -114,7 +135,7 @@ async def handle_captcha_callback(update: Update, context: ContextTypes.DEFAULT_
     user_id_to_check = int(query.from_user.id)
     chat_id = query.message.chat.id
     
-    pending_user = pending_captchas_collection.find_one({"chat_id": chat_id, "user_id": user_id_to_check})
+    pending_user = get_pending(chat_id, user_id_to_check)
     if not pending_user:
         await query.answer("This CAPTCHA is not for you or has expired.", show_alert=True)
         return
@@ -125,15 +146,13 @@ async def handle_captcha_callback(update: Update, context: ContextTypes.DEFAULT_
         await query.answer("Correct! Welcome.", show_alert=False)
         try:
             # Unmute the user with full permissions
-            await context.bot.restrict_chat_member(chat_id, user_id_to_check, ChatPermissions(
-                can_send_messages=True, can_send_media_messages=True, 
-                can_send_other_messages=True, can_add_web_page_previews=True))
+            await context.bot.restrict_chat_member(chat_id, user_id_to_check, UNMUTED_PERMISSIONS)
             await query.message.delete()
             
-            # Clean up scheduled jobs and DB record
+            # Clean up scheduled jobs and the pending record
             job_name = f"captchakick_{chat_id}_{user_id_to_check}"
             for job in context.job_queue.get_jobs_by_name(job_name): job.schedule_removal()
-            pending_captchas_collection.delete_one({"_id": pending_user["_id"]})
+            pop_pending(chat_id, user_id_to_check)
         except Exception as e:
             print(f"Error during CAPTCHA success cleanup: {e}")
     else:
@@ -155,3 +174,18 @@ async def toggle_captcha(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
     status = "enabled" if enabled else "disabled"
     await update.message.reply_text(f"✅ CAPTCHA has been **{status}**.", parse_mode=ParseMode.HTML)
+
+@admin_only
+async def set_captcha_mode(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Sets the CAPTCHA type for the chat."""
+    chat_id = await resolve_target_chat_id(update, context)
+    mode = context.args[0].lower() if context.args else ""
+    if mode not in CAPTCHA_MODES:
+        await update.message.reply_text(f"Usage: `/captchamode <{'/'.join(CAPTCHA_MODES)}>`")
+        return
+    if mode in ["image", "text"] and not IMAGE_CAPTCHAS_AVAILABLE:
+        await update.message.reply_text("Image CAPTCHAs are not available on this bot instance.")
+        return
+
+    chat_settings_collection.update_one({"_id": chat_id}, {"$set": {"captcha_mode": mode}}, upsert=True)
+    await update.message.reply_text(f"✅ CAPTCHA mode set to <b>{mode}</b>.", parse_mode=ParseMode.HTML)
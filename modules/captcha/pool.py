@@ -0,0 +1,70 @@
+import asyncio
+import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from telegram.ext import ContextTypes
+
+from .challenges import (
+    generate_math, generate_image_math, generate_image_text, reseed_worker, IMAGE_CAPTCHAS_AVAILABLE
+)
+
+logger = logging.getLogger(__name__)
+
+POOL_TARGET = 30              # Ready challenges kept per mode
+REFILL_INTERVAL_SECONDS = 2
+RENDER_WORKERS = 2
+
+# mode -> (generator, needs a worker process)
+POOLED_MODES = {"math": (generate_math, False)}
+if IMAGE_CAPTCHAS_AVAILABLE:
+    POOLED_MODES.update({"image": (generate_image_math, True), "text": (generate_image_text, True)})
+
+_pools: dict[str, deque] = {mode: deque() for mode in POOLED_MODES}
+_executor: ProcessPoolExecutor | None = None
+_refilling = False
+
+def _get_executor() -> ProcessPoolExecutor:
+    """
+    Workers are never forked from the bot itself: forking a process that runs pymongo monitor
+    threads and the keep-alive server can deadlock the child on locks held at fork time.
+    """
+    global _executor
+    if _executor is None:
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _executor = ProcessPoolExecutor(max_workers=RENDER_WORKERS, initializer=reseed_worker,
+                                        mp_context=multiprocessing.get_context(method))
+    return _executor
+
+def take_challenge(mode: str) -> dict | None:
+    """Pops a ready challenge for the mode, or None if that pool is empty or unsupported."""
+    pool = _pools.get(mode)
+    return pool.popleft() if pool else None
+
+async def refill_job(context: ContextTypes.DEFAULT_TYPE):
+    """Repeating job that tops every pool back up, rendering images off the event loop."""
+    global _refilling
+    if _refilling: return  # A slow render round is still in progress
+    _refilling = True
+    try:
+        loop = asyncio.get_running_loop()
+        for mode, (generator, needs_worker) in POOLED_MODES.items():
+            missing = POOL_TARGET - len(_pools[mode])
+            if missing <= 0: continue
+            if not needs_worker:
+                _pools[mode].extend(generator() for _ in range(missing))
+                continue
+            results = await asyncio.gather(
+                *(loop.run_in_executor(_get_executor(), generator) for _ in range(missing)),
+                return_exceptions=True
+            )
+            for result in results:
+                if isinstance(result, dict): _pools[mode].append(result)
+                else: logger.error(f"Failed to render a {mode} CAPTCHA: {result}")
+    finally:
+        _refilling = False
+
+async def shutdown_pool(application):
+    """Shutdown hook that stops the render worker processes."""
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
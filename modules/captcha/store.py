@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta, timezone
+
+from database.db import db
+
+pending_captchas_collection = db["pending_captchas"]
+
+# Records outlive any sensible kick time, then Mongo's TTL monitor removes them even if
+# the kick job was lost (e.g. the bot restarted while the user was pending).
+PENDING_TTL_SECONDS = 24 * 3600
+
+# (chat_id, user_id) -> pending record; the source of truth for callback verification
+_pending: dict[tuple[int, int], dict] = {}
+
+def _remove_duplicates():
+    """Keeps only the newest record per (chat_id, user_id); older code inserted one per join."""
+    duplicates = pending_captchas_collection.aggregate([
+        {"$sort": {"created_at": -1}},
+        {"$group": {"_id": {"chat_id": "$chat_id", "user_id": "$user_id"}, "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ], allowDiskUse=True)
+    for group in duplicates:
+        pending_captchas_collection.delete_many({"_id": {"$in": group["ids"][1:]}})
+
+def load_pending():
+    """Creates the TTL index and warms the in-memory index from unexpired Mongo records."""
+    pending_captchas_collection.create_index("created_at", expireAfterSeconds=PENDING_TTL_SECONDS)
+    _remove_duplicates()
+    pending_captchas_collection.create_index([("chat_id", 1), ("user_id", 1)], unique=True)
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=PENDING_TTL_SECONDS)
+    for record in pending_captchas_collection.find({"created_at": {"$gte": cutoff}}):
+        created_at = record["created_at"].replace(tzinfo=timezone.utc)
+        _pending[(record["chat_id"], record["user_id"])] = {**record, "created_at": created_at}
+
+def add_pending(chat_id: int, user_id: int, captcha_message_id: int, correct_answer: str):
+    """Registers a user as pending in memory and mirrors the record to Mongo."""
+    record = {
+        "chat_id": chat_id, "user_id": user_id,
+        "captcha_message_id": captcha_message_id,
+        "correct_answer": correct_answer,
+        "created_at": datetime.now(timezone.utc),
+    }
+    _pending[(chat_id, user_id)] = record
+    # Replace any stale record from an earlier join so the unique index holds.
+    pending_captchas_collection.replace_one({"chat_id": chat_id, "user_id": user_id}, dict(record), upsert=True)
+
+def get_pending(chat_id: int, user_id: int) -> dict | None:
+    """Looks up a pending CAPTCHA in memory only; expired records count as missing."""
+    record = _pending.get((chat_id, user_id))
+    if record and datetime.now(timezone.utc) - record["created_at"] > timedelta(seconds=PENDING_TTL_SECONDS):
+        _pending.pop((chat_id, user_id), None)
+        return None
+    return record
+
+def pop_pending(chat_id: int, user_id: int) -> dict | None:
+    """Removes and returns a pending CAPTCHA, from memory and Mongo."""
+    record = _pending.pop((chat_id, user_id), None)
+    if record:
+        pending_captchas_collection.delete_one({"chat_id": chat_id, "user_id": user_id})
+    return record
@@ -1,13 +1,12 @@
-import re
 from telegram import Update
 from telegram.ext import ContextTypes
 from telegram.constants import ParseMode
 from telegram.error import BadRequest
 
-from bot_core.registry import COMMAND_REGISTRY
 from database.db import db
 from utils.decorators import admin_only
 from utils.context import resolve_target_chat_id
+from utils.command_policy import get_command_policy, invalidate_command_policy, parse_command
 
 chat_settings_collection = db["chat_settings"]
 VALID_TYPES = ["all", "admin", "user", "other"]
@@ -19,39 +18,11 @@ async def clean_command_listener(update: Update, context: ContextTypes.DEFAULT_T
     if not chat:
         return
 
-    settings = chat_settings_collection.find_one({"_id": chat.id}) or {}
-    clean_types = settings.get("clean_command_settings", [])
-    
-    if not clean_types:
-        return
-
-    # Eagerly delete if 'all' is set
-    if "all" in clean_types:
+    if get_command_policy(chat.id).should_clean(parse_command(update)):
         try:
             await update.message.delete()
         except BadRequest:
             pass # Bot may not have delete permissions
-        return
-
-    # Extract command from message text (e.g., /ban@YourBot -> ban)
-    command_match = re.match(r"[!/](\w+)", update.message.text)
-    if not command_match:
-        return
-    command = command_match.group(1).lower()
-
-    category_to_clean = None
-    if command in COMMAND_REGISTRY:
-        # Command is known to our bot, find its category
-        category_to_clean = COMMAND_REGISTRY[command].get("category", "user")
-    else:
-        # Command is not in our registry, so it's for another bot or invalid
-        category_to_clean = 'other'
-
-    if category_to_clean in clean_types:
-        try:
-            await update.message.delete()
-        except BadRequest:
-            pass
 
 # --- Admin Commands ---
 @admin_only
@@ -73,6 +44,7 @@ async def set_clean_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         {"$addToSet": {"clean_command_settings": {"$each": args}}},
         upsert=True
     )
+    invalidate_command_policy(target_chat_id)
     await update.message.reply_text(f"✅ Now cleaning commands of type: `{'`, `'.join(args)}`.", parse_mode=ParseMode.MARKDOWN_V2)
 
 @admin_only
@@ -88,6 +60,7 @@ async def keep_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         {"_id": target_chat_id},
         {"$pullAll": {"clean_command_settings": args}},
     )
+    invalidate_command_policy(target_chat_id)
     await update.message.reply_text(f"✅ No longer cleaning commands of type: `{'`, `'.join(args)}`.", parse_mode=ParseMode.MARKDOWN_V2)
     
 @admin_only
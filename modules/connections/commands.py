@@ -4,8 +4,8 @@ from telegram.constants import ParseMode, ChatMemberStatus
 from telegram.error import BadRequest
 
 from utils.decorators import check_disabled
-from utils.permissions import is_user_admin
 from utils.context import resolve_target_chat_id
+from utils.connections import get_chat_info, check_admin
 
 async def connect_chat(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Connect to another chat to manage it remotely."""
@@ -25,25 +25,29 @@ async def connect_chat(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # Convert to int if it's a numeric ID
         if target_chat_identifier.lstrip('-').isdigit():
             target_chat_identifier = int(target_chat_identifier)
-        target_chat = await context.bot.get_chat(target_chat_identifier)
+        target_chat = await get_chat_info(context, target_chat_identifier)
     except BadRequest:
         await update.message.reply_text("Could not find that chat. Make sure the ID/username is correct and I am an admin there.")
         return
 
-    # Security Check 1: User must be an admin in the target chat.
-    if not await is_user_admin(context, target_chat.id, user.id):
+    # Security Check 1: User must be an admin in the target chat. Always asked fresh; later commands reuse the answer.
+    try:
+        is_admin = await check_admin(context, user.id, target_chat.id)
+    except Exception as e:
+        print(f"Could not check admin status of {user.id} in {target_chat.id}: {e}")
+        await update.message.reply_text("I couldn't check your admin status right now. Please try again in a moment.")
+        return
+    if not is_admin:
         await update.message.reply_text(f"You don't have permission to connect to **{target_chat.title}** because you are not an admin there.", parse_mode=ParseMode.HTML)
         return
         
     # Security Check 2: Bot must be an admin in the target chat.
-    try:
-        me_member = await target_chat.get_member(context.bot.id)
-        if me_member.status != ChatMemberStatus.ADMINISTRATOR:
-            await update.message.reply_text(f"I am not an admin in **{target_chat.title}**, so I cannot be managed from here.", parse_mode=ParseMode.HTML)
-            return
-    except BadRequest:
+    if target_chat.bot_status is None:
          await update.message.reply_text(f"I don't seem to be a member of **{target_chat.title}**.", parse_mode=ParseMode.HTML)
          return
+    if target_chat.bot_status != ChatMemberStatus.ADMINISTRATOR:
+        await update.message.reply_text(f"I am not an admin in **{target_chat.title}**, so I cannot be managed from here.", parse_mode=ParseMode.HTML)
+        return
 
     # All checks passed, store the connection in user_data
     context.user_data['connected_chat_id'] = target_chat.id
@@ -6,6 +6,7 @@ from bot_core.registry import COMMAND_REGISTRY
 from database.db import db
 from utils.decorators import admin_only
 from utils.context import resolve_target_chat_id
+from utils.command_policy import invalidate_command_policy
 
 chat_settings_collection = db["chat_settings"]
 
@@ -46,6 +47,7 @@ async def disable_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         {"$addToSet": {"disabled_commands": {"$each": cmds_to_disable}}},
         upsert=True
     )
+    invalidate_command_policy(target_chat_id)
     await update.message.reply_text(f"✅ Disabled commands: `{'`, `'.join(cmds_to_disable)}`.", parse_mode=ParseMode.MARKDOWN_V2)
 
 @admin_only
@@ -67,6 +69,7 @@ async def enable_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             {"_id": target_chat_id},
             {"$set": {"disabled_commands": []}}
         )
+    invalidate_command_policy(target_chat_id)
 
     await update.message.reply_text(f"✅ Enabled commands: `{'`, `'.join(args)}`.", parse_mode=ParseMode.MARKDOWN_V2)
 
@@ -106,6 +109,7 @@ async def set_disabled_delete(update: Update, context: ContextTypes.DEFAULT_TYPE
     chat_settings_collection.update_one(
         {"_id": target_chat_id}, {"$set": {"disable_delete": setting}}, upsert=True
     )
+    invalidate_command_policy(target_chat_id)
     status = "will now be deleted" if setting else "will be ignored"
     await update.message.reply_text(f"Used disabled commands {status}.")
 
@@ -122,5 +126,6 @@ async def set_disable_admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_settings_collection.update_one(
         {"_id": target_chat_id}, {"$set": {"disable_admin": setting}}, upsert=True
     )
+    invalidate_command_policy(target_chat_id)
     status = "now affects admins" if setting else "no longer affects admins"
     await update.message.reply_text(f"Disabled commands list {status}.")
@@ -2,6 +2,7 @@ import re
 from telegram.ext import CommandHandler, MessageHandler, filters
 
 from .commands import echo, broadcast
+from .broadcast import resume_broadcasts_job
 from bot_core.registry import COMMAND_REGISTRY, HELP_REGISTRY
 
 def load_module(application):
@@ -25,3 +26,6 @@ def load_module(application):
             filters.Regex(rf'^{re.escape("!")}{cmd_name}(\s|$)'),
             handler_func
         ))
+
+    # Pick up any broadcast that was interrupted by a restart.
+    application.job_queue.run_once(resume_broadcasts_job, 5, name="resume_broadcasts")
@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from telegram import Bot, MessageEntity
+from telegram.ext import ContextTypes
+from telegram.error import BadRequest, ChatMigrated, Forbidden, RetryAfter
+
+from database.db import db
+
+logger = logging.getLogger(__name__)
+
+bot_chats_collection = db["bot_chats"]
+broadcasts_collection = db["broadcasts"]
+
+MESSAGES_PER_SECOND = 25  # Stay under the Bot API's ~30 messages/second global limit
+WORKERS = 25              # Concurrent sends in flight
+CHUNK_SIZE = 200          # Chats per checkpoint; at most one chunk is resent after a restart
+MAX_RETRIES = 3
+
+# Error fragments meaning the chat is gone for good and should leave the broadcast list.
+PRUNE_ERRORS = ("bot was kicked", "bot was blocked", "chat not found", "user is deactivated",
+                "bot is not a member", "chat was deleted")
+
+class _RateLimiter:
+    """Spaces out sends to a fixed rate and lets a 429 pause every worker at once."""
+
+    def __init__(self, rate: float):
+        self._interval = 1 / rate
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self._interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds: float):
+        self._next_slot = max(self._next_slot, time.monotonic() + seconds)
+
+def _retry_after_seconds(error: RetryAfter) -> float:
+    retry_after = error.retry_after
+    return retry_after.total_seconds() if isinstance(retry_after, timedelta) else float(retry_after)
+
+def _move_chat(old_chat_id: int, new_chat_id: int):
+    """Re-keys a stored chat after its group was upgraded to a supergroup."""
+    doc = bot_chats_collection.find_one_and_delete({"_id": old_chat_id})
+    fields = {key: value for key, value in (doc or {}).items() if key != "_id"}
+    bot_chats_collection.replace_one({"_id": new_chat_id}, fields, upsert=True)
+
+async def _send_one(bot: Bot, limiter: _RateLimiter, chat_id: int, text: str, entities: list) -> str:
+    """
+    Sends to one chat. Returns 'sent', 'failed' or 'pruned'. A group that was upgraded to a
+    supergroup is moved to its new ID and sent to there.
+    """
+    for _ in range(MAX_RETRIES):
+        await limiter.wait()
+        try:
+            await bot.send_message(chat_id, text=text, entities=entities)
+            return "sent"
+        except RetryAfter as e:
+            limiter.pause(_retry_after_seconds(e))
+        except ChatMigrated as e:
+            _move_chat(chat_id, e.new_chat_id)
+            chat_id = e.new_chat_id
+        except (Forbidden, BadRequest) as e:
+            if any(fragment in e.message.lower() for fragment in PRUNE_ERRORS):
+                bot_chats_collection.delete_one({"_id": chat_id})
+                return "pruned"
+            logger.warning(f"Failed to broadcast to {chat_id}: {e.message}")
+            return "failed"
+        except Exception as e:
+            logger.warning(f"Failed to broadcast to {chat_id}: {e}")
+            return "failed"
+    return "failed"
+
+def create_broadcast(owner_chat_id: int, text: str, entities: list):
+    """Stores a new broadcast job and returns its ID."""
+    result = broadcasts_collection.insert_one({
+        "owner_chat_id": owner_chat_id, "text": text,
+        "entities": [entity.to_dict() for entity in entities or []],
+        "status": "running", "last_chat_id": None,
+        "sent": 0, "failed": 0, "pruned": 0,
+        "created_at": datetime.now(timezone.utc),
+    })
+    return result.inserted_id
+
+async def run_broadcast(bot: Bot, broadcast_id):
+    """
+    Streams chat IDs in _id order and sends in concurrent, rate-limited chunks.
+    Progress is checkpointed after each chunk so a restart resumes where it stopped.
+    """
+    job = broadcasts_collection.find_one({"_id": broadcast_id})
+    if not job or job["status"] != "running": return
+
+    entities = [MessageEntity.de_json(e, bot) for e in job.get("entities", [])]
+    limiter = _RateLimiter(MESSAGES_PER_SECOND)
+    workers = asyncio.Semaphore(WORKERS)
+    counts = {key: job.get(key, 0) for key in ("sent", "failed", "pruned")}
+
+    async def worker(chat_id: int):
+        async with workers:
+            counts[await _send_one(bot, limiter, chat_id, job["text"], entities)] += 1
+
+    query = {"_id": {"$gt": job["last_chat_id"]}} if job.get("last_chat_id") is not None else {}
+    cursor = bot_chats_collection.find(query, {"_id": 1}).sort("_id", 1).batch_size(CHUNK_SIZE)
+
+    chunk = []
+    for doc in cursor:
+        chunk.append(doc["_id"])
+        if len(chunk) < CHUNK_SIZE: continue
+        await asyncio.gather(*(worker(chat_id) for chat_id in chunk))
+        broadcasts_collection.update_one({"_id": broadcast_id}, {"$set": {"last_chat_id": chunk[-1], **counts}})
+        chunk = []
+    if chunk:
+        await asyncio.gather(*(worker(chat_id) for chat_id in chunk))
+
+    broadcasts_collection.update_one({"_id": broadcast_id}, {"$set": {"status": "done", **counts}})
+    await bot.send_message(
+        job["owner_chat_id"],
+        f"Broadcast finished.\n✅ Success: {counts['sent']}\n❌ Failures: {counts['failed']}\n"
+        f"🧹 Removed dead chats: {counts['pruned']}"
+    )
+
+async def resume_broadcasts_job(context: ContextTypes.DEFAULT_TYPE):
+    """One-off job on startup that resumes broadcasts interrupted by a restart."""
+    for job in broadcasts_collection.find({"status": "running"}, {"_id": 1, "owner_chat_id": 1}):
+        logger.info(f"Resuming broadcast {job['_id']}")
+        try:
+            await context.bot.send_message(job["owner_chat_id"], "♻️ Resuming an interrupted broadcast.")
+        except Exception:
+            pass
+        asyncio.create_task(run_broadcast(context.bot, job["_id"]))
@@ -6,9 +6,7 @@ from telegram.constants import ParseMode
 from bot_core.registry import COMMAND_REGISTRY, HELP_REGISTRY
 from utils.decorators import admin_only, owner_only
 from utils.context import resolve_target_chat_id
-from database.db import db
-
-bot_chats_collection = db["bot_chats"]
+from .broadcast import create_broadcast, run_broadcast, bot_chats_collection
 
 # --- Helper to extract text and entities ---
 def _extract_text_and_entities(message: Update.message):
@@ -37,33 +35,6 @@ def _extract_text_and_entities(message: Update.message):
     
     return final_text, adjusted_entities
 
-# --- Broadcast Background Task ---
-async def _broadcast_task(context: ContextTypes.DEFAULT_TYPE, owner_chat_id: int, text: str, entities: list):
-    """The background task that performs the broadcast."""
-    all_chats = list(bot_chats_collection.find({}, {"_id": 1}))
-    chat_ids = [chat["_id"] for chat in all_chats]
-    
-    if not chat_ids:
-        await context.bot.send_message(owner_chat_id, "I'm not in any chats to broadcast to!")
-        return
-
-    success_count = 0
-    failure_count = 0
-    
-    for chat_id in chat_ids:
-        try:
-            await context.bot.send_message(chat_id, text=text, entities=entities)
-            success_count += 1
-        except Exception as e:
-            failure_count += 1
-            print(f"Failed to broadcast to {chat_id}: {e}")
-        await asyncio.sleep(0.1) # Avoid hitting API rate limits
-
-    await context.bot.send_message(
-        owner_chat_id,
-        f"Broadcast finished.\n✅ Success: {success_count}\n❌ Failures: {failure_count}"
-    )
-
 # --- Command Handlers ---
 @admin_only
 async def echo(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -91,8 +62,11 @@ async def broadcast(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("There's nothing to broadcast!")
         return
         
+    if not bot_chats_collection.find_one({}, {"_id": 1}):
+        await update.message.reply_text("I'm not in any chats to broadcast to!")
+        return
+
     await update.message.reply_text("✅ Starting broadcast in the background. I'll send another message when it's complete.")
     
-    asyncio.create_task(
-        _broadcast_task(context, update.effective_chat.id, text, entities)
-    )
+    broadcast_id = create_broadcast(update.effective_chat.id, text, entities)
+    asyncio.create_task(run_broadcast(context.bot, broadcast_id))
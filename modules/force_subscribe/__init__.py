@@ -1,7 +1,8 @@
 import re
-from telegram.ext import CommandHandler, MessageHandler, filters, CallbackQueryHandler
+from telegram.ext import CommandHandler, MessageHandler, filters, CallbackQueryHandler, ChatMemberHandler
 
 from .commands import forcesub_add, check_subscription, verify_subscription_callback #, other_commands...
+from .membership import track_channel_member
 from bot_core.registry import COMMAND_REGISTRY, HELP_REGISTRY
 
 def load_module(application):
@@ -35,3 +36,5 @@ def load_module(application):
     # The listener runs in an early group to block messages before other modules act on them.
     application.add_handler(MessageHandler(filters.ALL & ~filters.COMMAND, check_subscription), group=6)
     application.add_handler(CallbackQueryHandler(verify_subscription_callback, pattern="^forcesub:verify:"))
+    # Channel joins/leaves keep the membership cache fresh. Group 6 keeps it clear of the group-chat join handlers.
+    application.add_handler(ChatMemberHandler(track_channel_member, ChatMemberHandler.CHAT_MEMBER), group=6)
@@ -7,23 +7,14 @@ from database.db import db
 from utils.decorators import admin_only
 from utils.permissions import is_user_admin, is_user_approved
 from utils.context import resolve_target_chat_id
+from .membership import is_subscribed_to_all
 
 chat_settings_collection = db["chat_settings"]
 
 # --- Helper to check subscription status ---
-async def _is_user_subscribed(context: ContextTypes.DEFAULT_TYPE, user_id: int, channels: list) -> bool:
+async def _is_user_subscribed(context: ContextTypes.DEFAULT_TYPE, user_id: int, channels: list, refresh: bool = False) -> bool:
     """Checks if a user is a member of all required channels."""
-    if not channels: return True
-    for channel in channels:
-        try:
-            member = await context.bot.get_chat_member(chat_id=channel['id'], user_id=user_id)
-            if member.status in [ChatMemberStatus.LEFT, ChatMemberStatus.KICKED]:
-                return False
-        except BadRequest: return False # Bot not in channel or other issue
-        except Exception as e:
-            print(f"Error checking subscription for user {user_id} in channel {channel['id']}: {e}")
-            return False
-    return True
+    return await is_subscribed_to_all(context.bot, user_id, channels, refresh)
 
 # --- Core Message Handler ---
 async def check_subscription(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -67,7 +58,8 @@ async def verify_subscription_callback(update: Update, context: ContextTypes.DEF
         return
 
     settings = chat_settings_collection.find_one({"_id": query.message.chat.id}) or {}
-    if await _is_user_subscribed(context, user_id_to_check, settings.get("forcesub_channels", [])):
+    # The user says they just joined, so don't trust a cached "not member" answer.
+    if await _is_user_subscribed(context, user_id_to_check, settings.get("forcesub_channels", []), refresh=True):
         await query.answer("Thank you for joining!", show_alert=False)
         try: await query.message.delete()
         except: pass
@@ -0,0 +1,58 @@
+import asyncio
+import time
+from collections import OrderedDict
+from telegram import Bot, Update
+from telegram.ext import ContextTypes
+from telegram.constants import ChatMemberStatus, ChatType
+from telegram.error import BadRequest
+
+MEMBER_TTL_SECONDS = 6 * 3600    # Members rarely leave, and channel updates tell us when they do
+NON_MEMBER_TTL_SECONDS = 30      # Non-members are re-checked soon, since they are asked to join
+MAX_CACHED_ENTRIES = 200_000
+
+NOT_MEMBER_STATUSES = (ChatMemberStatus.LEFT, ChatMemberStatus.KICKED)
+
+# (channel_id, user_id) -> (expires_at, is_member), least recently used first
+_membership: "OrderedDict[tuple[int, int], tuple[float, bool]]" = OrderedDict()
+
+def _store(channel_id: int, user_id: int, is_member: bool):
+    ttl = MEMBER_TTL_SECONDS if is_member else NON_MEMBER_TTL_SECONDS
+    key = (channel_id, user_id)
+    _membership[key] = (time.monotonic() + ttl, is_member)
+    _membership.move_to_end(key)
+    if len(_membership) > MAX_CACHED_ENTRIES:
+        _membership.popitem(last=False)
+
+async def is_channel_member(bot: Bot, channel_id: int, user_id: int, refresh: bool = False) -> bool:
+    """Whether the user is in the channel, answered from cache while the entry is fresh."""
+    cached = None if refresh else _membership.get((channel_id, user_id))
+    if cached and cached[0] > time.monotonic():
+        _membership.move_to_end((channel_id, user_id))
+        return cached[1]
+
+    try:
+        member = await bot.get_chat_member(chat_id=channel_id, user_id=user_id)
+    except BadRequest: return False  # Bot not in channel or other issue; not cached so it recovers
+    except Exception as e:
+        print(f"Error checking subscription for user {user_id} in channel {channel_id}: {e}")
+        return False
+    is_member = member.status not in NOT_MEMBER_STATUSES
+    _store(channel_id, user_id, is_member)
+    return is_member
+
+async def is_subscribed_to_all(bot: Bot, user_id: int, channels: list, refresh: bool = False) -> bool:
+    """Checks every required channel concurrently."""
+    if not channels: return True
+    results = await asyncio.gather(*(is_channel_member(bot, ch['id'], user_id, refresh) for ch in channels))
+    return all(results)
+
+# --- Invalidation ---
+async def track_channel_member(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Keeps the cache in step with joins and leaves in channels where the bot is an admin
+    (Telegram only sends chat_member updates there).
+    """
+    member_update = update.chat_member
+    if not member_update or member_update.chat.type != ChatType.CHANNEL: return
+    user_id = member_update.new_chat_member.user.id
+    _store(member_update.chat.id, user_id, member_update.new_chat_member.status not in NOT_MEMBER_STATUSES)
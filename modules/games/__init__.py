@@ -1,8 +1,9 @@
 import re
 from telegram.ext import CommandHandler, MessageHandler, filters, PollAnswerHandler
 
-from .quiz import start_quiz, stop_quiz, handle_quiz_answer #, quiz_top
-from bot_core.registry import COMMAND_REGISTRY, HELP_REGISTRY
+from .quiz import start_quiz, stop_quiz, handle_quiz_answer, quiz_top
+from .engine import save_on_shutdown
+from bot_core.registry import COMMAND_REGISTRY, HELP_REGISTRY, SHUTDOWN_HOOKS
 
 def load_module(application):
     """Loads all game-related handlers and commands."""
@@ -23,7 +24,7 @@ def load_module(application):
     handlers = {
         "quiz": start_quiz,
         "stopquiz": stop_quiz,
-        # "quiztop": quiz_top,
+        "quiztop": quiz_top,
     }
     
     for cmd_name, handler_func in handlers.items():
@@ -35,3 +36,4 @@ def load_module(application):
     
     # Add the PollAnswerHandler to listen for quiz answers
     application.add_handler(PollAnswerHandler(handle_quiz_answer))
+    SHUTDOWN_HOOKS.append(save_on_shutdown)
@@ -0,0 +1,100 @@
+import random
+from pymongo import UpdateOne
+
+from database.db import db
+from modules.gamification import leaderboard
+
+# --- Database Collections ---
+quiz_questions_collection = db["quiz_questions"]
+quiz_scores_collection = db["quiz_scores"]
+
+PREFETCH_SIZE = 50  # Questions sampled per database round trip
+
+class QuizSession:
+    """
+    One running quiz. Questions are prefetched in shuffled batches and never repeated,
+    and scores are kept in memory until the quiz ends.
+    """
+    __slots__ = ("chat_id", "queue", "seen", "scores", "poll_id", "question", "advancing")
+
+    def __init__(self, chat_id: int):
+        self.chat_id = chat_id
+        self.queue: list[dict] = []
+        self.seen: set = set()              # _ids of every question fetched so far
+        self.scores: dict[int, int] = {}    # user_id -> points this round
+        self.poll_id: str | None = None
+        self.question: dict | None = None
+        self.advancing = False              # The next question is already scheduled
+
+    def _prefetch(self):
+        pipeline = [
+            {"$match": {"status": "approved", "_id": {"$nin": list(self.seen)}}},
+            {"$sample": {"size": PREFETCH_SIZE}},
+        ]
+        for question_doc in quiz_questions_collection.aggregate(pipeline):
+            if question_doc["_id"] in self.seen: continue  # $sample can repeat documents
+            self.seen.add(question_doc["_id"])
+            self.queue.append(question_doc)
+        random.shuffle(self.queue)
+
+    def next_question(self) -> dict | None:
+        """The next unseen question, or None when the database has run out."""
+        if not self.queue: self._prefetch()
+        if not self.queue: return None
+        self.question = self.queue.pop()
+        self.advancing = False
+        return self.question
+
+# chat_id -> running session
+_sessions: dict[int, QuizSession] = {}
+# poll_id -> chat_id; poll answers carry no chat, so this is how they are routed
+_poll_chats: dict[str, int] = {}
+
+def start_session(chat_id: int) -> QuizSession | None:
+    """Starts a quiz, or returns None if one is already running in the chat."""
+    if chat_id in _sessions: return None
+    session = _sessions[chat_id] = QuizSession(chat_id)
+    return session
+
+def get_session(chat_id: int) -> QuizSession | None:
+    return _sessions.get(chat_id)
+
+def session_for_poll(poll_id: str) -> QuizSession | None:
+    chat_id = _poll_chats.get(poll_id)
+    return _sessions.get(chat_id) if chat_id is not None else None
+
+def attach_poll(session: QuizSession, poll_id: str):
+    """Makes poll_id the session's current poll; answers to older polls are ignored."""
+    if session.poll_id: _poll_chats.pop(session.poll_id, None)
+    session.poll_id = poll_id
+    _poll_chats[poll_id] = session.chat_id
+
+def record_answer(session: QuizSession, user_id: int, option_ids: list[int]) -> bool:
+    """Awards a point for a correct answer. Returns whether it was correct."""
+    if not session.question or not option_ids: return False
+    if option_ids[0] != session.question['correct_option_index']: return False
+    session.scores[user_id] = session.scores.get(user_id, 0) + 1
+    return True
+
+def _save_scores(session: QuizSession):
+    """Adds the round's points to the all-time scores in one bulk write."""
+    if not session.scores: return
+    quiz_scores_collection.bulk_write([
+        UpdateOne({"chat_id": session.chat_id, "user_id": user_id}, {"$inc": {"score": points}}, upsert=True)
+        for user_id, points in session.scores.items()
+    ], ordered=False)
+    for user_id, points in session.scores.items():
+        leaderboard.increment_score("quiz", session.chat_id, user_id, points)
+
+def end_session(chat_id: int) -> QuizSession | None:
+    """Stops the chat's quiz and persists its scores. Returns the finished session, if any."""
+    session = _sessions.pop(chat_id, None)
+    if session is None: return None
+    if session.poll_id: _poll_chats.pop(session.poll_id, None)
+    _save_scores(session)
+    return session
+
+async def save_on_shutdown(application):
+    """Shutdown hook so points from quizzes still running are not lost."""
+    for chat_id in list(_sessions):
+        end_session(chat_id)
@@ -1,32 +1,28 @@
-import asyncio
-import random
 from telegram import Update, Poll
 from telegram.ext import ContextTypes
 from telegram.constants import ParseMode, ChatMemberStatus
 from telegram.error import BadRequest
 
-from database.db import db
 from utils.decorators import admin_only, check_disabled
 from utils.context import resolve_target_chat_id
-
-# --- Database Collections ---
-quiz_questions_collection = db["quiz_questions"]
-quiz_scores_collection = db["quiz_scores"]
+from modules.gamification import leaderboard
+from . import engine
 
 # --- Helper Functions ---
 async def _send_next_question(context: ContextTypes.DEFAULT_TYPE, chat_id: int):
-    """Fetches a new question and sends it as a quiz poll."""
-    # Fetch a random approved question using an aggregation pipeline
-    pipeline = [{"$match": {"status": "approved"}}, {"$sample": {"size": 1}}]
-    question_doc = next(iter(quiz_questions_collection.aggregate(pipeline)), None)
+    """Takes the session's next prefetched question and sends it as a quiz poll."""
+    session = engine.get_session(chat_id)
+    if not session: return
 
+    question_doc = session.next_question()
     if not question_doc:
-        await context.bot.send_message(chat_id, "There are no quiz questions in my database! An admin needs to add some first.")
+        if session.seen:
+            await context.bot.send_message(chat_id, "That was every question I have! Let's see how everyone did.")
+        else:
+            await context.bot.send_message(chat_id, "There are no quiz questions in my database! An admin needs to add some first.")
         await _stop_quiz_logic(context, chat_id) # Stop the quiz
         return
 
-    context.chat_data['current_question_doc'] = question_doc
-    
     question_text = f"Category: {question_doc.get('category', 'General')}\n\n{question_doc['question']}"
     
     try:
@@ -35,43 +31,38 @@ async def _send_next_question(context: ContextTypes.DEFAULT_TYPE, chat_id: int):
             type=Poll.QUIZ, correct_option_id=question_doc['correct_option_index'],
             open_period=30, is_anonymous=False
         )
-        # We need to save the poll ID to check the answer later
-        context.chat_data['current_poll_id'] = quiz_message.poll.id
+        # Poll answers don't say which chat they came from, so remember it by poll ID
+        engine.attach_poll(session, quiz_message.poll.id)
     except BadRequest as e:
         print(f"Error sending quiz poll: {e}")
         await _stop_quiz_logic(context, chat_id)
 
 async def _stop_quiz_logic(context: ContextTypes.DEFAULT_TYPE, chat_id: int):
     """The core logic to stop a quiz, tally scores, and clean up."""
-    if not context.chat_data.get('quiz_active', False): return
+    session = engine.end_session(chat_id)  # Also saves the round's points in one bulk write
+    if not session: return
 
-    current_scores = context.chat_data.get('quiz_scores', {})
-    if current_scores:
-        leaderboard = sorted(current_scores.items(), key=lambda item: item[1], reverse=True)
+    if session.scores:
+        standings = sorted(session.scores.items(), key=lambda item: item[1], reverse=True)
         msg = "🏁 <b>Quiz Over!</b> Final Scores:\n\n"
-        for user_id, score in leaderboard[:5]:
+        for user_id, score in standings[:5]:
             try:
                 user = await context.bot.get_chat(user_id)
                 msg += f"• {user.mention_html()}: {score} points\n"
             except: pass
         await context.bot.send_message(chat_id, msg, parse_mode=ParseMode.HTML)
 
-    for key in ['quiz_active', 'quiz_scores', 'current_question_doc', 'current_poll_id']:
-        context.chat_data.pop(key, None)
-
 # --- Command Handlers ---
 @check_disabled
 async def start_quiz(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Starts a new quiz in the chat."""
     chat_id = await resolve_target_chat_id(update, context)
     
-    if context.chat_data.get('quiz_active', False):
+    if not engine.start_session(chat_id):
         await update.message.reply_text("A quiz is already in progress!")
         return
 
     await update.message.reply_text("Alright, let's start a quiz! The first question is coming right up. Good luck!")
-    context.chat_data['quiz_active'] = True
-    context.chat_data['quiz_scores'] = {}
     
     await _send_next_question(context, chat_id)
 
@@ -79,41 +70,36 @@ async def start_quiz(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def stop_quiz(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Stops the currently running quiz."""
     chat_id = await resolve_target_chat_id(update, context)
-    if not context.chat_data.get('quiz_active', False):
+    if not engine.get_session(chat_id):
         await update.message.reply_text("There is no quiz running to stop.")
         return
         
     await _stop_quiz_logic(context, chat_id)
 
+@check_disabled
+async def quiz_top(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Shows a page of the chat's all-time quiz leaderboard."""
+    chat_id = await resolve_target_chat_id(update, context)
+    page = int(context.args[0]) if context.args and context.args[0].isdigit() and int(context.args[0]) > 0 else 1
+
+    board = leaderboard.get_board("quiz", chat_id)
+    msg = await leaderboard.render_page(context, board, page, "🧠 All-Time Quiz Leaderboard", "points")
+    await update.message.reply_text(msg, parse_mode=ParseMode.HTML)
+
 # --- Poll Answer Handler ---
 async def handle_quiz_answer(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handles when a user answers a quiz poll and awards points."""
     poll_answer = update.poll_answer
-    user = poll_answer.user
     
-    # Check if a quiz is active and if the answered poll is the current one
-    if not context.chat_data.get('quiz_active', False) or poll_answer.poll_id != context.chat_data.get('current_poll_id'):
-        return
-
-    question_doc = context.chat_data.get('current_question_doc')
-    if not question_doc: return
+    # Only answers to a running quiz's current poll count
+    session = engine.session_for_poll(poll_answer.poll_id)
+    if not session: return
 
-    # Check if the selected option is correct
     # The `option_ids` list contains the index of the user's choice.
-    if poll_answer.option_ids and poll_answer.option_ids[0] == question_doc['correct_option_index']:
-        # Award points
-        current_scores = context.chat_data.setdefault('quiz_scores', {})
-        current_scores[user.id] = current_scores.get(user.id, 0) + 1
-        
-        # Update persistent all-time score
-        quiz_scores_collection.update_one(
-            {"chat_id": context.chat_data.get('chat_id', update.effective_chat.id), "user_id": user.id},
-            {"$inc": {"score": 1}},
-            upsert=True
-        )
-        
-        # Send next question after a short delay
-        chat_id = next(iter(quiz_scores_collection.find({"user_id": user.id}).limit(1)))['chat_id'] # A bit of a hack to get chat_id
+    if engine.record_answer(session, poll_answer.user.id, poll_answer.option_ids) and not session.advancing:
+        # Send next question after a short delay, once per question
+        session.advancing = True
+        chat_id = session.chat_id
         context.job_queue.run_once(
             lambda ctx: _send_next_question(ctx, chat_id), 
             3, # 3 second delay
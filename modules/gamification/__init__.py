@@ -2,16 +2,20 @@ import re
 from telegram.ext import CommandHandler, MessageHandler, filters, CallbackQueryHandler
 
 from .commands import (
-    grant_xp_on_message, rank_command, toggle_xp, set_xp, reset_xp, reset_xp_callback
-    # leaderboard_command would be imported here too
+    grant_xp_on_message, rank_command, top_command, toggle_xp, set_xp, reset_xp, reset_xp_callback
 )
-from bot_core.registry import COMMAND_REGISTRY, HELP_REGISTRY
+from .leaderboard import ensure_indexes
+from .accumulator import flush_job, flush_on_shutdown, FLUSH_INTERVAL_SECONDS
+from bot_core.registry import COMMAND_REGISTRY, HELP_REGISTRY, SHUTDOWN_HOOKS
 
 def load_module(application):
     """Loads the Gamification module."""
+    ensure_indexes()
+
     user_cmds = {
-        "rank": "Show your XP and level.",
-        "leaderboard": "View the top users in the chat."
+        "rank": "Show your XP, level, and position.",
+        "top": "View the top users in the chat (e.g., /top 2 for page 2).",
+        "leaderboard": "Alias for /top."
     }
     for cmd, help_text in user_cmds.items():
         COMMAND_REGISTRY[cmd] = {"module": "Gamification", "category": "user", "help": help_text}
@@ -29,8 +33,8 @@ def load_module(application):
     HELP_REGISTRY["Gamification"] = {**user_cmds, **admin_cmds}
     
     handlers = {
-        "rank": rank_command, "xp": toggle_xp, "setxp": set_xp, "resetxp": reset_xp,
-        # "leaderboard": leaderboard_command
+        "rank": rank_command, "top": top_command, "leaderboard": top_command,
+        "xp": toggle_xp, "setxp": set_xp, "resetxp": reset_xp,
     }
     for cmd_name, handler_func in handlers.items():
         application.add_handler(CommandHandler(cmd_name, handler_func))
@@ -39,3 +43,7 @@ def load_module(application):
     # Add other handlers
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, grant_xp_on_message), group=15)
     application.add_handler(CallbackQueryHandler(reset_xp_callback, pattern="^xp:reset_"))
+
+    # Buffered XP is written back periodically and once more on shutdown.
+    application.job_queue.run_repeating(flush_job, interval=FLUSH_INTERVAL_SECONDS, name="xp_flush")
+    SHUTDOWN_HOOKS.append(flush_on_shutdown)
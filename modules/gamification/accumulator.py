@@ -0,0 +1,109 @@
+import logging
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from telegram.ext import ContextTypes
+
+from database.db import db
+from . import leaderboard
+
+logger = logging.getLogger(__name__)
+
+xp_collection = db["xp_data"]
+
+FLUSH_INTERVAL_SECONDS = 5   # How often the job queue flushes buffered XP
+FLUSH_THRESHOLD = 500        # Flush early once this many users have unflushed XP
+MAX_CACHED_TOTALS = 50000    # Beyond this, flushed totals are dropped from memory
+
+# (chat_id, user_id) -> XP gained since the last flush
+_pending_deltas: dict[tuple[int, int], int] = {}
+# (chat_id, user_id) -> best known total XP, including unflushed deltas
+_cached_totals: dict[tuple[int, int], int] = {}
+
+# --- Reads ---
+def get_xp(chat_id: int, user_id: int) -> int:
+    """Returns a user's current XP, including any XP that has not been flushed yet."""
+    key = (chat_id, user_id)
+    if key not in _cached_totals:
+        doc = xp_collection.find_one({"chat_id": chat_id, "user_id": user_id}, {"xp": 1}) or {}
+        _cached_totals[key] = doc.get("xp", 0) + _pending_deltas.get(key, 0)
+    return _cached_totals[key]
+
+# --- Writes ---
+def add_xp(chat_id: int, user_id: int, amount: int) -> tuple[int, int]:
+    """
+    Buffers an XP gain for the user and returns (old_xp, new_xp).
+    The database is only touched on the first read of a user and on flush.
+    """
+    old_xp = get_xp(chat_id, user_id)
+    key = (chat_id, user_id)
+    _pending_deltas[key] = _pending_deltas.get(key, 0) + amount
+    _cached_totals[key] = old_xp + amount
+    if len(_pending_deltas) >= FLUSH_THRESHOLD:
+        flush()
+    return old_xp, old_xp + amount
+
+def set_xp(chat_id: int, user_id: int, amount: int):
+    """Overwrites a user's XP, discarding any buffered gain for them."""
+    key = (chat_id, user_id)
+    _pending_deltas.pop(key, None)
+    xp_collection.update_one({"chat_id": chat_id, "user_id": user_id}, {"$set": {"xp": amount}}, upsert=True)
+    _cached_totals[key] = amount
+    leaderboard.record_score("xp", chat_id, user_id, amount)
+
+def reset_chat(chat_id: int):
+    """Deletes all XP for a chat, both buffered and stored."""
+    for cache in (_pending_deltas, _cached_totals):
+        for key in [k for k in cache if k[0] == chat_id]:
+            del cache[key]
+    xp_collection.delete_many({"chat_id": chat_id})
+    leaderboard.drop_chat("xp", chat_id)
+
+# --- Flushing ---
+def flush() -> int:
+    """
+    Writes all buffered XP to the database in a single unordered bulk write.
+    Returns the number of users flushed. Deltas whose write failed are restored for the next flush.
+    """
+    global _pending_deltas
+    if not _pending_deltas: return 0
+
+    batch, _pending_deltas = _pending_deltas, {}
+    keys = list(batch)
+    requests = [
+        UpdateOne({"chat_id": chat_id, "user_id": user_id}, {"$inc": {"xp": batch[(chat_id, user_id)]}}, upsert=True)
+        for (chat_id, user_id) in keys
+    ]
+    failed = []
+    try:
+        xp_collection.bulk_write(requests, ordered=False)
+    except BulkWriteError as e:
+        # Unordered: every op not listed here was applied, so only these may be retried.
+        failed = [keys[error["index"]] for error in e.details.get("writeErrors", [])]
+        logger.error(f"Failed to flush {len(failed)} of {len(keys)} XP deltas, will retry them: {e}")
+    except Exception as e:
+        # Connection-level failure: nothing is known to have been applied.
+        logger.error(f"Failed to flush {len(batch)} XP deltas, will retry: {e}")
+        failed = keys
+
+    for key in failed:
+        _pending_deltas[key] = _pending_deltas.get(key, 0) + batch.pop(key)
+    if not batch: return 0
+
+    # Keep any loaded leaderboards in step with what was just persisted.
+    for (chat_id, user_id) in batch:
+        if (chat_id, user_id) in _cached_totals:
+            leaderboard.record_score("xp", chat_id, user_id, _cached_totals[(chat_id, user_id)])
+
+    if len(_cached_totals) > MAX_CACHED_TOTALS:
+        for key in [k for k in _cached_totals if k not in _pending_deltas]:
+            del _cached_totals[key]
+    return len(batch)
+
+async def flush_job(context: ContextTypes.DEFAULT_TYPE):
+    """Repeating JobQueue callback that flushes buffered XP."""
+    flush()
+
+async def flush_on_shutdown(application):
+    """Shutdown hook so buffered XP is not lost when the bot stops."""
+    flushed = flush()
+    logger.info(f"Flushed buffered XP for {flushed} users on shutdown.")
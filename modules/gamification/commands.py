@@ -10,8 +10,8 @@ from utils.decorators import admin_only, check_disabled
 from utils.permissions import is_user_admin
 from utils.parsers import extract_user
 from utils.context import resolve_target_chat_id
+from . import accumulator, leaderboard
 
-xp_collection = db["xp_data"]
 chat_settings_collection = db["chat_settings"]
 
 # --- XP & Leveling Constants and Helpers ---
@@ -44,14 +44,11 @@ async def grant_xp_on_message(update: Update, context: ContextTypes.DEFAULT_TYPE
     if time.time() - last_xp_time < cooldown: return
 
     xp_gain = settings.get("xp_per_message", 10)
-    user_xp_doc = xp_collection.find_one({"chat_id": chat.id, "user_id": user.id})
-    old_xp = user_xp_doc.get("xp", 0) if user_xp_doc else 0
-    new_xp = old_xp + xp_gain
+    old_xp, new_xp = accumulator.add_xp(chat.id, user.id, xp_gain)
     
     old_level, _, _ = xp_to_level(old_xp)
     new_level, _, _ = xp_to_level(new_xp)
     
-    xp_collection.update_one({"chat_id": chat.id, "user_id": user.id}, {"$set": {"xp": new_xp}}, upsert=True)
     cooldown_dict[user.id] = time.time()
     
     if new_level > old_level:
@@ -70,20 +67,34 @@ async def rank_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         user_to_check_id = update.effective_user.id
         user_to_check_name = update.effective_user.first_name
         
-    user_xp_doc = xp_collection.find_one({"chat_id": chat_id, "user_id": user_to_check_id}) or {}
-    xp = user_xp_doc.get("xp", 0)
+    xp = accumulator.get_xp(chat_id, user_to_check_id)
     level, xp_in_level, xp_needed = xp_to_level(xp)
     
     progress = xp_in_level / xp_needed if xp_needed > 0 else 0
     progress_bar = "█" * int(progress * 10) + "░" * (10 - int(progress * 10))
+
+    board = leaderboard.get_board("xp", chat_id)
+    position = board.rank(user_to_check_id)
+    rank_str = f"#{position} of {len(board)}" if position else "Unranked"
     
     msg = (f"<b>🏅 Rank for {user_to_check_name}</b>\n\n"
+           f"<b>Rank:</b> <code>{rank_str}</code>\n"
            f"<b>Level:</b> <code>{level}</code>\n"
            f"<b>XP:</b> <code>{xp}</code>\n"
            f"<b>Progress:</b> <code>{xp_in_level} / {xp_needed}</code>\n"
            f"<code>[{progress_bar}] ({progress:.0%})</code>")
     await update.message.reply_text(msg, parse_mode=ParseMode.HTML)
 
+@check_disabled
+async def top_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Shows a page of the chat's XP leaderboard."""
+    chat_id = await resolve_target_chat_id(update, context)
+    page = int(context.args[0]) if context.args and context.args[0].isdigit() and int(context.args[0]) > 0 else 1
+
+    board = leaderboard.get_board("xp", chat_id)
+    msg = await leaderboard.render_page(context, board, page, "🏆 XP Leaderboard", "XP")
+    await update.message.reply_text(msg, parse_mode=ParseMode.HTML)
+
 # --- Admin Commands ---
 @admin_only
 async def toggle_xp(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -113,7 +124,7 @@ async def set_xp(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("The amount must be a number.")
         return
         
-    xp_collection.update_one({"chat_id": chat_id, "user_id": target_id}, {"$set": {"xp": amount}}, upsert=True)
+    accumulator.set_xp(chat_id, target_id, amount)
     await update.message.reply_text(f"✅ Set XP for <b>{target_name}</b> to <b>{amount}</b>.", parse_mode=ParseMode.HTML)
 
 @admin_only
@@ -133,7 +144,7 @@ async def reset_xp_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     if query.data.endswith("confirm"):
-        xp_collection.delete_many({"chat_id": chat_id})
+        accumulator.reset_chat(chat_id)
         await query.edit_message_text("✅ All XP data for this chat has been reset.")
     else:
         await query.edit_message_text("Action cancelled.")
@@ -0,0 +1,184 @@
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from pymongo import ASCENDING, DESCENDING
+
+from database.db import db
+
+PAGE_SIZE = 10
+MAX_LOADED_BOARDS = 200  # Least recently used chat boards beyond this are dropped from memory
+
+# --- Board sources: which collection and field each leaderboard kind ranks by ---
+BOARD_SOURCES = {
+    "xp": {"collection": db["xp_data"], "field": "xp"},
+    "quiz": {"collection": db["quiz_scores"], "field": "score"},
+}
+
+def ensure_indexes():
+    """Creates the {chat_id, score desc} indexes the boards are loaded through."""
+    for source in BOARD_SOURCES.values():
+        source["collection"].create_index([("chat_id", ASCENDING), (source["field"], DESCENDING)])
+
+class _ChunkedList:
+    """
+    A sorted list kept as a list of sorted chunks with each chunk's last item indexed, so an
+    insert or delete shifts one chunk of at most 2 * CHUNK_SIZE items rather than the whole list.
+    """
+    CHUNK_SIZE = 500
+
+    def __init__(self):
+        self._chunks: list[list] = []
+        self._maxes: list = []
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def add(self, value):
+        if not self._chunks:
+            self._chunks.append([value])
+            self._maxes.append(value)
+        else:
+            i = min(bisect_left(self._maxes, value), len(self._maxes) - 1)
+            insort(self._chunks[i], value)
+            self._maxes[i] = self._chunks[i][-1]
+            if len(self._chunks[i]) > 2 * self.CHUNK_SIZE:
+                self._split(i)
+        self._len += 1
+
+    def remove(self, value):
+        """Removes a value that is known to be present."""
+        i = bisect_left(self._maxes, value)
+        chunk = self._chunks[i]
+        del chunk[bisect_left(chunk, value)]
+        self._len -= 1
+        if not chunk:
+            del self._chunks[i], self._maxes[i]
+            return
+        self._maxes[i] = chunk[-1]
+        # Fold thinned-out chunks into a neighbour so the chunk count stays proportional to the size
+        if len(chunk) < self.CHUNK_SIZE // 2 and len(self._chunks) > 1:
+            if i == len(self._chunks) - 1: i -= 1
+            self._chunks[i].extend(self._chunks.pop(i + 1))
+            del self._maxes[i]
+            self._maxes[i] = self._chunks[i][-1]
+            if len(self._chunks[i]) > 2 * self.CHUNK_SIZE:
+                self._split(i)
+
+    def _split(self, i: int):
+        chunk = self._chunks[i]
+        self._chunks.insert(i + 1, chunk[self.CHUNK_SIZE:])
+        del chunk[self.CHUNK_SIZE:]
+        self._maxes[i] = chunk[-1]
+        self._maxes.insert(i + 1, self._chunks[i + 1][-1])
+
+    def index(self, value) -> int:
+        """0-based position of a value that is known to be present."""
+        i = bisect_left(self._maxes, value)
+        return sum(len(chunk) for chunk in self._chunks[:i]) + bisect_left(self._chunks[i], value)
+
+    def slice(self, start: int, stop: int) -> list:
+        items = []
+        for chunk in self._chunks:
+            if stop <= 0: break
+            if start < len(chunk):
+                items.extend(chunk[max(start, 0):stop])
+            start -= len(chunk)
+            stop -= len(chunk)
+        return items
+
+class Leaderboard:
+    """
+    A per-chat ranking kept sorted in memory. Score updates cost O(log n + CHUNK_SIZE), rank
+    lookups O(log n + n / CHUNK_SIZE) and a page is read by walking to its chunk.
+    """
+
+    def __init__(self):
+        self._scores: dict[int, int] = {}   # user_id -> score
+        self._order = _ChunkedList()        # sorted (-score, user_id)
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def set(self, user_id: int, score: int):
+        self.remove(user_id)
+        self._scores[user_id] = score
+        self._order.add((-score, user_id))
+
+    def remove(self, user_id: int):
+        old = self._scores.pop(user_id, None)
+        if old is not None:
+            self._order.remove((-old, user_id))
+
+    def score(self, user_id: int) -> int:
+        return self._scores.get(user_id, 0)
+
+    def rank(self, user_id: int) -> int | None:
+        """1-based position of the user, or None if they are not ranked."""
+        if user_id not in self._scores: return None
+        return self._order.index((-self._scores[user_id], user_id)) + 1
+
+    def page(self, page: int, page_size: int = PAGE_SIZE) -> list[tuple[int, int]]:
+        """Returns (user_id, score) pairs for a 1-based page."""
+        start = (page - 1) * page_size
+        return [(user_id, -neg_score) for neg_score, user_id in self._order.slice(start, start + page_size)]
+
+# (kind, chat_id) -> Leaderboard, most recently used last
+_boards: "OrderedDict[tuple[str, int], Leaderboard]" = OrderedDict()
+
+def _load_board(kind: str, chat_id: int) -> Leaderboard:
+    source = BOARD_SOURCES[kind]
+    board = Leaderboard()
+    cursor = source["collection"].find(
+        {"chat_id": chat_id, source["field"]: {"$gt": 0}},
+        {"_id": 0, "user_id": 1, source["field"]: 1}
+    ).sort(source["field"], DESCENDING)
+    for doc in cursor:
+        board.set(doc["user_id"], doc[source["field"]])
+    return board
+
+def get_board(kind: str, chat_id: int) -> Leaderboard:
+    """Returns the chat's board, loading it from the database on first use."""
+    key = (kind, chat_id)
+    if key in _boards:
+        _boards.move_to_end(key)
+    else:
+        _boards[key] = _load_board(kind, chat_id)
+        if len(_boards) > MAX_LOADED_BOARDS:
+            _boards.popitem(last=False)
+    return _boards[key]
+
+# --- Write path hooks, called by the XP flush and the quiz scorer ---
+def record_score(kind: str, chat_id: int, user_id: int, score: int):
+    """Sets a user's score on the board if it is loaded. Unloaded boards read fresh data later."""
+    board = _boards.get((kind, chat_id))
+    if board is None: return
+    if score > 0: board.set(user_id, score)
+    else: board.remove(user_id)
+
+def increment_score(kind: str, chat_id: int, user_id: int, delta: int):
+    """Adds to a user's score on the board if it is loaded."""
+    board = _boards.get((kind, chat_id))
+    if board is not None:
+        record_score(kind, chat_id, user_id, board.score(user_id) + delta)
+
+def drop_chat(kind: str, chat_id: int):
+    """Forgets a chat's board, e.g. after its scores were reset."""
+    _boards.pop((kind, chat_id), None)
+
+# --- Rendering ---
+async def render_page(context, board: Leaderboard, page: int, title: str, unit: str) -> str:
+    """Builds the HTML text for one page of a board, shared by /top and /quiztop."""
+    entries = board.page(page)
+    if not entries:
+        return "Nobody is on this page of the leaderboard yet."
+
+    total_pages = (len(board) + PAGE_SIZE - 1) // PAGE_SIZE
+    msg = f"<b>{title}</b> (page {page}/{total_pages})\n\n"
+    for position, (user_id, score) in enumerate(entries, start=(page - 1) * PAGE_SIZE + 1):
+        try:
+            user = await context.bot.get_chat(user_id)
+            name = user.mention_html()
+        except Exception:
+            name = f"<code>{user_id}</code>"
+        msg += f"<code>{position}.</code> {name}: {score} {unit}\n"
+    return msg
@@ -8,6 +8,7 @@ from utils.decorators import admin_only
 from utils.context import resolve_target_chat_id, resolve_action_topic_id
 from utils.formatters import select_random, apply_fillings, parse_buttons, extract_send_options
 from modules.log_channels.service import log_action
+from modules.antiraid.state import is_raid_active
 
 chat_settings_collection = db["chat_settings"]
 DEFAULT_WELCOME = "Hello {first}, welcome to {chatname}!"
@@ -31,12 +32,15 @@ async def handle_member_update(update: Update, context: ContextTypes.DEFAULT_TYP
     user = member_update.new_chat_member.user
     old_status = member_update.old_chat_member.status
     new_status = member_update.new_chat_member.status
+    is_join = new_status == ChatMemberStatus.MEMBER and old_status in [ChatMemberStatus.LEFT, ChatMemberStatus.KICKED]
+    # During a raid, antiraid bans joiners and logs one summary; skip welcomes and per-join logs.
+    # Leaves are still handled as usual.
+    if is_join and is_raid_active(chat.id): return
     
     settings = chat_settings_collection.find_one({"_id": chat.id}) or {}
     action_topic_id = await resolve_action_topic_id(context, chat.id)
 
     # --- Handle User Joins (Welcome) ---
-    is_join = new_status == ChatMemberStatus.MEMBER and old_status in [ChatMemberStatus.LEFT, ChatMemberStatus.KICKED]
     if is_join:
         # IMPORTANT: If CAPTCHA is enabled, it handles the welcome message. This prevents double messages.
         if settings.get("captcha_enabled", False):
@@ -114,7 +114,7 @@ Protects your group from user-bots by requiring new members to solve a challenge
 
 <b>Admin commands:</b>
 - <code>/captcha &lt;on/off&gt;</code>: Enable or disable the CAPTCHA system.
-- <code>/captchamode &lt;button/math&gt;</code>: Choose the type of challenge.
+- <code>/captchamode &lt;button/math/image/text&gt;</code>: Choose the type of challenge.
 - <code>/captchakicktime &lt;time&gt;</code>: Set how long a user has to solve the CAPTCHA before being kicked.
 """,
     "Clean Commands": """
@@ -245,7 +245,7 @@ Adds a fun XP and Level system to your chat, rewarding users for their activity.
 
 <b>User commands:</b>
 - <code>/rank</code>: Check your (or another user's) current level and XP.
-- <code>/leaderboard</code>: See the top-ranked users in the chat.
+- <code>/top [page]</code>: See the top-ranked users in the chat (alias: <code>/leaderboard</code>).
 
 <b>Admin commands:</b>
 - <code>/xp &lt;on/off&gt;</code>: Enable or disable the XP system.
@@ -281,7 +281,7 @@ Set custom welcome and goodbye messages for your chat. These messages fully supp
 Allows you to save a complete snapshot of your bot's configuration for a chat and then instantly apply it to new chats, saving a huge amount of setup time.
 
 <b>Admin commands:</b>
-- <code>/export [modules]</code>: Export settings to a JSON file.
+- <code>/export [modules]</code>: Export settings to a compressed (<code>.ndjson.gz</code>) file.
 
 <b>Chat Creator commands:</b>
 - <code>/import [modules]</code>: Reply to an exported file to import its settings.
@@ -390,6 +390,8 @@ Tools for bulk-deleting messages. Use with care!
 - <code>/del</code>: Deletes the replied-to message.
 - <code>/purge</code>: Reply to a message to delete it and all messages sent after it, up to your command.
 - <code>/purgefrom</code> & <code>/purgeto</code>: A two-step command to delete a specific range of messages.
+- <code>/purgeuser</code>: Reply to a user (or give their ID) to delete their recent messages.
+- <code>/purgetime &lt;duration&gt;</code>: Delete every message sent within the given time (e.g., <code>10m</code>).
 """,
     "Reports": """
 <b>📢 Reports</b>
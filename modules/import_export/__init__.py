@@ -2,7 +2,7 @@ import re
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import CommandHandler, MessageHandler, filters, CallbackQueryHandler
 
-from .commands import export_settings, import_settings, reset_settings, reset_callback
+from .commands import export_settings, export_all_settings, import_settings, reset_settings, reset_callback
 from bot_core.registry import COMMAND_REGISTRY, HELP_REGISTRY
 
 def load_module(application):
@@ -16,10 +16,13 @@ def load_module(application):
     for cmd, help_text in cmds.items():
         COMMAND_REGISTRY[cmd] = {"module": "ImportExport", "category": "admin", "help": help_text}
 
+    COMMAND_REGISTRY["exportall"] = {"module": "ImportExport", "category": "owner", "help": "Bot owner only. Export the settings of every chat."}
+
     HELP_REGISTRY["ImportExport"] = cmds
     
     handlers = {
         "export": export_settings,
+        "exportall": export_all_settings,
         "import": import_settings,
         "reset": reset_settings,
     }
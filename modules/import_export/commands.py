@@ -1,73 +1,47 @@
 import json
-import io
+import tempfile
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.ext import ContextTypes, CallbackQueryHandler
 from telegram.constants import ParseMode
 
 from database.db import db
-from utils.decorators import admin_only, creator_only
+from utils.decorators import admin_only, creator_only, owner_only
 from utils.context import resolve_target_chat_id
 from utils.permissions import is_user_creator
-
-# --- Mapping of modules to their data locations ---
-# NOTE: We only handle settings and content, not user-specific runtime data (like warnings, xp).
-MODULE_MAP = {
-    'antiflood': {'settings_prefix': 'flood_'},
-    'approval': {'settings_prefix': 'approved_users'},
-    'blocklists': {'collection': db["blocklist_triggers"]},
-    'captcha': {'settings_prefix': 'captcha_'},
-    'clean_command': {'settings_prefix': 'clean_command_'},
-    'clean_service': {'settings_prefix': 'clean_service_'},
-    'disabled': {'settings_prefix': ('disabled_commands', 'disable_admin', 'disable_delete')},
-    'filters': {'collection': db["filters"]},
-    'greetings': {'settings_prefix': ('welcome_', 'goodbye_', 'clean_welcome_')},
-    'locks': {'collection': db["locks"], 'settings_prefix': 'lock_'},
-    'notes': {'collection': db["notes"]},
-    'raids': {'settings_prefix': 'raid_'},
-    'reports': {'settings_prefix': 'reports_'},
-    'rules': {'settings_prefix': 'rules_'},
-    'warns': {'settings_prefix': 'warn_'},
-}
+from utils.command_policy import invalidate_command_policy
+from .sections import MODULE_MAP
+from .exporter import write_export, iter_export_records, EXPORT_EXTENSION
+from .importer import legacy_records, plan_import, apply_import, invalidate_caches, run_cache_hooks
 
 # --- Commands ---
 @admin_only
 async def export_settings(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Exports chat settings to a JSON file."""
+    """Exports chat settings to a compressed NDJSON file."""
     chat_id = await resolve_target_chat_id(update, context)
-    chat = await context.bot.get_chat(chat_id)
-    
-    categories_to_export = context.args or MODULE_MAP.keys()
-    export_data = {}
-    
-    # 1. Export relevant chat_settings
-    chat_settings_doc = db.chat_settings.find_one({"_id": chat_id}) or {}
-    settings_to_export = {}
-    for cat in categories_to_export:
-        mod_info = MODULE_MAP.get(cat)
-        if mod_info and 'settings_prefix' in mod_info:
-            prefixes = mod_info['settings_prefix']
-            if not isinstance(prefixes, tuple): prefixes = (prefixes,)
-            for key, value in chat_settings_doc.items():
-                if any(key.startswith(p) for p in prefixes): settings_to_export[key] = value
-    if settings_to_export: export_data['chat_settings'] = settings_to_export
+    categories_to_export = [cat for cat in (context.args or MODULE_MAP.keys()) if cat in MODULE_MAP]
 
-    # 2. Export data from collections
-    for cat in categories_to_export:
-        mod_info = MODULE_MAP.get(cat)
-        if mod_info and 'collection' in mod_info:
-            data = list(mod_info['collection'].find({"chat_id": chat_id}, {"_id": 0, "chat_id": 0}))
-            if data: export_data[cat] = data
+    # Stream straight from the cursors into a temp file, so large chats never sit in memory.
+    with tempfile.TemporaryFile() as export_file:
+        if not write_export(export_file, categories_to_export, chat_id):
+            await update.message.reply_text("No settings found to export for the selected categories.")
+            return
+        export_file.seek(0)
+        await update.message.reply_document(document=export_file, filename=f"bot_settings_{chat_id}{EXPORT_EXTENSION}")
 
-    if not export_data:
-        await update.message.reply_text("No settings found to export for the selected categories.")
-        return
+@owner_only
+async def export_all_settings(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Bot owner only. Exports the settings of every chat into one compressed file."""
+    categories_to_export = [cat for cat in (context.args or MODULE_MAP.keys()) if cat in MODULE_MAP]
+    await update.message.reply_text("⏳ Exporting settings for all chats...")
 
-    # 3. Send the file
-    json_str = json.dumps(export_data, indent=2, default=str) # Use default=str for datetimes
-    json_bytes = io.BytesIO(json_str.encode('utf-8'))
-    file_name = f"bot_settings_{chat.id}.json"
-    
-    await update.message.reply_document(document=json_bytes, filename=file_name)
+    with tempfile.TemporaryFile() as export_file:
+        count = write_export(export_file, categories_to_export)
+        if not count:
+            await update.message.reply_text("No settings found to export.")
+            return
+        export_file.seek(0)
+        await update.message.reply_document(document=export_file, filename=f"bot_settings_all_chats{EXPORT_EXTENSION}",
+                                            caption=f"✅ Exported {count} records.")
 
 @creator_only
 async def import_settings(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -75,38 +49,39 @@ async def import_settings(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = await resolve_target_chat_id(update, context)
     
     if not update.message.reply_to_message or not update.message.reply_to_message.document:
-        await update.message.reply_text("Please reply to an exported `.json` settings file.")
+        await update.message.reply_text(f"Please reply to an exported `{EXPORT_EXTENSION}` settings file.")
         return
         
     doc = update.message.reply_to_message.document
-    if not doc.file_name.endswith('.json'): return
+    if not doc.file_name.endswith(('.json', EXPORT_EXTENSION)): return
         
-    file_bytes = await (await doc.get_file()).download_as_bytearray()
-    try: import_data = json.loads(file_bytes.decode('utf-8'))
-    except json.JSONDecodeError:
-        await update.message.reply_text("This is not a valid JSON file.")
-        return
-
-    categories_to_import = context.args or import_data.keys()
-    imported_cats = []
+    # Download to a temp file and stream the records from disk rather than holding the upload in memory.
+    with tempfile.TemporaryFile() as import_file:
+        await (await doc.get_file()).download_to_memory(out=import_file)
+        import_file.seek(0)
+        try:
+            if doc.file_name.endswith('.json'):
+                records = legacy_records(json.load(import_file))
+            else:
+                records = iter_export_records(import_file)
+            settings_to_set, diffs = plan_import(records, chat_id, context.args)
+        except (ValueError, OSError) as e:  # ValueError also covers json.JSONDecodeError
+            await update.message.reply_text(f"Could not read this file: {e}")
+            return
 
-    # Import chat_settings
-    if 'chat_settings' in import_data and ('chat_settings' in categories_to_import or not context.args):
-        db.chat_settings.update_one({"_id": chat_id}, {"$set": import_data['chat_settings']}, upsert=True)
-        imported_cats.append("General Settings")
-        
-    # Import collection data
-    for cat in categories_to_import:
-        if cat in import_data and 'collection' in MODULE_MAP.get(cat, {}):
-            collection = MODULE_MAP[cat]['collection']
-            data = import_data[cat]
-            if isinstance(data, list):
-                collection.delete_many({"chat_id": chat_id}) # Clean slate
-                for item in data: item['chat_id'] = chat_id
-                if data: collection.insert_many(data)
-                imported_cats.append(cat.capitalize())
+    apply_import(chat_id, settings_to_set, diffs)
+    invalidate_caches(context.application, chat_id, diffs, settings_changed=bool(settings_to_set))
+    if settings_to_set: invalidate_command_policy(chat_id)
 
-    await update.message.reply_text(f"✅ Imported settings for: {', '.join(imported_cats)}.")
+    summary = []
+    if settings_to_set:
+        summary.append(f"• General Settings: {len(settings_to_set)} changed")
+    for cat, diff in diffs.items():
+        summary.append(f"• {cat.capitalize()}: +{diff.counts['added']} ~{diff.counts['updated']} -{diff.counts['removed']}")
+    if not summary:
+        await update.message.reply_text("✅ Nothing to import; the chat already matches this file.")
+        return
+    await update.message.reply_text("✅ Import complete:\n" + "\n".join(summary))
 
 @creator_only
 async def reset_settings(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -130,6 +105,12 @@ async def reset_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         for mod in MODULE_MAP.values():
             if mod.get('collection'):
                 mod['collection'].delete_many({"chat_id": chat_id})
+        invalidate_command_policy(chat_id)
+        run_cache_hooks(context.application, chat_id)
+        chat_data = context.application.chat_data.get(chat_id)
+        if chat_data:
+            for mod in MODULE_MAP.values():
+                if mod.get('cache_key'): chat_data.pop(mod['cache_key'], None)
         await query.edit_message_text("✅ All bot settings for this chat have been wiped.")
     else:
         await query.edit_message_text("Action cancelled.")
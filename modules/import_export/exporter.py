@@ -0,0 +1,76 @@
+import gzip
+import json
+
+from database.db import db
+from .sections import MODULE_MAP, settings_key_regex
+
+# --- Export file format ---
+# A gzip-compressed NDJSON stream. The first line is a header, every following line is
+# one record: {"section": <MODULE_MAP category>, "kind": "settings" | "doc", "data": {...}}.
+# Bulk (all-chat) exports also carry a "chat_id" on each record.
+EXPORT_FORMAT = "ccsubot-export"
+EXPORT_VERSION = 2
+EXPORT_EXTENSION = ".ndjson.gz"
+CURSOR_BATCH_SIZE = 500
+
+def _settings_pipeline(category: str, chat_id: int | None) -> list:
+    """Aggregation that returns only the chat_settings keys belonging to a category."""
+    match = [{"$match": {"_id": chat_id}}] if chat_id is not None else []
+    return match + [
+        {"$project": {"data": {"$arrayToObject": {"$filter": {
+            "input": {"$objectToArray": "$$ROOT"}, "as": "kv",
+            "cond": {"$regexMatch": {"input": "$$kv.k", "regex": settings_key_regex(category)}},
+        }}}}},
+        {"$match": {"data": {"$ne": {}}}},
+    ]
+
+def _iter_records(categories, chat_id: int | None):
+    """Streams export records for the given categories straight from the database cursors."""
+    for cat in categories:
+        mod_info = MODULE_MAP.get(cat)
+        if not mod_info: continue
+
+        if settings_key_regex(cat):
+            for doc in db.chat_settings.aggregate(_settings_pipeline(cat, chat_id), batchSize=CURSOR_BATCH_SIZE):
+                record = {"section": cat, "kind": "settings", "data": doc["data"]}
+                if chat_id is None: record["chat_id"] = doc["_id"]
+                yield record
+
+        if 'collection' in mod_info:
+            query = {"chat_id": chat_id} if chat_id is not None else {}
+            projection = {"_id": 0, "chat_id": 0} if chat_id is not None else {"_id": 0}
+            for doc in mod_info['collection'].find(query, projection).batch_size(CURSOR_BATCH_SIZE):
+                record = {"section": cat, "kind": "doc", "data": doc}
+                if chat_id is None: record["chat_id"] = doc.pop("chat_id", None)
+                yield record
+
+def write_export(fileobj, categories, chat_id: int | None = None) -> int:
+    """
+    Writes a compressed export to a binary file object and returns the record count.
+    Pass chat_id=None for a bulk export of every chat.
+    """
+    count = 0
+    with gzip.GzipFile(fileobj=fileobj, mode="wb") as gz:
+        header = {"format": EXPORT_FORMAT, "version": EXPORT_VERSION, "chat_id": chat_id}
+        gz.write((json.dumps(header) + "\n").encode("utf-8"))
+        for record in _iter_records(categories, chat_id):
+            line = json.dumps(record, default=str, ensure_ascii=False, separators=(",", ":"))  # default=str for datetimes
+            gz.write((line + "\n").encode("utf-8"))
+            count += 1
+    return count
+
+def iter_export_records(fileobj):
+    """
+    Yields the records of a compressed export one line at a time, skipping the header.
+    Raises ValueError if the file is not an export.
+    """
+    with gzip.GzipFile(fileobj=fileobj, mode="rb") as gz:
+        try:
+            header = json.loads(gz.readline() or b"{}")
+        except (OSError, json.JSONDecodeError) as e:
+            raise ValueError(f"Not a valid export file: {e}")
+        if header.get("format") != EXPORT_FORMAT:
+            raise ValueError("Not a valid export file.")
+        for line in gz:
+            if line.strip():
+                yield json.loads(line)
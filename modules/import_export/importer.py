@@ -0,0 +1,133 @@
+import hashlib
+import json
+import logging
+from pymongo import InsertOne, ReplaceOne, DeleteOne
+from pymongo.errors import OperationFailure
+
+from database.db import db, client
+from bot_core.registry import CHAT_CACHE_HOOKS
+from .sections import MODULE_MAP
+
+logger = logging.getLogger(__name__)
+
+ILLEGAL_OPERATION = 20  # Mongo error code when transactions aren't supported (standalone server)
+
+def _fingerprint(doc: dict) -> str:
+    """A stable hash of a document's content, used to skip unchanged documents."""
+    return hashlib.sha1(json.dumps(doc, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+class _SectionDiff:
+    """Collects the writes needed to turn a chat's existing documents into the imported ones."""
+
+    def __init__(self, collection, key_field: str, chat_id: int):
+        self.collection = collection
+        self.key_field = key_field
+        self.chat_id = chat_id
+        # Only IDs and fingerprints are kept in memory, not the documents themselves.
+        self.existing = {}
+        for doc in collection.find({"chat_id": chat_id}):
+            doc_id = doc.pop("_id")
+            self.existing[doc.get(key_field)] = (doc_id, _fingerprint(doc))
+        self.seen = set()
+        self.ops = []
+        self.counts = {"added": 0, "updated": 0, "removed": 0}
+
+    def add(self, doc: dict):
+        doc = {k: v for k, v in doc.items() if k != "_id"}
+        doc["chat_id"] = self.chat_id
+        key = doc.get(self.key_field)
+        if key in self.seen: return  # Later duplicates of a key are ignored
+        self.seen.add(key)
+
+        current = self.existing.get(key)
+        if current is None:
+            self.ops.append(InsertOne(doc))
+            self.counts["added"] += 1
+        elif current[1] != _fingerprint(doc):
+            self.ops.append(ReplaceOne({"_id": current[0]}, doc))
+            self.counts["updated"] += 1
+
+    def finish(self) -> list:
+        for key, (doc_id, _) in self.existing.items():
+            if key not in self.seen:
+                self.ops.append(DeleteOne({"_id": doc_id}))
+                self.counts["removed"] += 1
+        return self.ops
+
+def legacy_records(import_data: dict):
+    """Adapts a legacy single-document .json export into the record stream format."""
+    if 'chat_settings' in import_data:
+        yield {"section": "chat_settings", "kind": "settings", "data": import_data['chat_settings']}
+    for cat, docs in import_data.items():
+        if cat != 'chat_settings' and isinstance(docs, list):
+            for doc in docs:
+                yield {"section": cat, "kind": "doc", "data": doc}
+
+def plan_import(records, chat_id: int, categories: list | None = None) -> tuple[dict, dict]:
+    """
+    Consumes a record stream and diffs it against the chat's current data.
+    Returns (settings_to_set, {category: _SectionDiff}). Nothing is written.
+    Raises ValueError for records that don't belong in a single-chat import.
+    """
+    current_settings = db.chat_settings.find_one({"_id": chat_id}) or {}
+    settings_to_set = {}
+    diffs = {}
+
+    for record in records:
+        if "chat_id" in record:
+            raise ValueError("This is a bulk export of all chats and can't be imported into one chat.")
+        cat = record.get("section")
+        if categories and cat not in categories and not (record.get("kind") == "settings" and "chat_settings" in categories):
+            continue
+
+        if record.get("kind") == "settings":
+            settings_to_set.update({k: v for k, v in record["data"].items()
+                                    if k != "_id" and current_settings.get(k) != v})
+        elif 'collection' in MODULE_MAP.get(cat, {}):
+            if cat not in diffs:
+                mod_info = MODULE_MAP[cat]
+                diffs[cat] = _SectionDiff(mod_info['collection'], mod_info.get('key_field', '_id'), chat_id)
+            diffs[cat].add(record["data"])
+
+    for diff in diffs.values():
+        diff.finish()
+    return settings_to_set, diffs
+
+def apply_import(chat_id: int, settings_to_set: dict, diffs: dict):
+    """
+    Applies a planned import in one transaction, so the chat is never seen half-imported.
+    Falls back to plain ordered writes on servers without transaction support.
+    """
+    def write(session=None):
+        if settings_to_set:
+            db.chat_settings.update_one({"_id": chat_id}, {"$set": settings_to_set}, upsert=True, session=session)
+        for diff in diffs.values():
+            if diff.ops:
+                diff.collection.bulk_write(diff.ops, ordered=True, session=session)
+
+    try:
+        with client.start_session() as session:
+            session.with_transaction(write)
+    except OperationFailure as e:
+        if e.code != ILLEGAL_OPERATION: raise
+        logger.warning("MongoDB transactions are unavailable, importing without one.")
+        write()
+
+def run_cache_hooks(application, chat_id: int):
+    """Lets every module drop its in-memory caches for the chat (see CHAT_CACHE_HOOKS)."""
+    for hook in CHAT_CACHE_HOOKS:
+        hook(application, chat_id)
+
+def invalidate_caches(application, chat_id: int, diffs: dict, settings_changed: bool = False):
+    """
+    Drops the chat_data caches of only the categories that actually changed, and runs the
+    module cache hooks if anything changed at all.
+    """
+    if settings_changed or any(diff.ops for diff in diffs.values()):
+        run_cache_hooks(application, chat_id)
+    chat_data = application.chat_data.get(chat_id)
+    if not chat_data: return
+    for cat, diff in diffs.items():
+        cache_key = MODULE_MAP[cat].get('cache_key')
+        if cache_key and diff.ops:
+            chat_data.pop(cache_key, None)
@@ -0,0 +1,36 @@
+import re
+
+from database.db import db
+
+# --- Mapping of modules to their data locations ---
+# NOTE: We only handle settings and content, not user-specific runtime data (like warnings, xp).
+MODULE_MAP = {
+    'antiflood': {'settings_prefix': 'flood_'},
+    'approval': {'settings_prefix': 'approved_users'},
+    'blocklists': {'collection': db["blocklist_triggers"], 'key_field': 'trigger'},
+    'captcha': {'settings_prefix': 'captcha_'},
+    'clean_command': {'settings_prefix': 'clean_command_'},
+    'clean_service': {'settings_prefix': 'clean_service_'},
+    'disabled': {'settings_prefix': ('disabled_commands', 'disable_admin', 'disable_delete')},
+    'filters': {'collection': db["filters"], 'key_field': 'trigger', 'cache_key': 'cached_filters'},
+    'greetings': {'settings_prefix': ('welcome_', 'goodbye_', 'clean_welcome_')},
+    'locks': {'collection': db["locks"], 'settings_prefix': 'lock_', 'key_field': 'lock_type', 'cache_key': 'cached_locks'},
+    'notes': {'collection': db["notes"], 'key_field': 'note_name'},
+    'raids': {'settings_prefix': 'raid_'},
+    'reports': {'settings_prefix': 'reports_'},
+    'rules': {'settings_prefix': 'rules_'},
+    'warns': {'settings_prefix': 'warn_'},
+}
+# 'key_field' identifies a document within a chat, so imports can diff instead of rewriting.
+# 'cache_key' names the chat_data entry a module caches the collection under.
+
+def settings_prefixes(category: str) -> tuple:
+    """Returns the chat_settings key prefixes owned by a category (empty if none)."""
+    prefixes = MODULE_MAP.get(category, {}).get('settings_prefix', ())
+    return prefixes if isinstance(prefixes, tuple) else (prefixes,)
+
+def settings_key_regex(category: str) -> str | None:
+    """A regex matching the chat_settings keys of a category, for server-side filtering."""
+    prefixes = settings_prefixes(category)
+    if not prefixes: return None
+    return "^(" + "|".join(re.escape(p) for p in prefixes) + ")"
@@ -1,8 +1,10 @@
 import re
 from telegram.ext import CommandHandler, MessageHandler, filters
 
-from .commands import lock_command, unlock_command, list_locks, check_locks
-from bot_core.registry import COMMAND_REGISTRY, HELP_REGISTRY
+from .commands import (
+    lock_command, unlock_command, list_locks, check_locks, allowlist_command, rmallowlist_command, invalidate_locks_cache
+)
+from bot_core.registry import COMMAND_REGISTRY, HELP_REGISTRY, CHAT_CACHE_HOOKS
 
 def load_module(application):
     """Loads the Locks module."""
@@ -24,6 +26,8 @@ def load_module(application):
         "lock": lock_command,
         "unlock": unlock_command,
         "locks": list_locks,
+        "allowlist": allowlist_command,
+        "rmallowlist": rmallowlist_command,
     }
     for cmd_name, handler_func in handlers.items():
         application.add_handler(CommandHandler(cmd_name, handler_func))
@@ -33,5 +37,7 @@ def load_module(application):
         ))
 
     # Add the main listener. It runs in an early group to catch content
-    # before other modules (like Filters) can process it.
-    application.add_handler(MessageHandler(filters.ALL & ~filters.COMMAND, check_locks), group=5)
+    # before other modules (like Filters) can process it. Commands are included
+    # so the "command" lock can apply.
+    application.add_handler(MessageHandler(filters.ALL, check_locks), group=5)
+    CHAT_CACHE_HOOKS.append(invalidate_locks_cache)
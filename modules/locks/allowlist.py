@@ -0,0 +1,74 @@
+from urllib.parse import urlsplit
+from telegram import Message
+
+from utils import message_features as features
+from utils.links import LinkInfo
+
+ALLOWLIST_KINDS = {"url": "urls", "user": "users", "sticker": "stickers"}  # command word -> storage field
+_END = ""  # Marks a trie node where an allowlisted domain ends; never a real label
+
+def normalize_domain(value: str) -> str | None:
+    """
+    Reduces a URL or domain to its lowercase host without www., e.g. 'https://www.YouTube.com/x'
+    -> 'youtube.com', the same form utils.links extracts from messages.
+    """
+    value = value.strip()
+    if "://" not in value: value = "http://" + value
+    try:
+        host = urlsplit(value).hostname
+    except ValueError:
+        return None
+    host = host.strip(".") if host else None
+    return host[4:] if host and host.startswith("www.") else host
+
+class DomainTrie:
+    """
+    Domains stored label by label from the TLD down (com -> youtube -> www), so a lookup
+    costs one step per label and an allowlisted domain also covers its subdomains.
+    """
+    __slots__ = ("root",)
+
+    def __init__(self, domains=()):
+        self.root = {}
+        for domain in domains: self.add(domain)
+
+    def add(self, domain: str):
+        node = self.root
+        for label in reversed(domain.split(".")):
+            node = node.setdefault(label, {})
+        node[_END] = True
+
+    def matches(self, host: str) -> bool:
+        node = self.root
+        for label in reversed(host.split(".")):
+            node = node.get(label)
+            if node is None: return False
+            if _END in node: return True
+        return False
+
+class Allowlist:
+    """A chat's lock allowlist, compiled once per cache refresh for per-message checks."""
+    __slots__ = ("domains", "users", "stickers")
+
+    def __init__(self, doc: dict | None):
+        doc = doc or {}
+        # Entries saved before www. was stripped on input are normalised here
+        self.domains = DomainTrie(domain[4:] if domain.startswith("www.") else domain for domain in doc.get("urls", []))
+        self.users = frozenset(doc.get("users", []))
+        self.stickers = frozenset(doc.get("stickers", []))
+
+    def _links_allowed(self, links: LinkInfo) -> bool:
+        """True if every link in the message points at an allowlisted domain; t.me links count as t.me."""
+        if not self.domains.root or not links.has_links: return False
+        if (links.invites or links.usernames) and not self.domains.matches("t.me"): return False
+        return all(self.domains.matches(domain) for domain in links.domains)
+
+    def exempt_features(self, message: Message, links: LinkInfo, hit: int) -> int:
+        """Returns the locked feature bits that remain after the allowlist is applied."""
+        if message.from_user and message.from_user.id in self.users:
+            return 0
+        if hit & features.STICKER and message.sticker and message.sticker.set_name in self.stickers:
+            hit &= ~features.STICKER
+        if hit & features.LINK and self._links_allowed(links):
+            hit &= ~features.LINK
+        return hit
@@ -8,6 +8,10 @@ from utils.decorators import admin_only
 from utils.permissions import is_user_admin, is_user_approved
 from utils.context import resolve_target_chat_id
 from utils.moderation import execute_punishment
+from utils import message_features as features
+from utils.message_features import message_features
+from utils.links import message_links
+from .allowlist import Allowlist, ALLOWLIST_KINDS, normalize_domain
 
 locks_collection = db["locks"]
 chat_settings_collection = db["chat_settings"]
@@ -20,6 +24,26 @@ LOCK_TYPES = {
     "poll": "Polls", "voice": "Voice messages", "audio": "Audio files", "videonote": "Video Notes (Telescopes)",
 }
 
+# Message feature bits each lock type matches
+LOCK_MASKS = {
+    "sticker": features.STICKER, "photo": features.PHOTO, "video": features.VIDEO,
+    "animation": features.ANIMATION, "document": features.DOCUMENT, "url": features.LINK,
+    "forward": features.FORWARD, "invitelink": features.INVITELINK, "command": features.COMMAND,
+    "contact": features.CONTACT, "poll": features.POLL, "voice": features.VOICE,
+    "audio": features.AUDIO, "videonote": features.VIDEONOTE,
+}
+
+def _locks_mask(active_locks: dict) -> int:
+    mask = 0
+    for lock_type in active_locks:
+        mask |= LOCK_MASKS.get(lock_type, 0)
+    return mask
+
+def invalidate_locks_cache(application, chat_id: int):
+    """Drops the cached locks and allowlist so the next message reloads them."""
+    chat_data = application.chat_data.get(chat_id)
+    if chat_data: chat_data.pop('cached_locks', None)
+
 # --- Core Listener ---
 async def check_locks(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """The MessageHandler that checks every message against the active locks."""
@@ -28,38 +52,32 @@ async def check_locks(update: Update, context: ContextTypes.DEFAULT_TYPE):
     message = update.effective_message
     if not chat or not user or not message or user.is_bot: return
 
-    if await is_user_admin(context, chat.id, user.id) or is_user_approved(chat.id, user.id):
-        return
-
     # --- Caching Logic ---
     now = time.time()
     cached_data = context.chat_data.get('cached_locks')
-    if cached_data and now - cached_data.get('timestamp', 0) < 60:
-        active_locks = cached_data['locks']
+    if cached_data and 'allowlist' in cached_data and now - cached_data.get('timestamp', 0) < 60:
+        active_locks, active_mask, allowlist = cached_data['locks'], cached_data['mask'], cached_data['allowlist']
     else:
         active_locks = {lock['lock_type']: lock for lock in locks_collection.find({"chat_id": chat.id})}
-        context.chat_data['cached_locks'] = {'timestamp': now, 'locks': active_locks}
-    
-    if not active_locks: return
-
-    # --- Check message content against active locks ---
-    triggered_lock_type = None
-    if message.sticker and 'sticker' in active_locks: triggered_lock_type = 'sticker'
-    elif message.photo and 'photo' in active_locks: triggered_lock_type = 'photo'
-    # ... add all other message types from LOCK_TYPES constant ...
-    elif message.forward_date and 'forward' in active_locks: triggered_lock_type = 'forward'
-    elif (message.entities or message.caption_entities):
-        for entity in (message.entities or message.caption_entities):
-            if entity.type == 'url' and 'url' in active_locks:
-                triggered_lock_type = 'url'
-                break
-    
+        active_mask = _locks_mask(active_locks)
+        settings = chat_settings_collection.find_one({"_id": chat.id}, {"lock_allowlist": 1}) or {}
+        allowlist = Allowlist(settings.get("lock_allowlist"))
+        context.chat_data['cached_locks'] = {'timestamp': now, 'locks': active_locks, 'mask': active_mask, 'allowlist': allowlist}
+
+    # --- Check message content against active locks in one operation ---
+    hit = active_mask & message_features(update)
+    if not hit: return
+    hit = allowlist.exempt_features(message, message_links(update), hit)
+    if not hit: return
+
+    if await is_user_admin(context, chat.id, user.id) or is_user_approved(chat.id, user.id):
+        return
+
+    triggered_lock_type = next(lock_type for lock_type in LOCK_TYPES if lock_type in active_locks and LOCK_MASKS[lock_type] & hit)
     if triggered_lock_type:
         lock_rule = active_locks[triggered_lock_type]
         action = lock_rule.get('action', 'del') # Default action is always delete
         duration_sec = lock_rule.get('action_duration_seconds', 0)
-
-        # In a full implementation, you would check the allowlist here before proceeding.
         
         try:
             if action == 'del':
@@ -101,6 +119,7 @@ async def lock_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             {"$set": {"action": "del"}}, # Set a default action
             upsert=True
         )
+    invalidate_locks_cache(context.application, chat_id)
     
     await update.message.reply_text(f"✅ Locked: `{'`, `'.join(types_to_lock)}`.", parse_mode=ParseMode.MARKDOWN_V2)
 
@@ -114,6 +133,7 @@ async def unlock_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
         
     locks_collection.delete_many({"chat_id": chat_id, "lock_type": {"$in": types_to_unlock}})
+    invalidate_locks_cache(context.application, chat_id)
     await update.message.reply_text(f"✅ Unlocked: `{'`, `'.join(types_to_unlock)}`.", parse_mode=ParseMode.MARKDOWN_V2)
 
 @admin_only
@@ -128,3 +148,56 @@ async def list_locks(update: Update, context: ContextTypes.DEFAULT_TYPE):
     msg = "<b>The following items are locked:</b>\n"
     msg += "\n".join([f"• <code>{lock['lock_type']}</code>" for lock in active_locks])
     await update.message.reply_text(msg, parse_mode=ParseMode.HTML)
+
+def _parse_allowlist_item(update: Update, context: ContextTypes.DEFAULT_TYPE) -> tuple[str | None, object]:
+    """Reads `<url|user|sticker> [value]` (or a reply) into (storage_field, value)."""
+    args = context.args or []
+    if not args or args[0].lower() not in ALLOWLIST_KINDS: return None, None
+    kind, value = args[0].lower(), args[1] if len(args) > 1 else None
+    reply = update.message.reply_to_message
+
+    if kind == "url":
+        return ALLOWLIST_KINDS[kind], normalize_domain(value) if value else None
+    if kind == "user":
+        if value and value.isdigit(): return ALLOWLIST_KINDS[kind], int(value)
+        return ALLOWLIST_KINDS[kind], reply.from_user.id if reply and reply.from_user else None
+    if value: return ALLOWLIST_KINDS[kind], value
+    return ALLOWLIST_KINDS[kind], reply.sticker.set_name if reply and reply.sticker else None
+
+@admin_only
+async def allowlist_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Adds a domain, user, or sticker pack to the lock allowlist, or shows the allowlist."""
+    chat_id = await resolve_target_chat_id(update, context)
+    if not context.args:
+        allowlist = (chat_settings_collection.find_one({"_id": chat_id}, {"lock_allowlist": 1}) or {}).get("lock_allowlist", {})
+        lines = [f"<b>{kind.capitalize()}s:</b> " + (", ".join(f"<code>{item}</code>" for item in allowlist.get(field, [])) or "none")
+                 for kind, field in ALLOWLIST_KINDS.items()]
+        await update.message.reply_text("<b>Lock allowlist</b>\n" + "\n".join(lines), parse_mode=ParseMode.HTML)
+        return
+
+    field, value = _parse_allowlist_item(update, context)
+    if not field or value is None:
+        await update.message.reply_text(
+            "Usage: `/allowlist url <domain>`, `/allowlist user <id>` or `/allowlist sticker <pack name>` "
+            "(users and sticker packs can also be taken from a replied message).")
+        return
+
+    chat_settings_collection.update_one({"_id": chat_id}, {"$addToSet": {f"lock_allowlist.{field}": value}}, upsert=True)
+    invalidate_locks_cache(context.application, chat_id)
+    await update.message.reply_text(f"✅ <code>{value}</code> is now exempt from locks.", parse_mode=ParseMode.HTML)
+
+@admin_only
+async def rmallowlist_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Removes a domain, user, or sticker pack from the lock allowlist."""
+    chat_id = await resolve_target_chat_id(update, context)
+    field, value = _parse_allowlist_item(update, context)
+    if not field or value is None:
+        await update.message.reply_text("Usage: `/rmallowlist <url|user|sticker> <value>`")
+        return
+
+    result = chat_settings_collection.update_one({"_id": chat_id}, {"$pull": {f"lock_allowlist.{field}": value}})
+    if not result.modified_count:
+        await update.message.reply_text("That item is not on the allowlist.")
+        return
+    invalidate_locks_cache(context.application, chat_id)
+    await update.message.reply_text(f"✅ <code>{value}</code> was removed from the allowlist.", parse_mode=ParseMode.HTML)
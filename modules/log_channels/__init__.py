@@ -1,8 +1,9 @@
 import re
 from telegram.ext import CommandHandler, MessageHandler, filters
 
-from .service import setlog_command_guide, handle_setlog_forward, unsetlog_command #, other_commands...
-from bot_core.registry import COMMAND_REGISTRY, HELP_REGISTRY
+from .service import setlog_command_guide, handle_setlog_forward, unsetlog_command, logdigest_command #, other_commands...
+from .sink import flush_job, flush_on_shutdown, invalidate_log_settings, FLUSH_INTERVAL_SECONDS
+from bot_core.registry import COMMAND_REGISTRY, HELP_REGISTRY, SHUTDOWN_HOOKS, CHAT_CACHE_HOOKS
 
 def load_module(application):
     """Loads the Log Channels module."""
@@ -12,7 +13,8 @@ def load_module(application):
         "unsetlog": "Unset the log channel for this chat.",
         "log": "Enable a log category.",
         "nolog": "Disable a log category.",
-        "logcategories": "List all supported log categories."
+        "logcategories": "List all supported log categories.",
+        "logdigest": "Summarise noisy log categories periodically instead of logging every entry."
     }
     for cmd, help_text in admin_cmds.items():
         COMMAND_REGISTRY[cmd] = {"module": "LogChannels", "category": "admin", "help": help_text}
@@ -24,10 +26,15 @@ def load_module(application):
     # Handler for the forwarded message which performs the setup in the group
     application.add_handler(MessageHandler(filters.FORWARDED & filters.Regex(r'/setlog'), handle_setlog_forward))
     
-    handlers = {"unsetlog": unsetlog_command} # Add other config handlers here
+    handlers = {"unsetlog": unsetlog_command, "logdigest": logdigest_command} # Add other config handlers here
     for cmd_name, handler_func in handlers.items():
         application.add_handler(CommandHandler(cmd_name, handler_func))
         application.add_handler(MessageHandler(
             filters.Regex(rf'^{re.escape("!")}{cmd_name}(\s|$)'),
             handler_func
         ))
+
+    # Log entries are queued per channel and sent in combined messages.
+    application.job_queue.run_repeating(flush_job, interval=FLUSH_INTERVAL_SECONDS, first=FLUSH_INTERVAL_SECONDS, name="log_flush")
+    SHUTDOWN_HOOKS.append(flush_on_shutdown)
+    CHAT_CACHE_HOOKS.append(lambda app, chat_id: invalidate_log_settings(chat_id))
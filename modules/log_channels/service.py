@@ -6,6 +6,7 @@ from telegram.error import BadRequest
 from database.db import db
 from utils.decorators import admin_only
 from utils.context import resolve_target_chat_id
+from .sink import get_log_settings, invalidate_log_settings, enqueue, add_to_digest, DIGEST_INTERVAL_SECONDS
 
 chat_settings_collection = db["chat_settings"]
 
@@ -23,26 +24,22 @@ LOG_CATEGORIES = {
 }
 
 # --- The Public Logging Service ---
-async def log_action(context: ContextTypes.DEFAULT_TYPE, chat_id: int, category: str, log_message: str):
+async def log_action(context: ContextTypes.DEFAULT_TYPE, chat_id: int, category: str, log_message: str,
+                     count: int = 1):
     """
     The central logging function for other modules to call.
-    Checks settings and sends a message to the log channel if required.
+    Checks the cached settings and queues the entry for the log channel if required;
+    the sink sends queued entries in combined messages every few seconds.
+    count is how many events a batched entry stands for, so digests count users rather than entries.
     """
-    settings = chat_settings_collection.find_one({"_id": chat_id}) or {}
-    log_channel_id = settings.get("log_channel_id")
-    log_cats = settings.get("log_categories", [])
-    
-    if log_channel_id and category in log_cats:
-        try:
-            await context.bot.send_message(
-                chat_id=log_channel_id,
-                text=log_message,
-                parse_mode=ParseMode.HTML,
-                disable_web_page_preview=True
-            )
-        except BadRequest as e:
-            print(f"Failed to send log to {log_channel_id}: {e.message}")
-            # Optional: unset the log channel here to prevent further errors.
+    settings = get_log_settings(chat_id)
+    log_channel_id = settings["channel_id"]
+    if not log_channel_id or category not in settings["categories"]: return
+
+    if category in settings["digest"]:
+        add_to_digest(log_channel_id, chat_id, log_message, count)
+    else:
+        enqueue(log_channel_id, log_message)
 
 # --- Setup Handlers ---
 async def setlog_command_guide(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -81,6 +78,7 @@ async def handle_setlog_forward(update: Update, context: ContextTypes.DEFAULT_TY
         {"$set": {"log_channel_id": log_channel_id}},
         upsert=True
     )
+    invalidate_log_settings(chat.id)
     await context.bot.send_message(log_channel_id, f"✅ This channel has been set as the log channel for: <b>{chat.title}</b>.", parse_mode=ParseMode.HTML)
     await update.message.reply_text(f"✅ Successfully set <b>{forwarded_from.title}</b> as the log channel.", parse_mode=ParseMode.HTML)
 
@@ -90,6 +88,35 @@ async def unsetlog_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Unsets the log channel for the chat."""
     chat_id = await resolve_target_chat_id(update, context)
     chat_settings_collection.update_one({"_id": chat_id}, {"$unset": {"log_channel_id": ""}})
+    invalidate_log_settings(chat_id)
     await update.message.reply_text("✅ Log channel has been unset.")
 
+@admin_only
+async def logdigest_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Chooses log categories that are summarised periodically instead of logged one by one."""
+    chat_id = await resolve_target_chat_id(update, context)
+    args = [arg.lower() for arg in context.args]
+
+    if not args:
+        digested = get_log_settings(chat_id)["digest"]
+        current = ", ".join(f"<code>{cat}</code>" for cat in sorted(digested)) or "none"
+        await update.message.reply_text(
+            f"Digested categories: {current}\nUsage: <code>/logdigest &lt;categories...&gt;</code> or <code>/logdigest off</code>",
+            parse_mode=ParseMode.HTML)
+        return
+
+    if args == ["off"]:
+        chat_settings_collection.update_one({"_id": chat_id}, {"$unset": {"log_digest_categories": ""}})
+        msg = "✅ Log digest disabled. Every log entry will be sent individually."
+    else:
+        unknown = [arg for arg in args if arg not in LOG_CATEGORIES]
+        if unknown:
+            await update.message.reply_text(f"Unknown categories: {', '.join(unknown)}. See /logcategories.")
+            return
+        chat_settings_collection.update_one({"_id": chat_id}, {"$set": {"log_digest_categories": args}}, upsert=True)
+        minutes = max(1, round(DIGEST_INTERVAL_SECONDS / 60))
+        msg = f"✅ These categories will be summarised every {minutes} minute(s): {', '.join(args)}."
+    invalidate_log_settings(chat_id)
+    await update.message.reply_text(msg)
+
 # ... (Implement /log, /nolog, /logcategories following the same patterns) ...
@@ -0,0 +1,166 @@
+import asyncio
+import html
+import re
+import time
+from collections import Counter, deque
+from datetime import timedelta
+from telegram import Bot
+from telegram.ext import ContextTypes
+from telegram.constants import ParseMode
+from telegram.error import BadRequest, Forbidden, RetryAfter
+
+from database.db import db
+
+chat_settings_collection = db["chat_settings"]
+
+MAX_MESSAGE_LENGTH = 4096
+FLUSH_INTERVAL_SECONDS = 3       # How often queued entries are sent
+DIGEST_INTERVAL_SECONDS = 60     # How often digested categories are summarised
+SETTINGS_TTL_SECONDS = 60
+ENTRY_SEPARATOR = "\n\n"
+TAG_PATTERN = re.compile(r"#(\w+)")
+HTML_TAG_PATTERN = re.compile(r"<[^>]+>")
+PLAIN_PIECE_LENGTH = MAX_MESSAGE_LENGTH // 5  # Escaping can grow text up to 5x ("&" -> "&amp;")
+
+# chat_id -> (fetched_at, {"channel_id", "categories", "digest"})
+_settings_cache: dict[int, tuple[float, dict]] = {}
+
+# log channel -> formatted entries waiting to be sent
+_queues: dict[int, deque] = {}
+# log channel -> Counter of (chat_id, tag) seen since the last digest
+_digests: dict[int, Counter] = {}
+# log channel -> monotonic time before which Telegram asked us not to post
+_resume_at: dict[int, float] = {}
+_last_digest = time.monotonic()
+_flush_lock = asyncio.Lock()
+
+# --- Cached Settings ---
+def get_log_settings(chat_id: int) -> dict:
+    """The chat's log channel, enabled categories and digested categories, cached briefly."""
+    cached = _settings_cache.get(chat_id)
+    if cached and time.time() - cached[0] < SETTINGS_TTL_SECONDS:
+        return cached[1]
+    settings = chat_settings_collection.find_one(
+        {"_id": chat_id}, {"log_channel_id": 1, "log_categories": 1, "log_digest_categories": 1}) or {}
+    log_settings = {
+        "channel_id": settings.get("log_channel_id"),
+        "categories": frozenset(settings.get("log_categories", [])),
+        "digest": frozenset(settings.get("log_digest_categories", [])),
+    }
+    _settings_cache[chat_id] = (time.time(), log_settings)
+    return log_settings
+
+def invalidate_log_settings(chat_id: int):
+    _settings_cache.pop(chat_id, None)
+
+# --- Queueing ---
+def _to_plain(text: str) -> str:
+    return html.unescape(HTML_TAG_PATTERN.sub("", text))
+
+def _split_entry(log_message: str) -> list[str]:
+    """
+    Splits an entry too long for one message at line breaks, so tags (which never span
+    lines in our entries) stay whole. A single over-long line is sent as escaped plain text.
+    """
+    if len(log_message) <= MAX_MESSAGE_LENGTH: return [log_message]
+    pieces, current = [], ""
+    for line in log_message.split("\n"):
+        if len(line) > MAX_MESSAGE_LENGTH:
+            if current: pieces.append(current)
+            plain = _to_plain(line)
+            pieces += [html.escape(plain[i:i + PLAIN_PIECE_LENGTH], quote=False)
+                       for i in range(0, len(plain), PLAIN_PIECE_LENGTH)]
+            current = ""
+        elif current and len(current) + 1 + len(line) > MAX_MESSAGE_LENGTH:
+            pieces.append(current)
+            current = line
+        else:
+            current = f"{current}\n{line}" if current else line
+    if current: pieces.append(current)
+    return pieces
+
+def enqueue(channel_id: int, log_message: str):
+    _queues.setdefault(channel_id, deque()).extend(_split_entry(log_message))
+
+def add_to_digest(channel_id: int, chat_id: int, log_message: str, count: int = 1):
+    """Counts an entry for the digest; batched entries (e.g. one #ANTIRAID for many users) pass their size."""
+    match = TAG_PATTERN.search(log_message)
+    tag = match.group(1) if match else "OTHER"
+    _digests.setdefault(channel_id, Counter())[(chat_id, tag)] += count
+
+def _build_digests():
+    """Turns the counted entries into one summary entry per source chat."""
+    minutes = max(1, round(DIGEST_INTERVAL_SECONDS / 60))
+    period = "minute" if minutes == 1 else f"{minutes} minutes"
+    for channel_id, counts in _digests.items():
+        per_chat: dict[int, list[str]] = {}
+        for (chat_id, tag), count in sorted(counts.items()):
+            per_chat.setdefault(chat_id, []).append(f"<b>#{tag}</b>: {count} event(s)")
+        for chat_id, lines in per_chat.items():
+            enqueue(channel_id, f"<b>#DIGEST</b> for <code>{chat_id}</code> (last {period})\n" + "\n".join(lines))
+    _digests.clear()
+
+def _take_chunk(queue: deque) -> str:
+    """Pops as many entries as fit into one message."""
+    chunk = queue.popleft()
+    while queue and len(chunk) + len(ENTRY_SEPARATOR) + len(queue[0]) <= MAX_MESSAGE_LENGTH:
+        chunk += ENTRY_SEPARATOR + queue.popleft()
+    return chunk
+
+def _retry_after_seconds(error: RetryAfter) -> float:
+    retry_after = error.retry_after
+    return retry_after.total_seconds() if isinstance(retry_after, timedelta) else float(retry_after)
+
+# --- Flushing ---
+async def flush(bot: Bot, force_digest: bool = False, wait: bool = False):
+    """
+    Sends every channel's queued entries as combined messages. If a flush is already running,
+    this one is skipped, unless wait is set, in which case it runs once the other has finished.
+    """
+    global _last_digest
+    if _flush_lock.locked() and not wait: return
+    async with _flush_lock:
+        now = time.monotonic()
+        if _digests and (force_digest or now - _last_digest >= DIGEST_INTERVAL_SECONDS):
+            _build_digests()
+            _last_digest = now
+
+        for channel_id, queue in list(_queues.items()):
+            if _resume_at.get(channel_id, 0) > now: continue
+            while queue:
+                chunk = _take_chunk(queue)
+                try:
+                    try:
+                        await bot.send_message(chat_id=channel_id, text=chunk, parse_mode=ParseMode.HTML,
+                                               disable_web_page_preview=True)
+                    except BadRequest as e:
+                        if "chat not found" in e.message.lower(): raise
+                        await _send_plain(bot, channel_id, chunk, e)
+                except RetryAfter as e:
+                    queue.appendleft(chunk)
+                    _resume_at[channel_id] = time.monotonic() + _retry_after_seconds(e)
+                    break
+                except (BadRequest, Forbidden) as e:
+                    # The channel is gone or the bot was removed; nothing queued for it can be delivered
+                    print(f"Failed to send log to {channel_id}: {e.message}")
+                    queue.clear()
+            if not queue:
+                _queues.pop(channel_id, None)
+
+async def _send_plain(bot: Bot, channel_id: int, chunk: str, error: BadRequest):
+    """
+    Resends a chunk Telegram rejected (usually broken HTML) as plain text, dropping only that
+    chunk if it still fails. RetryAfter propagates so the caller can requeue the chunk.
+    """
+    plain = _to_plain(chunk)[:MAX_MESSAGE_LENGTH]
+    try:
+        await bot.send_message(chat_id=channel_id, text=plain, disable_web_page_preview=True)
+    except BadRequest as e:
+        print(f"Dropped a log chunk for {channel_id}: {error.message}; as plain text: {e.message}")
+
+async def flush_job(context: ContextTypes.DEFAULT_TYPE):
+    await flush(context.bot)
+
+async def flush_on_shutdown(application):
+    """Shutdown hook so entries queued in the last few seconds are not lost."""
+    await flush(application.bot, force_digest=True, wait=True)
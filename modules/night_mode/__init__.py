@@ -2,12 +2,13 @@ import re
 from telegram.ext import CommandHandler, MessageHandler, filters
 
 from .commands import nightmode_command, nightmode_status, set_timezone, check_night_mode
-from bot_core.registry import COMMAND_REGISTRY, HELP_REGISTRY
+from .scheduler import restore_schedules_job, invalidate_night_state
+from bot_core.registry import COMMAND_REGISTRY, HELP_REGISTRY, CHAT_CACHE_HOOKS
 
 def load_module(application):
     """Loads the Night Mode module."""
     admin_cmds = {
-        "nightmode": "Set, enable, or disable night mode.",
+        "nightmode": "Set, enable, or disable night mode. `/nightmode lock on` also restricts chat permissions at night.",
         "nightmodestatus": "Check the current night mode status and schedule.",
         "settimezone": "Set the chat's timezone for schedules (e.g., `Asia/Kolkata`).",
         "nightmodeallow": "Add a user to the night mode whitelist.",
@@ -31,3 +32,6 @@ def load_module(application):
 
     # Add the main listener.
     application.add_handler(MessageHandler(filters.ALL & ~filters.COMMAND, check_night_mode), group=7)
+    # Re-arm the permission lock transitions that were pending before a restart.
+    application.job_queue.run_once(restore_schedules_job, 5, name="nightmode_restore")
+    CHAT_CACHE_HOOKS.append(lambda app, chat_id: invalidate_night_state(chat_id))
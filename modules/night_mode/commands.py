@@ -8,6 +8,8 @@ from database.db import db
 from utils.decorators import admin_only
 from utils.permissions import is_user_admin, is_user_approved
 from utils.context import resolve_target_chat_id
+from utils.message_features import message_features
+from .scheduler import compute_schedule, get_night_state, refresh_chat
 
 chat_settings_collection = db["chat_settings"]
 
@@ -17,35 +19,8 @@ def is_night_mode_active(settings: dict) -> tuple[bool, str]:
     Checks if night mode should be currently active based on settings.
     Returns (isActive, reasonString).
     """
-    # 1. Check for manual override
-    if "nightmode_enabled" in settings:
-        status = settings["nightmode_enabled"]
-        return status, "Manual Override"
-
-    # 2. Check schedule if no override is set
-    start_str = settings.get("nightmode_schedule_start")
-    end_str = settings.get("nightmode_schedule_end")
-    tz_str = settings.get("nightmode_timezone", "UTC")
-
-    if not start_str or not end_str:
-        return False, "Not Configured"
-
-    try:
-        timezone = pytz.timezone(tz_str)
-        now = datetime.now(timezone).time()
-        start_time = datetime.strptime(start_str, "%H:%M").time()
-        end_time = datetime.strptime(end_str, "%H:%M").time()
-        
-        # Handle overnight schedules (e.g., 23:00 to 06:00)
-        if start_time > end_time:
-            is_active = now >= start_time or now < end_time
-        else:
-            is_active = start_time <= now < end_time
-        
-        return is_active, "Scheduled"
-    except Exception as e:
-        print(f"Error checking night mode time: {e}")
-        return False, "Error"
+    is_active, reason, _ = compute_schedule(settings)
+    return is_active, reason
 
 # --- Core Listener ---
 async def check_night_mode(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -54,35 +29,21 @@ async def check_night_mode(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
     message = update.effective_message
     if not chat or not user or not message or user.is_bot: return
-        
-    settings = chat_settings_collection.find_one({"_id": chat.id}) or {}
-    is_active, _ = is_night_mode_active(settings)
-    if not is_active: return
+
+    # Cached until the chat's next on/off transition, so this is usually just a timestamp check.
+    state = get_night_state(chat.id)
+    if not state.active or not state.blocked_mask & message_features(update): return
 
     # Exemption Check
     is_exempt = (
-        await is_user_admin(context, chat.id, user.id) or
+        user.id in state.whitelist or
         is_user_approved(chat.id, user.id) or
-        user.id in settings.get("nightmode_whitelist", [])
+        await is_user_admin(context, chat.id, user.id)
     )
     if is_exempt: return
-        
-    # Check for restricted content types
-    blocked_types = settings.get("nightmode_blocked_types", [])
-    should_delete = False
-    if "photo" in blocked_types and message.photo: should_delete = True
-    elif "video" in blocked_types and message.video: should_delete = True
-    elif "sticker" in blocked_types and message.sticker: should_delete = True
-    elif "animation" in blocked_types and message.animation: should_delete = True
-    elif message.entities or message.caption_entities:
-        for entity in (message.entities or message.caption_entities):
-            if entity.type in ['url', 'text_link'] and "link" in blocked_types:
-                should_delete = True
-                break
-    
-    if should_delete:
-        try: await message.delete()
-        except Exception: pass
+
+    try: await message.delete()
+    except Exception: pass
 
 # --- Admin Commands ---
 @admin_only
@@ -92,10 +53,18 @@ async def nightmode_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     args = context.args
     
     if not args:
-        await update.message.reply_text("Usage: `/nightmode on/off` or `/nightmode <start_HH:MM> <end_HH:MM>`")
+        await update.message.reply_text("Usage: `/nightmode on/off`, `/nightmode <start_HH:MM> <end_HH:MM>` or `/nightmode lock on/off`")
         return
     
-    if args[0].lower() == "on":
+    if args[0].lower() == "lock" and len(args) == 2 and args[1].lower() in ["on", "off"]:
+        lock = args[1].lower() == "on"
+        chat_settings_collection.update_one({"_id": chat_id}, {"$set": {"nightmode_lock": lock}}, upsert=True)
+        if lock:
+            await update.message.reply_text("🔒 During night mode, blocked content types will now be restricted through chat permissions. "
+                                            "Whitelisted and approved users are restricted too; stickers and GIFs are locked together.")
+        else:
+            await update.message.reply_text("🔓 Night mode will no longer change chat permissions.")
+    elif args[0].lower() == "on":
         chat_settings_collection.update_one({"_id": chat_id}, {"$set": {"nightmode_enabled": True}}, upsert=True)
         await update.message.reply_text("🌙 Night mode has been manually **enabled**.", parse_mode=ParseMode.HTML)
     elif args[0].lower() == "off":
@@ -115,6 +84,8 @@ async def nightmode_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await update.message.reply_text("Invalid time format. Please use HH:MM (e.g., 23:00).")
     else:
         await update.message.reply_text("Invalid syntax.")
+        return
+    await refresh_chat(context, chat_id)
 
 @admin_only
 async def nightmode_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -131,6 +102,7 @@ async def nightmode_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
     tz = settings.get("nightmode_timezone", "UTC (default)")
     
     status_msg += f"Schedule: `{start}` - `{end}` (`{tz}`)\n"
+    status_msg += f"Permission Lock: **{'ON' if settings.get('nightmode_lock', False) else 'OFF'}**\n"
     await update.message.reply_text(status_msg, parse_mode=ParseMode.HTML)
 
 @admin_only
@@ -142,5 +114,6 @@ async def set_timezone(update: Update, context: ContextTypes.DEFAULT_TYPE):
         pytz.timezone(tz_str)
         chat_settings_collection.update_one({"_id": chat_id}, {"$set": {"nightmode_timezone": tz_str}}, upsert=True)
         await update.message.reply_text(f"✅ Timezone set to `{tz_str}`.")
+        await refresh_chat(context, chat_id)
     except pytz.UnknownTimeZoneError:
         await update.message.reply_text("Invalid timezone. Please provide a valid TZ database name (e.g., `Asia/Kolkata`, `Europe/London`, `UTC`).")
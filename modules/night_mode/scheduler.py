@@ -0,0 +1,170 @@
+import math
+import time
+from datetime import datetime, timedelta, timezone, time as dtime
+import pytz
+from telegram import Bot, ChatPermissions
+from telegram.ext import ContextTypes, JobQueue
+from telegram.error import BadRequest
+
+from database.db import db
+from utils import message_features as features
+
+chat_settings_collection = db["chat_settings"]
+
+STATE_TTL_SECONDS = 300  # Upper bound on how long a state is trusted, even without a transition
+
+# Which chat permission to switch off, per blocked content type, when the chat is locked
+# at the transition. Stickers and GIFs share one permission in Telegram.
+BLOCKED_PERMISSION_FIELDS = {
+    "photo": ("can_send_photos",),
+    "video": ("can_send_videos",),
+    "sticker": ("can_send_other_messages",),
+    "animation": ("can_send_other_messages",),
+    "link": ("can_add_web_page_previews",),
+}
+
+# Message feature bits each blockable content type matches
+BLOCKED_TYPE_MASKS = {
+    "photo": features.PHOTO, "video": features.VIDEO, "sticker": features.STICKER,
+    "animation": features.ANIMATION, "link": features.LINK,
+}
+
+class NightState:
+    """A chat's night mode state, valid until expires_at (the next transition at the latest)."""
+    __slots__ = ("active", "reason", "expires_at", "blocked_types", "blocked_mask", "whitelist")
+
+    def __init__(self, active: bool, reason: str, expires_at: float, blocked_types, whitelist):
+        self.active = active
+        self.reason = reason
+        self.expires_at = expires_at
+        self.blocked_types = frozenset(blocked_types)
+        self.blocked_mask = 0
+        for blocked_type in self.blocked_types:
+            self.blocked_mask |= BLOCKED_TYPE_MASKS.get(blocked_type, 0)
+        self.whitelist = frozenset(whitelist)
+
+# chat_id -> NightState
+_states: dict[int, NightState] = {}
+
+# --- Schedule Maths ---
+def _next_occurrence(tz, now_local: datetime, at: dtime) -> datetime:
+    """The next local wall-clock occurrence of `at` after now, DST-aware."""
+    day = now_local.date()
+    candidate = tz.localize(datetime.combine(day, at))
+    if candidate <= now_local:
+        candidate = tz.localize(datetime.combine(day + timedelta(days=1), at))
+    return candidate
+
+def compute_schedule(settings: dict) -> tuple[bool, str, float]:
+    """
+    Works out whether night mode is active and when that next changes.
+    Returns (isActive, reasonString, nextTransitionTimestamp); the timestamp is math.inf if it never changes.
+    """
+    # 1. Check for manual override
+    if "nightmode_enabled" in settings:
+        return settings["nightmode_enabled"], "Manual Override", math.inf
+
+    # 2. Check schedule if no override is set
+    start_str = settings.get("nightmode_schedule_start")
+    end_str = settings.get("nightmode_schedule_end")
+    if not start_str or not end_str:
+        return False, "Not Configured", math.inf
+
+    try:
+        tz = pytz.timezone(settings.get("nightmode_timezone", "UTC"))
+        now_local = datetime.now(tz)
+        start_time = datetime.strptime(start_str, "%H:%M").time()
+        end_time = datetime.strptime(end_str, "%H:%M").time()
+        now = now_local.time()
+
+        # Handle overnight schedules (e.g., 23:00 to 06:00)
+        if start_time > end_time:
+            is_active = now >= start_time or now < end_time
+        else:
+            is_active = start_time <= now < end_time
+
+        next_transition = _next_occurrence(tz, now_local, end_time if is_active else start_time)
+        return is_active, "Scheduled", next_transition.timestamp()
+    except Exception as e:
+        print(f"Error checking night mode time: {e}")
+        return False, "Error", time.time() + STATE_TTL_SECONDS
+
+# --- Per-Chat State Cache ---
+def get_night_state(chat_id: int) -> NightState:
+    """The cached state for a chat; recomputed only once it passes its transition or TTL."""
+    state = _states.get(chat_id)
+    now = time.time()
+    if state and now < state.expires_at:
+        return state
+
+    settings = chat_settings_collection.find_one({"_id": chat_id}) or {}
+    is_active, reason, next_transition = compute_schedule(settings)
+    state = NightState(is_active, reason, min(next_transition, now + STATE_TTL_SECONDS),
+                       settings.get("nightmode_blocked_types", []), settings.get("nightmode_whitelist", []))
+    _states[chat_id] = state
+    return state
+
+def invalidate_night_state(chat_id: int):
+    _states.pop(chat_id, None)
+
+# --- Optional Permission Lock at Transitions ---
+def _night_permissions(base: ChatPermissions, blocked_types) -> ChatPermissions:
+    permissions = base.to_dict()
+    for blocked_type in blocked_types:
+        for field in BLOCKED_PERMISSION_FIELDS.get(blocked_type, ()):
+            permissions[field] = False
+    return ChatPermissions(**permissions)
+
+async def apply_chat_lock(bot: Bot, chat_id: int):
+    """
+    Brings the chat's permissions in line with its night mode state: restricts the blocked
+    content types when night starts (saving the day-time permissions) and restores them after.
+    """
+    settings = chat_settings_collection.find_one({"_id": chat_id}) or {}
+    saved = settings.get("nightmode_saved_permissions")
+    is_active, _, _ = compute_schedule(settings)
+    should_lock = is_active and settings.get("nightmode_lock", False)
+
+    try:
+        if should_lock and not saved:
+            chat = await bot.get_chat(chat_id)
+            base = chat.permissions or ChatPermissions.all_permissions()
+            chat_settings_collection.update_one({"_id": chat_id}, {"$set": {"nightmode_saved_permissions": base.to_dict()}})
+            await bot.set_chat_permissions(chat_id, _night_permissions(base, settings.get("nightmode_blocked_types", [])))
+        elif not should_lock and saved:
+            await bot.set_chat_permissions(chat_id, ChatPermissions(**saved))
+            chat_settings_collection.update_one({"_id": chat_id}, {"$unset": {"nightmode_saved_permissions": ""}})
+    except BadRequest as e:
+        print(f"Failed to apply night mode permissions in {chat_id}: {e}")
+
+def schedule_transition(job_queue: JobQueue, chat_id: int):
+    """(Re)schedules the chat's next lock transition, if it uses the permission lock."""
+    job_name = f"nightmode_transition_{chat_id}"
+    for job in job_queue.get_jobs_by_name(job_name):
+        job.schedule_removal()
+
+    settings = chat_settings_collection.find_one({"_id": chat_id}) or {}
+    if not settings.get("nightmode_lock", False): return
+    _, _, next_transition = compute_schedule(settings)
+    if next_transition == math.inf: return
+    job_queue.run_once(_transition_job, when=datetime.fromtimestamp(next_transition, tz=timezone.utc),
+                       data=chat_id, name=job_name)
+
+async def _transition_job(context: ContextTypes.DEFAULT_TYPE):
+    chat_id = context.job.data
+    invalidate_night_state(chat_id)
+    await apply_chat_lock(context.bot, chat_id)
+    schedule_transition(context.job_queue, chat_id)
+
+async def refresh_chat(context: ContextTypes.DEFAULT_TYPE, chat_id: int):
+    """Call after any night mode setting changes for a chat."""
+    invalidate_night_state(chat_id)
+    await apply_chat_lock(context.bot, chat_id)
+    schedule_transition(context.job_queue, chat_id)
+
+async def restore_schedules_job(context: ContextTypes.DEFAULT_TYPE):
+    """Startup job: catches up on missed transitions and schedules the next one for locked chats."""
+    query = {"$or": [{"nightmode_lock": True}, {"nightmode_saved_permissions": {"$exists": True}}]}
+    for settings in chat_settings_collection.find(query, {"_id": 1}):
+        await apply_chat_lock(context.bot, settings["_id"])
+        schedule_transition(context.job_queue, settings["_id"])
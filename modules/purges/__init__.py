@@ -1,7 +1,8 @@
 import re
 from telegram.ext import CommandHandler, MessageHandler, filters
 
-from .commands import delete_message, purge_command, spurge_command, purge_from, purge_to
+from .commands import delete_message, purge_command, spurge_command, purge_from, purge_to, purge_user, purge_time
+from .journal import record_message
 from bot_core.registry import COMMAND_REGISTRY, HELP_REGISTRY
 
 def load_module(application):
@@ -12,6 +13,8 @@ def load_module(application):
         "del": "Delete the replied-to message.",
         "purgefrom": "Mark the start message for a ranged purge.",
         "purgeto": "Mark the end message and execute the ranged purge.",
+        "purgeuser": "Delete a user's recent messages.",
+        "purgetime": "Delete all messages sent within a duration (e.g., 10m).",
     }
     for cmd, help_text in admin_cmds.items():
         COMMAND_REGISTRY[cmd] = {"module": "Purges", "category": "admin", "help": help_text}
@@ -24,6 +27,8 @@ def load_module(application):
         "spurge": spurge_command,
         "purgefrom": purge_from,
         "purgeto": purge_to,
+        "purgeuser": purge_user,
+        "purgetime": purge_time,
     }
 
     for cmd_name, handler_func in handlers.items():
@@ -32,3 +37,6 @@ def load_module(application):
             filters.Regex(rf'^{re.escape("!")}{cmd_name}(\s|$)'),
             handler_func
         ))
+
+    # Journal incoming group messages so purges know which IDs exist and who sent them.
+    application.add_handler(MessageHandler(filters.ChatType.GROUPS & filters.UpdateType.MESSAGE, record_message), group=1)
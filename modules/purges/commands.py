@@ -1,4 +1,4 @@
-import asyncio
+import time
 from telegram import Update
 from telegram.ext import ContextTypes
 from telegram.constants import ParseMode
@@ -7,36 +7,67 @@ from telegram.error import BadRequest
 from utils.decorators import admin_only
 from utils.context import resolve_target_chat_id
 from modules.log_channels.service import log_action
+from utils.parsers import extract_user
+from utils.time import parse_duration, humanize_delta
+from .executor import purge_messages, DELETE_AGE_LIMIT
+from .journal import get_journal, range_targets, forget_deleted
 
 # --- Core Purge Logic ---
-async def _purge_messages(context: ContextTypes.DEFAULT_TYPE, chat_id: int, message_ids: list[int]) -> tuple[int, str]:
+PROGRESS_MIN_MESSAGES = 1000   # Only show a progress message for purges at least this large
+PROGRESS_EDIT_INTERVAL = 3     # Seconds between progress message edits
+
+async def _purge_messages(context: ContextTypes.DEFAULT_TYPE, chat_id: int, message_ids: list[int],
+                          oldest_date=None) -> tuple[int, str]:
     """
-    Helper to delete messages in batches of 100.
+    Helper that runs the purge executor and reports progress for long ranges.
     Returns (deleted_count, status_message).
     """
-    deleted_count = 0
     if not message_ids:
         return 0, "No messages to delete in the specified range."
 
-    for i in range(0, len(message_ids), 100):
-        batch = message_ids[i:i+100]
-        try:
-            await context.bot.delete_messages(chat_id=chat_id, message_ids=batch)
-            deleted_count += len(batch)
-        except BadRequest as e:
-            if "message can't be deleted" in e.message.lower():
-                # This often happens if messages are older than 48 hours
-                return deleted_count, "Stopped early. Some messages may be older than 48 hours and cannot be deleted."
-            else:
-                print(f"Error during purge: {e.message}")
-                return deleted_count, f"An error occurred: {e.message}"
-        except Exception as e:
-            print(f"An unexpected error occurred during purge: {e}")
-            return deleted_count, f"An unexpected error occurred: {e}"
-        
-        await asyncio.sleep(1) # Be respectful of API limits
-        
-    return deleted_count, f"✅ Purged {deleted_count} messages."
+    progress_msg = None
+    last_edit = 0.0
+    if len(message_ids) >= PROGRESS_MIN_MESSAGES:
+        try: progress_msg = await context.bot.send_message(chat_id, f"🧹 Purging {len(message_ids)} messages...")
+        except BadRequest: pass
+
+    async def on_progress(done: int, total: int):
+        nonlocal last_edit
+        if not progress_msg or time.monotonic() - last_edit < PROGRESS_EDIT_INTERVAL: return
+        last_edit = time.monotonic()
+        try: await progress_msg.edit_text(f"🧹 Purging... {done}/{total} ({done / total:.0%})")
+        except BadRequest: pass
+
+    # IDs grow with time, so anything from the oldest message known to be recent up is within the age limit
+    age_limit_start = time.time() - DELETE_AGE_LIMIT.total_seconds()
+    journal = get_journal(chat_id)
+    recent_from = journal.first_id_since(age_limit_start) if journal else None
+    if oldest_date and oldest_date.timestamp() >= age_limit_start:
+        recent_from = min(message_ids)
+
+    try:
+        deleted_count, skipped_count = await purge_messages(context.bot, chat_id, message_ids, on_progress, recent_from)
+    except Exception as e:
+        print(f"An unexpected error occurred during purge: {e}")
+        return 0, f"An unexpected error occurred: {e}"
+    finally:
+        if progress_msg:
+            try: await progress_msg.delete()
+            except BadRequest: pass
+    # Deleted and undeletable messages alike are not worth trying again.
+    forget_deleted(chat_id, message_ids)
+
+    status_msg = f"✅ Purged {deleted_count} messages."
+    if skipped_count:
+        status_msg += f" Skipped {skipped_count} that couldn't be deleted (e.g. older than 48 hours)."
+    return deleted_count, status_msg
+
+async def _send_purge_confirmation(context: ContextTypes.DEFAULT_TYPE, chat_id: int, status_msg: str):
+    confirmation_msg = await context.bot.send_message(chat_id, status_msg)
+    context.job_queue.run_once(
+        lambda ctx: ctx.bot.delete_message(chat_id, confirmation_msg.message_id),
+        5, name=f"del_purgeconf_{chat_id}_{confirmation_msg.message_id}"
+    )
 
 # --- Admin Commands ---
 @admin_only
@@ -62,9 +93,10 @@ async def purge_command(update: Update, context: ContextTypes.DEFAULT_TYPE, sile
     start_id = update.message.reply_to_message.message_id
     end_id = update.message.message_id
     
-    message_ids_to_purge = list(range(start_id, end_id + 1))
+    message_ids_to_purge = range_targets(chat_id, start_id, end_id)
         
-    deleted_count, status_msg = await _purge_messages(context, chat_id, message_ids_to_purge)
+    deleted_count, status_msg = await _purge_messages(context, chat_id, message_ids_to_purge,
+                                                      update.message.reply_to_message.date)
     
     # Log the action
     admin = update.effective_user
@@ -74,11 +106,7 @@ async def purge_command(update: Update, context: ContextTypes.DEFAULT_TYPE, sile
     await log_action(context, chat_id, "purges", log_msg)
 
     if not silent and deleted_count > 0:
-        confirmation_msg = await context.bot.send_message(chat_id, status_msg)
-        context.job_queue.run_once(
-            lambda ctx: ctx.bot.delete_message(chat_id, confirmation_msg.message_id),
-            5, name=f"del_purgeconf_{chat_id}_{confirmation_msg.message_id}"
-        )
+        await _send_purge_confirmation(context, chat_id, status_msg)
 
 @admin_only
 async def spurge_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -122,15 +150,73 @@ async def purge_to(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Clean up state
     del context.user_data['purge_from'][chat_id]
     
-    message_ids = list(range(start_id, end_id + 1))
+    message_ids = range_targets(chat_id, start_id, end_id)
     await update.message.delete()
     deleted_count, status_msg = await _purge_messages(context, chat_id, message_ids)
     
-    # Log the action (similar to purge_command)
-    
+    admin = update.effective_user
+    log_msg = (f"<b>#PURGE</b>\n"
+               f"<b>Admin:</b> {admin.mention_html()} (<code>{admin.id}</code>)\n"
+               f"<b>Messages Deleted:</b> {deleted_count}")
+    await log_action(context, chat_id, "purges", log_msg)
+    if deleted_count > 0:
+        await _send_purge_confirmation(context, chat_id, status_msg)
+
+@admin_only
+async def purge_user(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Deletes a user's recent messages, as remembered by the message journal."""
+    chat_id = await resolve_target_chat_id(update, context)
+    target_id, target_name = await extract_user(update, context)
+    if not target_id:
+        await update.message.reply_text("Reply to a user or give their ID to purge their recent messages.")
+        return
+
+    journal = get_journal(chat_id)
+    message_ids = journal.ids_from_user(target_id) if journal else []
+    if not message_ids:
+        await update.message.reply_text(f"I don't remember any recent messages from {target_name}.")
+        return
+
+    await update.message.delete()
+    deleted_count, status_msg = await _purge_messages(context, chat_id, message_ids)
+
+    admin = update.effective_user
+    log_msg = (f"<b>#PURGE</b>\n"
+               f"<b>Admin:</b> {admin.mention_html()} (<code>{admin.id}</code>)\n"
+               f"<b>User:</b> <code>{target_id}</code>\n"
+               f"<b>Messages Deleted:</b> {deleted_count}")
+    await log_action(context, chat_id, "purges", log_msg)
+    if deleted_count > 0:
+        await _send_purge_confirmation(context, chat_id, status_msg)
+
+@admin_only
+async def purge_time(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Deletes every message sent within the given duration (e.g. /purgetime 10m)."""
+    chat_id = await resolve_target_chat_id(update, context)
+    duration = parse_duration(context.args[0]) if context.args else None
+    if not duration:
+        await update.message.reply_text("Usage: `/purgetime <duration>` (e.g., 10m, 1h).")
+        return
+
+    cutoff = time.time() - duration.total_seconds()
+    journal = get_journal(chat_id)
+    recent_ids = journal.ids_since(cutoff) if journal else []
+    if not recent_ids:
+        await update.message.reply_text(f"I don't remember any messages from the last {humanize_delta(duration)}.")
+        return
+
+    # Purge the whole ID range from the oldest remembered message, so the bot's own replies go too.
+    end_id = update.message.message_id
+    message_ids = range_targets(chat_id, min(recent_ids), end_id)
+    deleted_count, status_msg = await _purge_messages(context, chat_id, message_ids)
+    if journal.oldest_timestamp() > cutoff:
+        status_msg += " (I only remember messages since my last restart.)"
+
+    admin = update.effective_user
+    log_msg = (f"<b>#PURGE</b>\n"
+               f"<b>Admin:</b> {admin.mention_html()} (<code>{admin.id}</code>)\n"
+               f"<b>Period:</b> Last {humanize_delta(duration)}\n"
+               f"<b>Messages Deleted:</b> {deleted_count}")
+    await log_action(context, chat_id, "purges", log_msg)
     if deleted_count > 0:
-        confirmation_msg = await context.bot.send_message(chat_id, status_msg)
-        context.job_queue.run_once(
-            lambda ctx: ctx.bot.delete_message(chat_id, confirmation_msg.message_id),
-            5, name=f"del_purgeconf_{chat_id}_{confirmation_msg.message_id}"
-        )
+        await _send_purge_confirmation(context, chat_id, status_msg)
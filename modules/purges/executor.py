@@ -0,0 +1,123 @@
+import asyncio
+import bisect
+import time
+from datetime import timedelta
+from telegram import Bot
+from telegram.error import BadRequest, RetryAfter
+
+BATCH_SIZE = 100          # Bot API limit for delete_messages
+PARALLEL_BATCHES = 3      # Batches in flight at once
+MIN_DELAY = 0.05          # Pacing between batch starts when Telegram is happy...
+MAX_DELAY = 3.0           # ...and the ceiling it backs off to after 429s
+DELETE_AGE_LIMIT = timedelta(hours=48)  # Bots can't delete older messages in groups
+AGE_PROBES = 2            # Older messages that must also fail before an age cutoff is assumed
+
+class _PurgeState:
+    """Shared pacing and counters for one purge run."""
+
+    def __init__(self, ids: list[int], recent_from: int | None):
+        self.delay = MIN_DELAY
+        self.resume_at = 0.0
+        self.deleted = 0
+        self.skipped = 0
+        self.ids = ids  # Ascending, for finding the next older message to probe
+        # IDs from here up are known to be within the age limit, so their failures are never about age
+        self.recent_from = recent_from
+        # Message IDs grow with time, so once one is confirmed too old to delete, every lower ID is too.
+        self.too_old_below = 0
+        self.probed: set[int] = set()  # Deleted (or found undeletable) by a probe already
+
+    async def pace(self):
+        wait = max(self.resume_at - time.monotonic(), self.delay)
+        await asyncio.sleep(wait)
+
+    def on_success(self):
+        self.delay = max(MIN_DELAY, self.delay * 0.8)
+
+    def on_flood(self, retry_after: float):
+        self.delay = min(MAX_DELAY, max(self.delay * 2, 0.5))
+        self.resume_at = max(self.resume_at, time.monotonic() + retry_after)
+
+def _retry_after_seconds(error: RetryAfter) -> float:
+    retry_after = error.retry_after
+    return retry_after.total_seconds() if isinstance(retry_after, timedelta) else float(retry_after)
+
+async def _delete_batch(bot: Bot, chat_id: int, batch: list[int], state: _PurgeState):
+    """Deletes one batch, bisecting on failure so one bad message doesn't sink the rest."""
+    batch = [message_id for message_id in batch if message_id not in state.probed]  # Already counted
+    live = [message_id for message_id in batch if message_id > state.too_old_below]
+    state.skipped += len(batch) - len(live)
+    if not live: return
+
+    while True:
+        await state.pace()
+        try:
+            await bot.delete_messages(chat_id=chat_id, message_ids=live)
+            state.on_success()
+            state.deleted += len(live)
+            return
+        except RetryAfter as e:
+            state.on_flood(_retry_after_seconds(e))
+        except BadRequest as e:
+            if len(live) == 1:
+                state.skipped += 1
+                if "can't be deleted" in e.message.lower():
+                    await _probe_age_cutoff(bot, chat_id, live[0], state)
+                return
+            mid = len(live) // 2
+            # Newer half first: if it finds a too-old message, the older half is skipped outright.
+            await _delete_batch(bot, chat_id, live[mid:], state)
+            await _delete_batch(bot, chat_id, live[:mid], state)
+            return
+
+async def _probe_age_cutoff(bot: Bot, chat_id: int, message_id: int, state: _PurgeState):
+    """
+    A single undeletable message may just be a service message, so it only marks the age
+    cutoff if the next AGE_PROBES older messages in the purge can't be deleted either.
+    """
+    if message_id <= state.too_old_below: return
+    if state.recent_from is not None and message_id >= state.recent_from: return
+    index = bisect.bisect_left(state.ids, message_id)
+    older = [candidate for candidate in reversed(state.ids[:index])
+             if candidate > state.too_old_below and candidate not in state.probed][:AGE_PROBES]
+    if len(older) < AGE_PROBES: return
+
+    for candidate in older:
+        state.probed.add(candidate)
+        await state.pace()
+        try:
+            await bot.delete_message(chat_id=chat_id, message_id=candidate)
+            state.deleted += 1
+            return
+        except RetryAfter as e:
+            state.on_flood(_retry_after_seconds(e))
+            state.probed.discard(candidate)  # Undecided; its own batch will handle it
+            return
+        except BadRequest as e:
+            if "can't be deleted" not in e.message.lower():
+                state.probed.discard(candidate)
+                return
+            state.skipped += 1
+    state.too_old_below = max(state.too_old_below, message_id)
+
+async def purge_messages(bot: Bot, chat_id: int, message_ids: list[int], on_progress=None,
+                         recent_from: int | None = None) -> tuple[int, int]:
+    """
+    Deletes the given messages with several batches in flight, adapting the pace to 429s.
+    on_progress, if given, is awaited as on_progress(done, total) after each batch.
+    recent_from, if known, is the lowest ID known to be younger than the age limit (IDs grow with time).
+    Returns (deleted_count, skipped_count).
+    """
+    state = _PurgeState(sorted(set(message_ids)), recent_from)
+    ids = state.ids[::-1]
+    batches = [sorted(ids[i:i + BATCH_SIZE]) for i in range(0, len(ids), BATCH_SIZE)]
+    slots = asyncio.Semaphore(PARALLEL_BATCHES)
+
+    async def run(batch: list[int]):
+        async with slots:
+            await _delete_batch(bot, chat_id, batch, state)
+            if on_progress:
+                await on_progress(state.deleted + state.skipped, len(ids))
+
+    await asyncio.gather(*(run(batch) for batch in batches))
+    return state.deleted, state.skipped
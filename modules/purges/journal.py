@@ -0,0 +1,97 @@
+import time
+from array import array
+from collections import OrderedDict
+from telegram import Update
+from telegram.ext import ContextTypes
+
+JOURNAL_SIZE = 2000          # Most recent messages remembered per chat
+MAX_JOURNALED_CHATS = 2000   # Least recently active chats beyond this are forgotten
+DELETED = 0                  # Sender slot tombstone for messages the bot already deleted
+
+class MessageJournal:
+    """
+    A fixed-size ring buffer of (message_id, sender_id, timestamp) for one chat,
+    stored in flat arrays so thousands of chats stay cheap to keep in memory.
+    """
+
+    def __init__(self, size: int = JOURNAL_SIZE):
+        self.size = size
+        self.ids = array('q')
+        self.senders = array('q')
+        self.times = array('d')
+        self.head = 0  # Next slot to overwrite once the buffer is full
+
+    def record(self, message_id: int, sender_id: int, timestamp: float):
+        if len(self.ids) < self.size:
+            self.ids.append(message_id)
+            self.senders.append(sender_id)
+            self.times.append(timestamp)
+        else:
+            self.ids[self.head] = message_id
+            self.senders[self.head] = sender_id
+            self.times[self.head] = timestamp
+            self.head = (self.head + 1) % self.size
+
+    def _slots(self):
+        """Slot indexes from oldest to newest."""
+        n = len(self.ids)
+        return range(n) if n < self.size else ((self.head + i) % n for i in range(n))
+
+    def oldest_timestamp(self) -> float | None:
+        if not self.ids: return None
+        return self.times[0 if len(self.ids) < self.size else self.head]
+
+    def first_id_since(self, timestamp: float) -> int | None:
+        return min((self.ids[i] for i in self._slots() if self.times[i] >= timestamp), default=None)
+
+    def ids_from_user(self, user_id: int) -> list[int]:
+        return [self.ids[i] for i in self._slots() if self.senders[i] == user_id]
+
+    def ids_since(self, timestamp: float) -> list[int]:
+        return [self.ids[i] for i in self._slots() if self.times[i] >= timestamp and self.senders[i] != DELETED]
+
+    def deleted_between(self, start_id: int, end_id: int) -> set[int]:
+        return {self.ids[i] for i in self._slots()
+                if self.senders[i] == DELETED and start_id <= self.ids[i] <= end_id}
+
+    def mark_deleted(self, message_ids):
+        targets = set(message_ids)
+        for i in range(len(self.ids)):
+            if self.ids[i] in targets:
+                self.senders[i] = DELETED
+
+# chat_id -> MessageJournal, most recently active last
+_journals: "OrderedDict[int, MessageJournal]" = OrderedDict()
+
+def get_journal(chat_id: int) -> MessageJournal | None:
+    return _journals.get(chat_id)
+
+async def record_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Listener that journals every incoming group message."""
+    message = update.message
+    if not message or not message.from_user: return
+
+    chat_id = message.chat.id
+    journal = _journals.get(chat_id)
+    if journal is None:
+        journal = _journals[chat_id] = MessageJournal()
+        if len(_journals) > MAX_JOURNALED_CHATS:
+            _journals.popitem(last=False)
+    else:
+        _journals.move_to_end(chat_id)
+    journal.record(message.message_id, message.from_user.id, time.time())
+
+# --- Purge helpers ---
+def range_targets(chat_id: int, start_id: int, end_id: int) -> list[int]:
+    """
+    IDs to delete for a ranged purge. Messages the bot has already deleted are left out.
+    IDs the journal never saw are kept, since they may be the bot's own messages.
+    """
+    journal = _journals.get(chat_id)
+    already_gone = journal.deleted_between(start_id, end_id) if journal else set()
+    return [message_id for message_id in range(start_id, end_id + 1) if message_id not in already_gone]
+
+def forget_deleted(chat_id: int, message_ids):
+    """Marks purged messages so later purges don't try them again."""
+    journal = _journals.get(chat_id)
+    if journal: journal.mark_deleted(message_ids)
@@ -2,11 +2,13 @@ import re
 from telegram.ext import MessageHandler, ChatMemberHandler, CommandHandler, filters
 from .filter import check_for_spam, track_new_member
 from .commands import toggle_spam_guard, set_quarantine_time
+from .quarantine import load_quarantine, prune_job, PRUNE_INTERVAL_SECONDS
 
 from bot_core.registry import COMMAND_REGISTRY, HELP_REGISTRY
 
 def load_module(application):
     """Loads the Spam Guard module."""
+    load_quarantine()
     admin_cmds = {
         "spamguard": "Toggle the spam guard system on or off.",
         "setquarantine": "Set the restriction time for new members (e.g., 24h, 30m, off)."
@@ -25,7 +27,9 @@ def load_module(application):
             filters.Regex(rf'^{re.escape("!")}{cmd_name}(\s|$)'), handler_func
         ))
 
-    application.add_handler(ChatMemberHandler(track_new_member, ChatMemberHandler.CHAT_MEMBER))
+    # Own group, so it runs alongside the other modules' join handlers instead of competing with them.
+    application.add_handler(ChatMemberHandler(track_new_member, ChatMemberHandler.CHAT_MEMBER), group=4)
+    application.job_queue.run_repeating(prune_job, interval=PRUNE_INTERVAL_SECONDS, name="quarantine_prune")
     
     # This listener runs in a very early group to catch spam before other modules.
     application.add_handler(MessageHandler(filters.ALL & ~filters.COMMAND, check_for_spam), group=4)
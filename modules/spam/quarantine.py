@@ -0,0 +1,96 @@
+import hashlib
+import math
+import time
+from datetime import datetime, timedelta, timezone
+from telegram.ext import ContextTypes
+
+from database.db import db
+
+group_members_collection = db["group_members"]
+
+DEFAULT_QUARANTINE_SECONDS = 86400   # Used to migrate records written before expires_at existed
+BLOOM_ERROR_RATE = 0.01
+PRUNE_INTERVAL_SECONDS = 60
+
+class BloomFilter:
+    """A fixed-size set of keys that can answer "definitely not present" without false negatives."""
+    __slots__ = ("bits", "size", "hashes")
+
+    def __init__(self, capacity: int, error_rate: float = BLOOM_ERROR_RATE):
+        capacity = max(capacity, 1)
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+# chat_id -> {user_id: quarantine expiry (epoch seconds)} for joins known to this process
+_joins: dict[int, dict[int, float]] = {}
+# Users still quarantined when the bot started; only these can need a database lookup
+_prior_joins = BloomFilter(0)
+
+def load_quarantine():
+    """Creates the TTL index and builds the bloom filter of joiners still in quarantine."""
+    global _prior_joins
+    now = datetime.now(timezone.utc)
+    # Records from before expires_at existed get the default quarantine, so the TTL index can expire them.
+    group_members_collection.update_many(
+        {"expires_at": {"$exists": False}},
+        [{"$set": {"expires_at": {"$add": ["$join_timestamp", DEFAULT_QUARANTINE_SECONDS * 1000]}}}]
+    )
+    group_members_collection.create_index("expires_at", expireAfterSeconds=0)
+    group_members_collection.create_index([("chat_id", 1), ("user_id", 1)])
+
+    query = {"expires_at": {"$gt": now}}
+    bloom = BloomFilter(group_members_collection.count_documents(query))
+    for record in group_members_collection.find(query, {"chat_id": 1, "user_id": 1}):
+        bloom.add(f"{record['chat_id']}:{record['user_id']}")
+    _prior_joins = bloom
+
+def record_join(chat_id: int, user_id: int, quarantine_seconds: float):
+    """Remembers a join in memory and in Mongo, where the record expires with the quarantine."""
+    joined_at = datetime.now(timezone.utc)
+    expires_at = joined_at + timedelta(seconds=quarantine_seconds)
+    _joins.setdefault(chat_id, {})[user_id] = expires_at.timestamp()
+    group_members_collection.update_one(
+        {"chat_id": chat_id, "user_id": user_id},
+        {"$set": {"join_timestamp": joined_at, "expires_at": expires_at}},
+        upsert=True
+    )
+
+def is_quarantined(chat_id: int, user_id: int) -> bool:
+    """Whether the user is still inside the quarantine that started when they joined."""
+    chat_joins = _joins.get(chat_id)
+    expires_at = chat_joins.get(user_id) if chat_joins else None
+
+    if expires_at is None:
+        if f"{chat_id}:{user_id}" not in _prior_joins:
+            return False  # Established member: no lookup at all
+        record = group_members_collection.find_one({"chat_id": chat_id, "user_id": user_id}, {"expires_at": 1})
+        if not record or not record.get("expires_at"): return False
+        expires_at = record["expires_at"].replace(tzinfo=timezone.utc).timestamp()
+        chat_joins = _joins.setdefault(chat_id, {})
+        chat_joins[user_id] = expires_at
+
+    if time.time() < expires_at: return True
+    del chat_joins[user_id]
+    return False
+
+async def prune_job(context: ContextTypes.DEFAULT_TYPE):
+    """Drops joiners whose quarantine is over, so memory only holds users still in it."""
+    now = time.time()
+    for chat_id, chat_joins in list(_joins.items()):
+        for user_id in [uid for uid, expires_at in chat_joins.items() if expires_at <= now]:
+            del chat_joins[user_id]
+        if not chat_joins: del _joins[chat_id]
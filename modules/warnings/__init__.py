@@ -2,10 +2,14 @@ import re
 from telegram.ext import CommandHandler, MessageHandler, filters, CallbackQueryHandler
 
 from .commands import warn_command, dwarn_command, swarn_command #, other_commands...
+from .store import ensure_indexes, migrate_legacy_warnings
 from bot_core.registry import COMMAND_REGISTRY, HELP_REGISTRY
 
 def load_module(application):
     """Loads the Warnings module."""
+    ensure_indexes()
+    migrate_legacy_warnings()
+
     admin_cmds = {
         "warn": "Warn a user.", "dwarn": "Warn a user and delete their message.",
         "swarn": "Silently warn a user.", "warns": "See a user's warnings.",
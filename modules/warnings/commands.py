@@ -1,4 +1,4 @@
-from datetime import datetime, timedelta, timezone
+from datetime import timedelta
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.ext import ContextTypes, CommandHandler, CallbackQueryHandler
 from telegram.constants import ParseMode
@@ -11,12 +11,12 @@ from utils.parsers import extract_user
 from utils.context import resolve_target_chat_id
 from utils.time import parse_duration, humanize_delta
 from utils.moderation import execute_punishment
+from .store import add_warning, get_active_warnings, remove_latest_warning, reset_warnings, reset_chat_warnings
 
 # --- Service Integrations ---
 from modules.log_channels.service import log_action
 from modules.cleaning_bot_messages.service import schedule_bot_message_deletion
 
-warnings_collection = db["warnings"]
 chat_settings_collection = db["chat_settings"]
 
 # --- Core Logic ---
@@ -30,7 +30,7 @@ async def _execute_warn_punishment(update: Update, context: ContextTypes.DEFAULT
         action_msg = f"{target_user.mention_html()} has reached the warning limit and has been <b>{action_string}</b>."
         sent_message = await context.bot.send_message(chat_id, action_msg, parse_mode=ParseMode.HTML)
         schedule_bot_message_deletion(context, sent_message, "action")
-        warnings_collection.delete_many({"chat_id": chat_id, "user_id": target_user.id})
+        reset_warnings(chat_id, target_user.id)
         log_msg = (f"<b>#WARN_PUNISHMENT</b>\n<b>User:</b> {target_user.mention_html()} (<code>{target_user.id}</code>)\n<b>Action:</b> {action_string.capitalize()}")
         await log_action(context, chat_id, "warns", log_msg)
 
@@ -50,9 +50,11 @@ async def _issue_warning(update: Update, context: ContextTypes.DEFAULT_TYPE, del
         await update.message.reply_text("I can't warn an admin.")
         return
     
-    warnings_collection.insert_one({
-        "chat_id": chat_id, "user_id": warned_user.id, "warner_id": warner.id,
-        "reason": reason, "timestamp": datetime.now(timezone.utc)})
+    settings = chat_settings_collection.find_one({"_id": chat_id}) or {}
+    warn_limit = settings.get("warn_limit", 3)
+    warn_time_sec = settings.get("warn_time_seconds", 0)
+
+    current_warns = add_warning(chat_id, warned_user.id, warner.id, reason, warn_time_sec)
     
     # --- SYNTAX FIX APPLIED ---
     # The fragile one-liners have been replaced with standard, robust blocks.
@@ -67,16 +69,6 @@ async def _issue_warning(update: Update, context: ContextTypes.DEFAULT_TYPE, del
         except Exception:
             pass
 
-    settings = chat_settings_collection.find_one({"_id": chat_id}) or {}
-    warn_limit = settings.get("warn_limit", 3)
-    warn_time_sec = settings.get("warn_time_seconds", 0)
-    
-    query = {"chat_id": chat_id, "user_id": warned_user.id}
-    if warn_time_sec > 0:
-        query["timestamp"] = {"$gte": datetime.now(timezone.utc) - timedelta(seconds=warn_time_sec)}
-        
-    current_warns = warnings_collection.count_documents(query)
-    
     log_msg = (f"<b>#WARN</b>\n<b>Admin:</b> {warner.mention_html()} (<code>{warner.id}</code>)\n"
                f"<b>User:</b> {warned_user.mention_html()} (<code>{warned_user.id}</code>)\n"
                f"<b>Reason:</b> {reason}\n<b>Total Warnings:</b> {current_warns}/{warn_limit}")
@@ -110,12 +102,10 @@ async def warns_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     settings = chat_settings_collection.find_one({"_id": chat_id}) or {}
     warn_time_sec = settings.get("warn_time_seconds", 0)
-    query = {"chat_id": chat_id, "user_id": target_id}
     time_limit_str = ""
     if warn_time_sec > 0:
-        query["timestamp"] = {"$gte": datetime.now(timezone.utc) - timedelta(seconds=warn_time_sec)}
         time_limit_str = f" from the last {humanize_delta(timedelta(seconds=warn_time_sec))}"
-    user_warns = list(warnings_collection.find(query).sort("timestamp", -1))
+    user_warns = get_active_warnings(chat_id, target_id, warn_time_sec)
     if not user_warns:
         await update.message.reply_text(f"{target_name} has no active warnings.")
         return
@@ -132,11 +122,7 @@ async def rmwarn_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not target_id:
         await update.message.reply_text("You need to specify a user to remove a warning from.")
         return
-    latest_warn = warnings_collection.find_one_and_delete(
-        {"chat_id": chat_id, "user_id": target_id},
-        sort=[("timestamp", -1)]
-    )
-    if latest_warn: await update.message.reply_text(f"Removed the latest warning from {target_name}.")
+    if remove_latest_warning(chat_id, target_id): await update.message.reply_text(f"Removed the latest warning from {target_name}.")
     else: await update.message.reply_text(f"{target_name} has no warnings to remove.")
 
 @admin_only
@@ -147,7 +133,7 @@ async def resetwarn_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not target_id:
         await update.message.reply_text("You need to specify a user to reset warnings for.")
         return
-    warnings_collection.delete_many({"chat_id": chat_id, "user_id": target_id})
+    reset_warnings(chat_id, target_id)
     await update.message.reply_text(f"Reset all warnings for {target_name}.")
 
 @admin_only
@@ -166,7 +152,7 @@ async def resetallwarns_callback(update: Update, context: ContextTypes.DEFAULT_T
         await query.answer("Only admins can do this.", show_alert=True)
         return
     if query.data.endswith("confirm"):
-        warnings_collection.delete_many({"chat_id": chat_id})
+        reset_chat_warnings(chat_id)
         await query.edit_message_text("✅ All warnings in this chat have been reset.")
     else:
         await query.edit_message_text("Action cancelled.")
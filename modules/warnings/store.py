@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta, timezone
+from pymongo import ASCENDING, ReturnDocument, UpdateOne
+
+from database.db import db
+
+# One document per (chat, user) holding the running count and the most recent warns.
+# Shape: {chat_id, user_id, count, warns: [{warner_id, reason, timestamp}], expires_at}
+warn_counters_collection = db["warn_counters"]
+LEGACY_COLLECTION = "warnings"  # One document per warn, used before warn_counters existed
+
+MAX_RECENT_WARNS = 50  # Upper bound on the embedded list, keeps the document small
+
+def ensure_indexes():
+    """Creates the lookup index and the TTL index used to expire stale counters."""
+    warn_counters_collection.create_index([("chat_id", ASCENDING), ("user_id", ASCENDING)], unique=True)
+    # Documents without 'expires_at' (permanent warnings) are never removed by the TTL monitor.
+    warn_counters_collection.create_index("expires_at", expireAfterSeconds=0)
+
+def migrate_legacy_warnings():
+    """
+    One-time fold of the legacy per-warn documents into warn_counters. Legacy warns go before
+    any already in the counter, and the old collection is renamed (not dropped) once merged.
+    Only counter warns newer than the last legacy one are kept, so a run interrupted before the
+    rename can be repeated without doubling the warns it already folded in.
+    """
+    if LEGACY_COLLECTION not in db.list_collection_names(): return
+    legacy = db[LEGACY_COLLECTION].aggregate([
+        {"$sort": {"timestamp": ASCENDING}},
+        {"$group": {
+            "_id": {"chat_id": "$chat_id", "user_id": "$user_id"},
+            "warns": {"$push": {"warner_id": "$warner_id", "reason": "$reason", "timestamp": "$timestamp"}},
+        }},
+    ], allowDiskUse=True)
+
+    ops = []
+    for group in legacy:
+        newer = {"$filter": {"input": {"$ifNull": ["$warns", []]}, "as": "w",
+                             "cond": {"$gt": ["$$w.timestamp", group["warns"][-1]["timestamp"]]}}}
+        merged = {"$concatArrays": [{"$literal": group["warns"]}, newer]}
+        ops.append(UpdateOne(
+            {"chat_id": group["_id"]["chat_id"], "user_id": group["_id"]["user_id"]},
+            [{"$set": {"warns": {"$slice": [merged, -MAX_RECENT_WARNS]}}}, {"$set": {"count": {"$size": "$warns"}}}],
+            upsert=True
+        ))
+        if len(ops) >= 1000:
+            warn_counters_collection.bulk_write(ops, ordered=False)
+            ops = []
+    if ops:
+        warn_counters_collection.bulk_write(ops, ordered=False)
+    # Kept as a backup; the timestamp keeps a second migration (e.g. after a rollback) from overwriting it
+    db[LEGACY_COLLECTION].rename(f"{LEGACY_COLLECTION}_migrated_{datetime.now(timezone.utc):%Y%m%d%H%M%S}")
+
+def _active_warns_expr(cutoff: datetime | None) -> dict:
+    """Aggregation expression for the stored warns, minus any older than the cutoff."""
+    warns = {"$ifNull": ["$warns", []]}
+    if cutoff is None:
+        return warns
+    return {"$filter": {"input": warns, "as": "w", "cond": {"$gte": ["$$w.timestamp", cutoff]}}}
+
+def add_warning(chat_id: int, user_id: int, warner_id: int, reason: str, warn_time_sec: float = 0) -> int:
+    """
+    Records a warning and returns the user's new active warning count.
+    Expired warns are pruned in the same atomic update, so no follow-up count is needed.
+    """
+    now = datetime.now(timezone.utc)
+    cutoff = now - timedelta(seconds=warn_time_sec) if warn_time_sec > 0 else None
+    new_warn = {"warner_id": warner_id, "reason": reason, "timestamp": now}
+
+    stage = {"warns": {"$slice": [
+        {"$concatArrays": [_active_warns_expr(cutoff), [{"$literal": new_warn}]]},
+        -MAX_RECENT_WARNS
+    ]}}
+    meta = {"count": {"$size": "$warns"}}
+    if cutoff is not None:
+        # The whole counter is stale once its newest warn expires; let the TTL index reap it.
+        meta["expires_at"] = now + timedelta(seconds=warn_time_sec)
+
+    pipeline = [{"$set": stage}, {"$set": meta}]
+    if cutoff is None:
+        pipeline.append({"$unset": "expires_at"})
+
+    doc = warn_counters_collection.find_one_and_update(
+        {"chat_id": chat_id, "user_id": user_id},
+        pipeline,
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+        projection={"count": 1}
+    )
+    return doc["count"]
+
+def get_active_warnings(chat_id: int, user_id: int, warn_time_sec: float = 0) -> list[dict]:
+    """Returns the user's unexpired warnings, newest first."""
+    doc = warn_counters_collection.find_one({"chat_id": chat_id, "user_id": user_id}, {"warns": 1})
+    if not doc: return []
+    warns = doc.get("warns", [])
+    if warn_time_sec > 0:
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=warn_time_sec)
+        # Stored datetimes come back naive (UTC) unless the client is tz-aware.
+        warns = [w for w in warns if w["timestamp"].replace(tzinfo=timezone.utc) >= cutoff]
+    return list(reversed(warns))
+
+def remove_latest_warning(chat_id: int, user_id: int) -> bool:
+    """Removes the user's most recent warning. Returns False if there was none."""
+    doc = warn_counters_collection.find_one_and_update(
+        {"chat_id": chat_id, "user_id": user_id, "warns.0": {"$exists": True}},
+        {"$pop": {"warns": 1}, "$inc": {"count": -1}},
+        projection={"_id": 1}
+    )
+    return doc is not None
+
+def reset_warnings(chat_id: int, user_id: int):
+    """Deletes all warnings for one user in a chat."""
+    warn_counters_collection.delete_one({"chat_id": chat_id, "user_id": user_id})
+
+def reset_chat_warnings(chat_id: int):
+    """Deletes all warnings for every user in a chat."""
+    warn_counters_collection.delete_many({"chat_id": chat_id})
@@ -0,0 +1,67 @@
+# CAPTCHA rendering, run in worker processes. Deliberately free of database and bot imports,
+# so a worker started with forkserver/spawn only loads this module (and Pillow).
+import io
+import random
+
+# Pillow is only needed for the image-based modes; without it they are simply unavailable.
+try:
+    from PIL import Image, ImageDraw, ImageFilter, ImageFont
+    IMAGE_CAPTCHAS_AVAILABLE = True
+except ImportError:
+    IMAGE_CAPTCHAS_AVAILABLE = False
+    print("⚠️ Pillow is not installed. Image CAPTCHA modes will be disabled.")
+
+# A challenge is a plain, picklable dict so it can be built in a worker process:
+# {"mode", "text", "answer", "options": [(button_label, callback_value)], "image": bytes | None}
+
+TEXT_CAPTCHA_ALPHABET = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"  # No 0/O or 1/I lookalikes
+TEXT_CAPTCHA_LENGTH = 5
+
+def math_options(correct_answer: int) -> list[tuple[str, str]]:
+    answers = {correct_answer}
+    while len(answers) < 4: answers.add(random.randint(2, 20))
+    return [(str(ans), str(ans)) for ans in random.sample(list(answers), len(answers))]
+
+# --- Image modes (CPU-bound; run these in a worker process) ---
+def _render_image(text: str) -> bytes:
+    """Draws the text with jitter and noise so it is hard to read by OCR."""
+    width, height = 260, 100
+    img = Image.new("RGB", (width, height), tuple(random.randint(200, 255) for _ in range(3)))
+    draw = ImageDraw.Draw(img)
+    try:
+        font = ImageFont.load_default(size=42)
+    except TypeError:  # Pillow < 10.1 has no scalable default font
+        font = ImageFont.load_default()
+
+    for _ in range(8):
+        draw.line([(random.randint(0, width), random.randint(0, height)) for _ in range(2)],
+                  fill=tuple(random.randint(80, 180) for _ in range(3)), width=2)
+    x = 15
+    for char in text:
+        draw.text((x, random.randint(15, 35)), char, font=font, fill=tuple(random.randint(0, 90) for _ in range(3)))
+        x += (width - 30) // max(len(text), 1)
+    for _ in range(400):
+        draw.point((random.randint(0, width - 1), random.randint(0, height - 1)),
+                   fill=tuple(random.randint(0, 255) for _ in range(3)))
+
+    buffer = io.BytesIO()
+    img.filter(ImageFilter.SMOOTH).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def generate_image_math() -> dict:
+    a, b = random.randint(1, 10), random.randint(1, 10)
+    return {"mode": "image", "text": "To prove you're human, solve the sum in the picture.",
+            "answer": str(a + b), "options": math_options(a + b), "image": _render_image(f"{a}+{b}=?")}
+
+def generate_image_text() -> dict:
+    def code(): return "".join(random.choices(TEXT_CAPTCHA_ALPHABET, k=TEXT_CAPTCHA_LENGTH))
+    answer = code()
+    choices = {answer}
+    while len(choices) < 4: choices.add(code())
+    options = [(c, c) for c in random.sample(list(choices), len(choices))]
+    return {"mode": "text", "text": "To prove you're human, pick the code shown in the picture.",
+            "answer": answer, "options": options, "image": _render_image(answer)}
+
+def reseed_worker():
+    """Process pool initializer, so workers don't share one random sequence."""
+    random.seed()
@@ -0,0 +1,66 @@
+import re
+import time
+from collections import OrderedDict
+from telegram import Update
+
+from bot_core.registry import COMMAND_REGISTRY
+from database.db import db
+
+chat_settings_collection = db["chat_settings"]
+
+POLICY_TTL_SECONDS = 300  # Settings commands invalidate directly; the TTL only covers other writers
+MAX_CACHED_UPDATES = 256
+
+COMMAND_PATTERN = re.compile(r"[!/](\w+)")
+_POLICY_FIELDS = {"disabled_commands": 1, "disable_admin": 1, "disable_delete": 1, "clean_command_settings": 1}
+
+class CommandPolicy:
+    """A chat's disabled commands and command cleaning settings, as sets for per-command lookups."""
+    __slots__ = ("disabled", "disable_all", "disable_admin", "disable_delete", "clean_types", "clean_all")
+
+    def __init__(self, settings: dict):
+        self.disabled = frozenset(settings.get("disabled_commands", []))
+        self.disable_all = "all" in self.disabled
+        self.disable_admin = settings.get("disable_admin", False)
+        self.disable_delete = settings.get("disable_delete", False)
+        self.clean_types = frozenset(settings.get("clean_command_settings", []))
+        self.clean_all = "all" in self.clean_types
+
+    def is_disabled(self, command: str) -> bool:
+        return self.disable_all or command in self.disabled
+
+    def should_clean(self, command: str | None) -> bool:
+        if self.clean_all: return True
+        if not self.clean_types or command is None: return False
+        # Commands not in our registry are for another bot (or invalid)
+        category = COMMAND_REGISTRY[command].get("category", "user") if command in COMMAND_REGISTRY else "other"
+        return category in self.clean_types
+
+# chat_id -> (timestamp, CommandPolicy)
+_policies: dict[int, tuple[float, CommandPolicy]] = {}
+# update_id -> parsed command ("" when the message isn't a command)
+_commands: "OrderedDict[int, str]" = OrderedDict()
+
+def get_command_policy(chat_id: int) -> CommandPolicy:
+    cached = _policies.get(chat_id)
+    if cached and time.time() - cached[0] < POLICY_TTL_SECONDS:
+        return cached[1]
+    settings = chat_settings_collection.find_one({"_id": chat_id}, _POLICY_FIELDS) or {}
+    policy = CommandPolicy(settings)
+    _policies[chat_id] = (time.time(), policy)
+    return policy
+
+def invalidate_command_policy(chat_id: int):
+    _policies.pop(chat_id, None)
+
+def parse_command(update: Update) -> str | None:
+    """The lowercased command of the update's message (e.g. /ban@YourBot -> ban), parsed once per update."""
+    command = _commands.get(update.update_id)
+    if command is None:
+        message = update.effective_message
+        match = COMMAND_PATTERN.match(message.text) if message and message.text else None
+        command = match.group(1).lower() if match else ""
+        _commands[update.update_id] = command
+        if len(_commands) > MAX_CACHED_UPDATES:
+            _commands.popitem(last=False)
+    return command or None
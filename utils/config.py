@@ -20,3 +20,5 @@ DONATION_TEXT = os.environ.get("DONATION_TEXT", "The bot owner has not set up a
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
 DEV_LOG_CHANNEL = os.environ.get("DEV_LOG_CHANNEL")
 SUPPORT_GROUP_URL = os.environ.get("SUPPORT_GROUP_URL")
+AI_BACKEND = os.environ.get("AI_BACKEND", "gemini")  # "stub" answers locally, without any API calls
+AI_STREAMING = os.environ.get("AI_STREAMING", "true").lower() != "false"  # Edit /ask replies as the answer arrives
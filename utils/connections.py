@@ -0,0 +1,107 @@
+import time
+from telegram import Update
+from telegram.error import BadRequest, Forbidden
+from telegram.ext import ContextTypes
+
+from .permissions import is_user_admin
+
+ADMIN_FRESH_SECONDS = 60     # A verdict this recent is trusted outright
+ADMIN_STALE_SECONDS = 180    # Up to this age it is still served, while a background check refreshes it
+CHAT_INFO_TTL_SECONDS = 600
+
+class ChatInfo:
+    """What /connect needs to know about a chat, cached to spare the get_chat / get_member calls."""
+    __slots__ = ("id", "title", "bot_status", "fetched_at")
+
+    def __init__(self, chat_id: int, title: str, bot_status: str | None):
+        self.id = chat_id
+        self.title = title
+        self.bot_status = bot_status  # None if the bot isn't a member
+        self.fetched_at = time.time()
+
+# chat id or @username -> ChatInfo
+_chat_info: dict[int | str, ChatInfo] = {}
+# (user_id, chat_id) -> (checked_at, is_admin)
+_admin_status: dict[tuple[int, int], tuple[float, bool]] = {}
+# (user_id, chat_id) pairs with a background check already running
+_revalidating: set[tuple[int, int]] = set()
+
+async def get_chat_info(context: ContextTypes.DEFAULT_TYPE, identifier: int | str) -> ChatInfo:
+    """The chat's id, title and the bot's status there. Raises BadRequest if the chat can't be found."""
+    info = _chat_info.get(identifier)
+    if info and time.time() - info.fetched_at < CHAT_INFO_TTL_SECONDS:
+        return info
+
+    chat = await context.bot.get_chat(identifier)
+    try:
+        bot_status = (await chat.get_member(context.bot.id)).status
+    except BadRequest:
+        bot_status = None
+    info = ChatInfo(chat.id, chat.title, bot_status)
+    _chat_info[identifier] = _chat_info[chat.id] = info
+    return info
+
+async def check_admin(context: ContextTypes.DEFAULT_TYPE, user_id: int, chat_id: int) -> bool:
+    """
+    Asks Telegram (and the bot's own admin list) whether the user is an admin, and caches the answer.
+    API errors (network, RetryAfter, timeouts) propagate and leave the cached verdict untouched.
+    """
+    is_admin = await is_user_admin(context, chat_id, user_id, raise_on_error=True)
+    _admin_status[(user_id, chat_id)] = (time.time(), is_admin)
+    return is_admin
+
+def cached_admin_status(user_id: int, chat_id: int) -> bool:
+    """True if the user was recently confirmed as an admin of the chat, without any API call."""
+    cached = _admin_status.get((user_id, chat_id))
+    return bool(cached and cached[1] and time.time() - cached[0] < ADMIN_STALE_SECONDS)
+
+async def drop_connection(context: ContextTypes.DEFAULT_TYPE, user_data: dict, user_id: int, chat_id: int):
+    """Disconnects the user from a chat they no longer administer and tells them why."""
+    if user_data.get('connected_chat_id') != chat_id: return
+    del user_data['connected_chat_id']
+    title = user_data.pop('connected_chat_title', None) or chat_id
+    try:
+        await context.bot.send_message(user_id, f"Disconnected from {title}: you are no longer an admin there.")
+    except (BadRequest, Forbidden):
+        pass
+
+async def _revalidate(context: ContextTypes.DEFAULT_TYPE, user_data: dict, user_id: int, chat_id: int):
+    try:
+        if not await check_admin(context, user_id, chat_id):
+            await drop_connection(context, user_data, user_id, chat_id)
+    except Exception as e:
+        # Undecided: keep the cached verdict; the next command past the fresh window tries again
+        print(f"Could not recheck admin status of {user_id} in {chat_id}: {e}")
+    finally:
+        _revalidating.discard((user_id, chat_id))
+
+async def validate_connection(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int | None:
+    """
+    The user's connected chat, as long as they are still an admin there. A recent verdict is
+    used as-is, an older one is used while it is rechecked in the background, and with no usable
+    verdict the check happens now. Connections are only dropped when Telegram definitely says
+    the user isn't an admin; if the check itself fails, the connection is kept and admin_only
+    checks the user directly.
+    """
+    chat_id = context.user_data.get('connected_chat_id')
+    user = update.effective_user
+    if chat_id is None or not user: return chat_id
+
+    key = (user.id, chat_id)
+    cached = _admin_status.get(key)
+    age = time.time() - cached[0] if cached else None
+    if cached and cached[1] and age < ADMIN_STALE_SECONDS:
+        if age >= ADMIN_FRESH_SECONDS and key not in _revalidating:
+            _revalidating.add(key)
+            context.application.create_task(_revalidate(context, context.user_data, user.id, chat_id))
+        return chat_id
+
+    try:
+        is_admin = await check_admin(context, user.id, chat_id)
+    except Exception as e:
+        print(f"Could not check admin status of {user.id} in {chat_id}: {e}")
+        return chat_id
+    if is_admin:
+        return chat_id
+    await drop_connection(context, context.user_data, user.id, chat_id)
+    return None
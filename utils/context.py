@@ -2,20 +2,22 @@ from telegram import Update
 from telegram.ext import ContextTypes
 
 from database.db import db
+from .connections import validate_connection
 
 chat_settings_collection = db["chat_settings"]
 
 async def resolve_target_chat_id(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """
     Determines the target chat for an action.
-    If the user is connected to another chat via /connect, it returns the connected chat's ID.
-    Otherwise, it returns the ID of the chat where the command was sent.
+    If the user is connected to another chat via /connect (and still an admin there),
+    it returns the connected chat's ID. Otherwise, it returns the ID of the chat where the command was sent.
     """
     # user_data is a dictionary attached to each user, perfect for this.
     if 'connected_chat_id' in context.user_data:
-        return context.user_data['connected_chat_id']
-    else:
-        return update.effective_chat.id
+        connected_chat_id = await validate_connection(update, context)
+        if connected_chat_id is not None:
+            return connected_chat_id
+    return update.effective_chat.id
 
 async def resolve_action_topic_id(context: ContextTypes.DEFAULT_TYPE, chat_id: int) -> int | None:
     """
@@ -1,4 +1,3 @@
-import re
 from functools import wraps
 from telegram import Update
 from telegram.ext import ContextTypes
@@ -6,6 +5,8 @@ from telegram.error import BadRequest
 
 from .permissions import is_user_owner, is_user_creator, is_user_admin
 from .context import resolve_target_chat_id
+from .connections import cached_admin_status
+from .command_policy import get_command_policy, parse_command
 from bot_core.registry import COMMAND_REGISTRY
 from database.db import db # <-- CORRECT: Import the main db object
 
@@ -42,7 +43,9 @@ def admin_only(func):
         if not user: return
 
         target_chat_id = await resolve_target_chat_id(update, context)
-        if await is_user_admin(context, target_chat_id, user.id):
+        # Resolving a remote chat has just confirmed (or refreshed) the user's admin status there
+        is_remote = target_chat_id != update.effective_chat.id
+        if (is_remote and cached_admin_status(user.id, target_chat_id)) or await is_user_admin(context, target_chat_id, user.id):
             return await func(update, context, *args, **kwargs)
         else:
             settings = chat_settings_collection.find_one({"_id": update.effective_chat.id})
@@ -64,24 +67,19 @@ def check_disabled(func):
         if is_remote_command:
             return await func(update, context, *args, **kwargs)
 
-        command_match = re.match(r"[!/](\w+)", update.message.text)
-        if not command_match: return
-        command = command_match.group(1).lower()
+        command = parse_command(update)
+        if not command: return
 
-        settings = chat_settings_collection.find_one({"_id": chat.id}) or {}
-        disabled_cmds = settings.get("disabled_commands", [])
-        
-        if "all" not in disabled_cmds and command not in disabled_cmds:
+        policy = get_command_policy(chat.id)
+        if not policy.is_disabled(command):
             return await func(update, context, *args, **kwargs)
-        
-        admins_are_disabled = settings.get("disable_admin", False)
-        
-        if not admins_are_disabled and await is_user_admin(context, chat.id, user.id):
+
+        if not policy.disable_admin and await is_user_admin(context, chat.id, user.id):
             return await func(update, context, *args, **kwargs)
-        
-        if settings.get("disable_delete", False):
+
+        if policy.disable_delete:
             try: await update.message.delete()
             except BadRequest: pass
-        
+
         return
     return wrapped
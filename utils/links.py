@@ -0,0 +1,96 @@
+import re
+import unicodedata
+from collections import OrderedDict
+from telegram import Message, Update
+
+# A bare domain (no scheme or www.) only counts as a link if its TLD isn't also an everyday
+# word, or if a path follows it; "Thanks.Me too" and "meet at 5.in the evening" aren't links,
+# "bit.ly" and "promo.me/x" are. With a scheme or www. any domain counts.
+_SPAM_TLDS = "com|net|org|io|ru|xyz|ly|gg|tk|biz|uk|fr|cc|tv|ws|su|pw|cn|br|ir|ua"
+_WORD_TLDS = ("me|in|to|us|de|co|id|it|is|at|be|so|no|do|my|info|top|site|online|club|live|shop"
+              "|app|dev|link|click")
+_ALL_TLDS = f"{_SPAM_TLDS}|{_WORD_TLDS}"
+_TELEGRAM_HOST = r"(?:t|telegram)\.(?:me|dog)"
+
+# --- Obfuscation Normaliser ---
+# Applied in order to lowercased, NFKC-normalised text. The spacing rules only fire where a
+# link is clearly intended, since ordinary sentences are full of ". " and "dot".
+_OBFUSCATIONS = [
+    (re.compile(r"[\u200b-\u200f\u2060\ufeff]"), ""),                      # zero-width characters
+    (re.compile(r"\bh[xt]{2}p(s?)://"), r"http\1://"),                        # hxxp://, htxp://
+    (re.compile(r"\s*[\[\(\{]\s*(?:\.|dot)\s*[\]\)\}]\s*"), "."),           # [.]  (dot)  {.}
+    (re.compile(r"\s+dot\s+(?=(?:com|net|org|ru|io|xyz)\b)"), "."),          # "example dot com"
+    (re.compile(r"[。．｡]"), "."),                                            # CJK / fullwidth dots
+    (re.compile(rf"(?<=\w)\s*\.\s*(?=(?:{_ALL_TLDS}|dog)/[^\s/])"), "."),   # "t . me/+abc", "evil . com/x"
+    (re.compile(r"\b(t|telegram)\s*\.\s*(me|dog)\s*/\s*(?=\+|joinchat/)"), r"\1.\2/"),  # "t . me / +abc"
+]
+
+def normalize_links_text(text: str) -> str:
+    """Undoes the common tricks used to stop links being recognised."""
+    text = unicodedata.normalize("NFKC", text).lower()
+    for pattern, replacement in _OBFUSCATIONS:
+        text = pattern.sub(replacement, text)
+    return text
+
+# --- Link Patterns ---
+INVITE_PATTERN = re.compile(rf"{_TELEGRAM_HOST}/(?:\+|joinchat/)([\w-]+)")
+USERNAME_PATTERN = re.compile(rf"{_TELEGRAM_HOST}/(?!\+|joinchat/)([a-z][a-z0-9_]{{3,31}})\b|tg://resolve\?domain=([a-z][a-z0-9_]{{3,31}})")
+DOMAIN_PATTERN = re.compile(
+    rf"(?:https?://|www\.)((?:[a-z0-9-]+\.)+[a-z]{{2,}})"
+    # Bare domains must not be part of an email address ("a@b.com") and may end a sentence ("evil.com.")
+    rf"|(?<![@\w.-])((?:[a-z0-9-]+\.)+(?:{_SPAM_TLDS}))(?![\w-]|\.[\w-])"
+    rf"|(?<![@\w.-])((?:[a-z0-9-]+\.)+(?:{_ALL_TLDS}))(?=/[^\s/])"
+)
+
+class LinkInfo:
+    """What links a message contains, by kind."""
+    __slots__ = ("invites", "usernames", "domains")
+
+    def __init__(self, invites=(), usernames=(), domains=()):
+        self.invites = frozenset(invites)      # Invite hashes from t.me/+... and t.me/joinchat/...
+        self.usernames = frozenset(usernames)  # Public usernames from t.me/<name> and tg://resolve
+        self.domains = frozenset(domains)      # Hosts of every other link (www. stripped)
+
+    @property
+    def has_links(self) -> bool:
+        return bool(self.invites or self.usernames or self.domains)
+
+    @property
+    def external_domains(self) -> frozenset:
+        return frozenset(domain for domain in self.domains if not re.fullmatch(_TELEGRAM_HOST, domain))
+
+NO_LINKS = LinkInfo()
+
+def extract_links(message: Message) -> LinkInfo:
+    """Classifies every link in a message's text, caption and hidden text_link URLs."""
+    parts = [message.text or message.caption or ""]
+    parts += [entity.url for entity in (message.entities or ()) + (message.caption_entities or ())
+              if entity.type == "text_link" and entity.url]
+    text = normalize_links_text(" \n ".join(parts))
+    if "." not in text and "tg://" not in text: return NO_LINKS
+
+    invites = INVITE_PATTERN.findall(text)
+    usernames = [a or b for a, b in USERNAME_PATTERN.findall(text)]
+    domains = []
+    for with_scheme, bare, with_path in DOMAIN_PATTERN.findall(text):
+        domain = with_scheme or bare or with_path
+        domains.append(domain[4:] if domain.startswith("www.") else domain)
+    if not (invites or usernames or domains): return NO_LINKS
+    return LinkInfo(invites, usernames, domains)
+
+MAX_CACHED_UPDATES = 256
+
+# update_id -> LinkInfo, so every handler in the chain shares one analysis
+_cache: "OrderedDict[int, LinkInfo]" = OrderedDict()
+
+def message_links(update: Update) -> LinkInfo:
+    """The update's links, extracted once and cached."""
+    links = _cache.get(update.update_id)
+    if links is not None: return links
+
+    message = update.effective_message
+    links = extract_links(message) if message else NO_LINKS
+    _cache[update.update_id] = links
+    if len(_cache) > MAX_CACHED_UPDATES:
+        _cache.popitem(last=False)
+    return links
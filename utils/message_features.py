@@ -0,0 +1,72 @@
+from collections import OrderedDict
+from telegram import Message, Update
+
+from utils.links import LinkInfo, extract_links, message_links
+
+# --- Feature Bits ---
+# One bit per kind of content; a message's features are the OR of its bits.
+STICKER    = 1 << 0
+PHOTO      = 1 << 1
+VIDEO      = 1 << 2
+ANIMATION  = 1 << 3
+DOCUMENT   = 1 << 4
+URL        = 1 << 5
+TEXT_LINK  = 1 << 6
+INVITELINK = 1 << 7
+FORWARD    = 1 << 8
+COMMAND    = 1 << 9
+CONTACT    = 1 << 10
+POLL       = 1 << 11
+VOICE      = 1 << 12
+AUDIO      = 1 << 13
+VIDEONOTE  = 1 << 14
+
+LINK = URL | TEXT_LINK
+MEDIA = STICKER | PHOTO | VIDEO | ANIMATION | DOCUMENT | AUDIO | VOICE | VIDEONOTE
+
+MAX_CACHED_UPDATES = 256  # Only updates still being routed through the handler groups matter
+
+# update_id -> features; PTB objects are frozen, so the cache lives beside them
+_cache: "OrderedDict[int, int]" = OrderedDict()
+
+def classify_message(message: Message, links: LinkInfo | None = None) -> int:
+    """
+    Computes the feature bitmask for a message in a single pass. Links come from the
+    link engine, so obfuscated links count as URL / INVITELINK too.
+    """
+    features = 0
+    if message.sticker: features |= STICKER
+    if message.photo: features |= PHOTO
+    if message.video: features |= VIDEO
+    if message.animation: features |= ANIMATION
+    elif message.document: features |= DOCUMENT  # GIFs also carry a document; don't count them twice
+    if message.audio: features |= AUDIO
+    if message.voice: features |= VOICE
+    if message.video_note: features |= VIDEONOTE
+    if message.contact: features |= CONTACT
+    if message.poll: features |= POLL
+    if getattr(message, "forward_origin", None) or getattr(message, "forward_date", None):
+        features |= FORWARD
+
+    for entity in (message.entities or ()) + (message.caption_entities or ()):
+        if entity.type == "url": features |= URL
+        elif entity.type == "text_link": features |= TEXT_LINK
+        elif entity.type == "bot_command": features |= COMMAND
+
+    if links is None: links = extract_links(message)
+    if links.has_links and not features & LINK:
+        features |= URL  # A link Telegram didn't mark up, e.g. "t . me/+abc"
+    if links.invites: features |= INVITELINK
+    return features
+
+def message_features(update: Update) -> int:
+    """The update's message features, classified once and shared by every handler that asks."""
+    features = _cache.get(update.update_id)
+    if features is not None: return features
+
+    message = update.effective_message
+    features = classify_message(message, message_links(update)) if message else 0
+    _cache[update.update_id] = features
+    if len(_cache) > MAX_CACHED_UPDATES:
+        _cache.popitem(last=False)
+    return features
@@ -1,7 +1,7 @@
 from datetime import datetime, timedelta
 from telegram import ChatPermissions
 from telegram.ext import ContextTypes
-from telegram.error import BadRequest
+from telegram.error import BadRequest, RetryAfter
 
 from .time import humanize_delta
 
@@ -10,13 +10,15 @@ async def execute_punishment(
     chat_id: int, 
     user_id: int, 
     mode: str, 
-    duration_seconds: int = 0
+    duration_seconds: int = 0,
+    raise_on_flood: bool = False
 ) -> tuple[bool, str]:
     """
     Executes a moderation action (ban, kick, mute, etc.) on a user.
     This is a centralized function to be used by Bans, Warnings, Locks, etc.
     
     Returns a tuple of (success_status, action_string).
+    With raise_on_flood, RetryAfter propagates so a queued caller can back off and retry.
     """
     action_string = ""
     try:
@@ -52,6 +54,9 @@ async def execute_punishment(
 
         return True, action_string
         
+    except RetryAfter as e:
+        if raise_on_flood: raise
+        return False, f"An unexpected error occurred: {e}"
     except BadRequest as e:
         # This often happens if the bot lacks permissions or tries to moderate another admin.
         return False, f"Failed: {e.message}"
@@ -20,12 +20,17 @@ async def is_user_creator(context: ContextTypes.DEFAULT_TYPE, chat_id: int, user
     except Exception:
         return False
 
-async def is_user_telegram_admin(context: ContextTypes.DEFAULT_TYPE, chat_id: int, user_id: int) -> bool:
-    """Checks if a user is a native Telegram admin (creator or administrator)."""
+async def is_user_telegram_admin(context: ContextTypes.DEFAULT_TYPE, chat_id: int, user_id: int,
+                                 raise_on_error: bool = False) -> bool:
+    """
+    Checks if a user is a native Telegram admin (creator or administrator).
+    API errors count as "not an admin" unless raise_on_error is set.
+    """
     try:
         chat_admins = await context.bot.get_chat_administrators(chat_id)
         return user_id in {admin.user.id for admin in chat_admins}
     except Exception:
+        if raise_on_error: raise
         return False
 
 def is_user_bot_admin(chat_id: int, user_id: int) -> bool:
@@ -42,10 +47,11 @@ def is_user_approved(chat_id: int, user_id: int) -> bool:
     settings = chat_settings_collection.find_one({"_id": chat_id}, {"approved_users": 1})
     return bool(settings and user_id in settings.get("approved_users", []))
 
-async def is_user_admin(context: ContextTypes.DEFAULT_TYPE, chat_id: int, user_id: int) -> bool:
+async def is_user_admin(context: ContextTypes.DEFAULT_TYPE, chat_id: int, user_id: int,
+                        raise_on_error: bool = False) -> bool:
     """Checks if a user is an admin by any method (Telegram, Bot, or Anon)."""
     if user_id == 1087968824: # Anonymous Admin
         settings = chat_settings_collection.find_one({"_id": chat_id}, {"allow_anon_admin": 1})
         if settings and settings.get("allow_anon_admin", False):
             return True
-    return await is_user_telegram_admin(context, chat_id, user_id) or is_user_bot_admin(chat_id, user_id)
+    return await is_user_telegram_admin(context, chat_id, user_id, raise_on_error) or is_user_bot_admin(chat_id, user_id)